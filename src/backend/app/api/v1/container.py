@@ -6,23 +6,33 @@ from dependency_injector import containers, providers
 from dotenv import load_dotenv, find_dotenv
 
 
-from db.database import Database, SessionManager
+from db.database import AsyncDatabase, AsyncSessionManager, Database, SessionManager
+from db.dimension_cache import DimensionCache
 from db.repositories import advanced_settings_repository
 from db.repositories.calculation_config_repository import CalculationConfigRepository
 from db.repositories.calculation_repository import CalculationRepository
 from db.repositories.calculation_set_repository import CalculationSetRepository
+from db.repositories.job_repository import JobRepository
 from db.repositories.user_repository import UserRepository
 from db.repositories.moleculeset_stats_repository import MoleculeSetStatsRepository
+from db.repositories.suitable_methods_repository import SuitableMethodsRepository
+from db.repositories.storage_usage_repository import StorageUsageRepository
 
 from integrations.chargefw2.chargefw2 import ChargeFW2Local
 from integrations.io.io import IOLocal
 
+from services.archive_cache import ArchiveCache
 from services.calculation_storage import CalculationStorageService
+from services.charges_store import ChargesStore
 from services.chargefw2 import ChargeFW2Service
+from services.file_index import FileIndex
 from services.file_storage import FileStorageService
 from services.io import IOService
+from services.jobs import JobService
 from services.logging.file_logger import FileLogger
 from services.mmcif import MmCIFService
+from services.molecules_cache import MoleculesCache
+from services.storage_usage import StorageUsageService
 from services.oidc import OIDCService
 
 
@@ -43,23 +53,73 @@ class Container(containers.DeclarativeContainer):
     session_manager = providers.Singleton(
         SessionManager, session_factory=db.provided.session_factory
     )
+    async_db = providers.Singleton(AsyncDatabase, db_url=os.environ.get("ACC2_DB_URL"))
+    async_session_manager = providers.Singleton(
+        AsyncSessionManager, session_factory=async_db.provided.session_factory
+    )
+    dimension_cache = providers.Singleton(DimensionCache)
 
     # repositories
     set_repository = providers.Factory(CalculationSetRepository)
     calculation_repository = providers.Factory(CalculationRepository, set_repository=set_repository)
     config_repository = providers.Factory(
-        CalculationConfigRepository, set_repository=set_repository
+        CalculationConfigRepository,
+        set_repository=set_repository,
+        dimension_cache=dimension_cache,
+    )
+    user_repository = providers.Factory(
+        UserRepository,
+        session_manager=session_manager,
+        async_session_manager=async_session_manager,
     )
-    user_repository = providers.Factory(UserRepository, session_manager=session_manager)
     stats_repository = providers.Factory(MoleculeSetStatsRepository)
     advanced_settings_repository = providers.Factory(
         advanced_settings_repository.AdvancedSettingsRepository,
+        dimension_cache=dimension_cache,
     )
+    suitable_methods_repository = providers.Factory(SuitableMethodsRepository)
+    job_repository = providers.Factory(JobRepository)
+    storage_usage_repository = providers.Factory(StorageUsageRepository)
 
     # services
     logger_service = providers.Singleton(FileLogger)
-    io_service = providers.Singleton(IOService, logger=logger_service, io=io)
+    molecules_cache = providers.Singleton(
+        MoleculesCache,
+        logger=logger_service,
+        max_size_bytes=int(os.environ.get("ACC2_MOLECULES_CACHE_SIZE_BYTES") or 268435456),
+    )
+    file_index = providers.Singleton(FileIndex, io=io, logger=logger_service)
+    storage_usage = providers.Singleton(
+        StorageUsageService,
+        logger=logger_service,
+        repository=storage_usage_repository,
+        session_manager=session_manager,
+    )
+    archive_cache = providers.Singleton(
+        ArchiveCache,
+        io=io,
+        logger=logger_service,
+        cache_dir=os.path.join(os.environ.get("ACC2_DATA_DIR", ""), "archives"),
+        max_size_bytes=int(os.environ.get("ACC2_ARCHIVE_CACHE_SIZE_BYTES") or 1073741824),
+    )
+    io_service = providers.Singleton(
+        IOService,
+        logger=logger_service,
+        io=io,
+        molecules_cache=molecules_cache,
+        file_index=file_index,
+        storage_usage=storage_usage,
+        reconcile_interval=float(
+            os.environ.get("ACC2_STORAGE_RECONCILE_INTERVAL_SECONDS") or 3600
+        ),
+        archive_cache=archive_cache,
+    )
     mmcif_service = providers.Singleton(MmCIFService, logger=logger_service, io=io_service)
+    charges_store = providers.Singleton(
+        ChargesStore,
+        logger=logger_service,
+        root_dir=os.environ.get("ACC2_CHARGES_STORE_DIR"),
+    )
     storage_service = providers.Singleton(
         CalculationStorageService,
         logger=logger_service,
@@ -68,7 +128,11 @@ class Container(containers.DeclarativeContainer):
         config_repository=config_repository,
         stats_repository=stats_repository,
         advanced_settings_repository=advanced_settings_repository,
+        suitable_methods_repository=suitable_methods_repository,
         session_manager=session_manager,
+        async_session_manager=async_session_manager,
+        charges_store=charges_store,
+        total_count_ttl=int(os.environ.get("ACC2_TOTAL_COUNT_CACHE_TTL_SECONDS") or 60),
     )
     file_storage_service = providers.Singleton(
         FileStorageService,
@@ -86,5 +150,19 @@ class Container(containers.DeclarativeContainer):
         calculation_storage=storage_service,
         max_workers=int(os.environ.get("ACC2_MAX_WORKERS") or 4),
         max_concurrent_calculations=int(os.environ.get("ACC2_MAX_CONCURRENT_CALCULATIONS") or 4),
+        executor_type=os.environ.get("ACC2_EXECUTOR_TYPE") or "thread",
+        molecules_cache=molecules_cache,
+        shard_min_size_bytes=int(os.environ.get("ACC2_SHARD_MIN_FILE_SIZE_BYTES") or 10485760),
+    )
+    job_service = providers.Singleton(
+        JobService,
+        logger=logger_service,
+        chargefw2=chargefw2_service,
+        calculation_storage=storage_service,
+        job_repository=job_repository,
+        session_manager=session_manager,
+        max_concurrent_jobs=int(os.environ.get("ACC2_MAX_CONCURRENT_JOBS") or 2),
+        max_jobs_per_user=int(os.environ.get("ACC2_MAX_JOBS_PER_USER") or 1),
+        max_guest_jobs=int(os.environ.get("ACC2_MAX_GUEST_JOBS") or 2),
     )
     oidc_service = providers.Singleton(OIDCService, logger=logger_service)
@@ -36,7 +36,7 @@ class UserLoaderMiddleware(BaseHTTPMiddleware):
             if payload:
                 openid = payload["sub"]
                 self.logger.info(f"Request contains valid token, loading user {openid}.")
-                user = self.user_repository.get(openid)
+                user = await self.user_repository.get_async(openid)
                 request.state.user = user
 
         response = await call_next(request)
@@ -1,22 +1,25 @@
 """Charge calculation routes."""
 
+import asyncio
 import uuid
 
 
-from typing import Annotated, Literal
+from typing import Annotated, AsyncIterator, Literal
 from fastapi import Depends, HTTPException, Path, Query, Request, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.routing import APIRouter
 from dependency_injector.wiring import inject, Provide
 
 from api.v1.exceptions import BadRequestError, NotFoundError
-from api.v1.schemas.response import Response, ResponseError
+from api.v1.schemas.response import Response, ResponseError, StreamEvent
 
 from models.calculation import (
     CalculationConfigDto,
+    CalculationDto,
     CalculationResultDto,
     CalculationSetPreviewDto,
 )
+from models.job import JobStatusDto
 from models.method import Method
 from models.molecule_info import MoleculeSetStats
 from models.paging import PagedList
@@ -40,9 +43,13 @@ from services.calculation_storage import CalculationStorageService
 from services.mmcif import MmCIFService
 from services.io import IOService
 from services.chargefw2 import ChargeFW2Service
+from services.jobs import JobService
 
 charges_router = APIRouter(prefix="/charges", tags=["charges"])
 
+# How often (in seconds) synchronous computations check whether the client is still connected
+DISCONNECT_CHECK_INTERVAL = 1.0
+
 # --- Public API handlers ---
 
 
@@ -318,12 +325,28 @@ async def calculate_charges(
     request: Request,
     data: CalculateChargesRequest,
     response_format: Annotated[
-        Literal["charges", "none"], Query(description="Output format.")
+        Literal["charges", "none", "stream"],
+        Query(
+            description="""
+            Output format. 'stream' emits each calculation as soon as its file is finished,
+            as newline delimited JSON or as server-sent events if 'Accept: text/event-stream' is sent.
+            """
+        ),
     ] = "charges",
+    mode: Annotated[
+        Literal["sync", "job"],
+        Query(
+            description="""
+            Run the computation before responding (sync)
+            or enqueue it and return its status immediately (job).
+            Status of a job can be polled at GET "/api/v1/charges/{computation_id}/status".
+            """
+        ),
+    ] = "sync",
     chargefw2: ChargeFW2Service = Depends(Provide[Container.chargefw2_service]),
     storage_service: CalculationStorageService = Depends(Provide[Container.storage_service]),
-    mmcif_service: MmCIFService = Depends(Provide[Container.mmcif_service]),
     io_service: IOService = Depends(Provide[Container.io_service]),
+    job_service: JobService = Depends(Provide[Container.job_service]),
 ):
     """
     Calculates partial atomic charges for files in the provided directory.
@@ -354,7 +377,7 @@ async def calculate_charges(
             )
 
     computation_id = data.computation_id or str(uuid.uuid4())
-    calculation_set = storage_service.get_calculation_set(computation_id)
+    calculation_set = await storage_service.get_calculation_set_async(computation_id)
 
     if not data.file_hashes and calculation_set is None:
         # if no file hashes provided and computation has not been set up
@@ -363,12 +386,18 @@ async def calculate_charges(
             detail="No file hashes provided.",
         )
 
-    settings = calculation_set.advanced_settings if calculation_set is not None else data.settings
+    settings = (
+        AdvancedSettingsDto.model_validate(calculation_set.advanced_settings)
+        if calculation_set is not None
+        else data.settings
+    )
 
     if settings is None:
         settings = AdvancedSettingsDto()
 
     try:
+        # duplicates are dropped before anything is done with the files
+        data.file_hashes = list(dict.fromkeys(data.file_hashes))
         io_service.prepare_inputs(user_id, computation_id, data.file_hashes)
 
         if not data.file_hashes:
@@ -385,8 +414,6 @@ async def calculate_charges(
                 detail="No file hashes provided.",
             )
 
-        data.file_hashes = list(set(data.file_hashes))
-
         total_size = sum(
             io_service.get_file_size(file_hash, user_id) or 0 for file_hash in data.file_hashes
         )
@@ -415,33 +442,38 @@ async def calculate_charges(
 
             configs = [CalculationConfigDto(method=method_name, parameters=parameters_name)]
 
+        plan = chargefw2.plan_computation(computation_id, settings, data.file_hashes, configs)
+
+        if mode == "job":
+            # existing calculations are filtered by the worker running the job
+            job_status = await job_service.enqueue(
+                computation_id, settings, plan.file_hashes, plan.configs, user_id
+            )
+            return Response(data=job_status)
+
         # split calculations into those that need to be calculated and those that are cached
-        to_calculate, cached = storage_service.filter_existing_calculations(
-            settings, data.file_hashes, configs
-        )
-        calculations = await chargefw2.calculate_charges(
-            computation_id, settings, to_calculate, user_id
+        to_calculate, cached = await storage_service.filter_existing_calculations_async(
+            settings, plan.file_hashes, plan.configs
         )
 
-        # add cached items to results
-        for result in calculations:
-            if result.config in cached:
-                result.calculations.extend(cached[result.config])
+        if response_format == "stream":
+            calculations = chargefw2.stream_computation(
+                computation_id, settings, to_calculate, cached, user_id
+            )
+            return _stream_response(request, computation_id, calculations)
 
-        calculations.extend(
-            [
-                CalculationResultDto(config=config, calculations=results)
-                for config, results in cached.items()
-            ]
+        computation = asyncio.ensure_future(
+            chargefw2.run_computation(computation_id, settings, to_calculate, cached, user_id)
         )
 
-        storage_service.store_calculation_results(computation_id, settings, calculations, user_id)
-        await chargefw2.save_charges(settings, computation_id, calculations, user_id)
-        _ = mmcif_service.write_to_mmcif(user_id, computation_id, calculations)
-
-        if user_id is None:
-            # free guest compute space if needed
-            io_service.free_guest_compute_space()
+        try:
+            calculations = await _cancel_on_disconnect(request, computation)
+        except asyncio.CancelledError as e:
+            if asyncio.current_task().cancelling() > 0:
+                raise e
+            raise BadRequestError(
+                status_code=status.HTTP_409_CONFLICT, detail="Computation was cancelled."
+            ) from e
 
         if response_format == "none":
             return Response(data=computation_id)
@@ -455,6 +487,208 @@ async def calculate_charges(
         ) from e
 
 
+async def _cancel_on_disconnect(request: Request, computation: asyncio.Future):
+    """Waits for the computation to finish. Cancels it if the client disconnects."""
+
+    try:
+        while not computation.done():
+            await asyncio.wait([computation], timeout=DISCONNECT_CHECK_INTERVAL)
+
+            if not computation.done() and await request.is_disconnected():
+                computation.cancel()
+                await asyncio.wait([computation])
+    except asyncio.CancelledError as e:
+        computation.cancel()
+        raise e
+
+    return computation.result()
+
+
+def _stream_response(
+    request: Request, computation_id: str, calculations: AsyncIterator[CalculationDto]
+) -> StreamingResponse:
+    """Streams calculations as NDJSON or as server-sent events (based on the Accept header)."""
+
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def serialize(event: StreamEvent) -> str:
+        payload = event.model_dump_json(by_alias=True)
+        return f"event: {event.event}\ndata: {payload}\n\n" if use_sse else f"{payload}\n"
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for calculation in calculations:
+                yield serialize(StreamEvent[CalculationDto](event="calculation", data=calculation))
+
+            yield serialize(StreamEvent[str](event="done", data=computation_id))
+        except Exception as e:
+            # response has already started, error is reported as the last event
+            yield serialize(
+                StreamEvent[None](event="error", message=f"Error calculating charges. {str(e)}")
+            )
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+@charges_router.get(
+    "/{computation_id}/status",
+    responses={
+        200: {
+            "description": "Status of the computation job.",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "success": True,
+                        "data": {
+                            "computationId": "0b9ee9e0-bd69-409d-a3af-3bf11666ee86",
+                            "status": "running",
+                            "files": [
+                                {
+                                    "fileHash": "4d689a346c6e852f21e3083025d827d7ba165c7c468d8a3c970216e9365fb3bd",
+                                    "total": 2,
+                                    "completed": 1,
+                                }
+                            ],
+                            "error": None,
+                            "createdAt": "2025-01-01T12:00:00Z",
+                            "startedAt": "2025-01-01T12:00:01Z",
+                            "finishedAt": None,
+                        },
+                    }
+                }
+            },
+        },
+        404: {
+            "description": "Job not found.",
+            "model": ResponseError,
+            "content": {
+                "application/json": {"example": {"success": False, "message": "Job not found."}}
+            },
+        },
+    },
+)
+@inject
+async def job_status(
+    request: Request,
+    computation_id: Annotated[str, Path(description="UUID of the computation.")],
+    job_service: JobService = Depends(Provide[Container.job_service]),
+) -> Response[JobStatusDto]:
+    """
+    Returns status of a computation started with `mode=job`.
+    Status is one of queued, running, done or failed and contains progress of each file.
+    """
+
+    user_id = str(request.state.user.id) if request.state.user is not None else None
+
+    try:
+        job = await job_service.get_status(computation_id, user_id)
+    except Exception as e:
+        raise BadRequestError(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Error getting job status."
+        ) from e
+
+    if job is None:
+        raise NotFoundError(detail=f"Job '{computation_id}' not found.")
+
+    return Response(data=job)
+
+
+@charges_router.post(
+    "/{computation_id}/cancel",
+    responses={
+        404: {
+            "description": "Computation not found or not running in this server process.",
+            "model": ResponseError,
+            "content": {
+                "application/json": {
+                    "example": {"success": False, "message": "Running computation not found."}
+                }
+            },
+        },
+    },
+)
+@inject
+async def cancel_computation(
+    request: Request,
+    computation_id: Annotated[str, Path(description="UUID of the computation.")],
+    chargefw2: ChargeFW2Service = Depends(Provide[Container.chargefw2_service]),
+    job_service: JobService = Depends(Provide[Container.job_service]),
+) -> Response[None]:
+    """
+    Cancels a running computation or a queued/running job.
+    Calculations which have not started yet are dropped,
+    charges which are already being calculated are discarded once finished.
+    Computations not started with `mode=job` can only be cancelled by the server process
+    running them, otherwise 404 is returned.
+    """
+
+    user_id = str(request.state.user.id) if request.state.user is not None else None
+
+    try:
+        cancelled = await job_service.cancel(computation_id, user_id) or chargefw2.cancel(
+            computation_id, user_id
+        )
+    except Exception as e:
+        raise BadRequestError(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Error cancelling computation."
+        ) from e
+
+    if not cancelled:
+        raise NotFoundError(detail="Running computation not found.")
+
+    return Response(data=None)
+
+
+@charges_router.get(
+    "/{computation_id}/results",
+    responses={
+        404: {
+            "description": "Computation not found.",
+            "model": ResponseError,
+            "content": {
+                "application/json": {
+                    "example": {"success": False, "message": "Computation not found."}
+                }
+            },
+        },
+    },
+)
+@inject
+async def computation_results(
+    request: Request,
+    computation_id: Annotated[str, Path(description="UUID of the computation.")],
+    file_hash: Annotated[str | None, Query(description="Return only results of this file.")] = None,
+    molecule: Annotated[
+        str | None, Query(description="Return only charges of this molecule.")
+    ] = None,
+    include_charges: Annotated[
+        bool,
+        Query(description="Whether to return charges (only files and configs are returned otherwise)."),
+    ] = True,
+    storage_service: CalculationStorageService = Depends(Provide[Container.storage_service]),
+) -> Response[list[CalculationResultDto]]:
+    """Returns results of a finished computation (e.g. a computation started with `mode=job`)."""
+
+    user_id = str(request.state.user.id) if request.state.user is not None else None
+
+    calculation_set = await storage_service.get_calculation_set_async(computation_id)
+    set_user_id = str(calculation_set.user_id) if calculation_set is not None else None
+
+    if calculation_set is None or set_user_id != user_id:
+        raise NotFoundError(detail="Computation not found.")
+
+    try:
+        results = await storage_service.get_calculation_results_async(
+            computation_id, file_hash, molecule, include_charges
+        )
+        return Response(data=results)
+    except Exception as e:
+        raise BadRequestError(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Error getting computation results."
+        ) from e
+
+
 # --- Route handlers used by ACC II Web ---
 
 
@@ -502,6 +736,8 @@ async def setup(
                 + f"Maximum storage space is {quota_mb} MB.",
             )
 
+    config.file_hashes = list(dict.fromkeys(config.file_hashes))
+
     total_size = sum(
         io_service.get_file_size(file_hash, user_id) or 0 for file_hash in config.file_hashes
     )
@@ -547,7 +783,7 @@ async def get_mmcif(
     user_id = str(request.state.user.id) if request.state.user is not None else None
 
     # this is a workaround because molstar is not able to send cookies when fetching mmcif
-    set_exists = storage_service.get_calculation_set(computation_id)
+    set_exists = await storage_service.get_calculation_set_async(computation_id)
     if set_exists is not None and set_exists.user_id is not None:
         user_id = str(set_exists.user_id)
 
@@ -641,6 +877,10 @@ async def get_calculations(
     page_size: Annotated[int, Query(description="Number of items per page.")] = 10,
     order_by: Annotated[Literal["created_at"], Query(description="Order by field.")] = "created_at",
     order: Annotated[Literal["asc", "desc"], Query(description="Order direction.")] = "desc",
+    cursor: Annotated[
+        str | None,
+        Query(description="Cursor of the previous page ('nextCursor'), 'page' is ignored if set."),
+    ] = None,
     storage_service: CalculationStorageService = Depends(Provide[Container.storage_service]),
 ) -> Response[PagedList[CalculationSetPreviewDto]]:
     """Returns all calculations stored in the database."""
@@ -654,9 +894,14 @@ async def get_calculations(
 
     try:
         filters = CalculationSetFilters(
-            order=order, order_by=order_by, page=page, page_size=page_size, user_id=user_id
+            order=order,
+            order_by=order_by,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            user_id=user_id,
         )
-        calculations = storage_service.get_calculations(filters)
+        calculations = await storage_service.get_calculations_async(filters)
         return Response(data=calculations)
     except Exception as e:
         raise BadRequestError(
@@ -681,7 +926,7 @@ async def delete_calculation(
             detail="You need to be logged in to delete calculations.",
         )
 
-    exists = storage_service.get_calculation_set(computation_id)
+    exists = await storage_service.get_calculation_set_async(computation_id)
 
     if not exists or str(exists.user_id) != user_id:
         raise NotFoundError(detail="Computation not found.")
@@ -1,13 +1,15 @@
 """File manipulation routes."""
 
 import asyncio
+import datetime
+from email.utils import format_datetime, parsedate_to_datetime
 import traceback
 
 import pathlib
 
 from typing import Annotated, Literal
 from fastapi import Depends, Path, Query, Request, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response as HTTPResponse, StreamingResponse
 from fastapi.routing import APIRouter
 from dependency_injector.wiring import inject, Provide
 
@@ -20,6 +22,7 @@ from api.v1.exceptions import BadRequestError, NotFoundError
 from models.paging import PagedList
 
 
+from services.archive_cache import ChargesArchive
 from services.file_storage import FileStorageService
 from services.chargefw2 import ChargeFW2Service
 from services.calculation_storage import CalculationStorageService
@@ -71,9 +74,11 @@ async def upload(
 ) -> Response[list[UploadResponse]]:
     """Stores the provided files on disk and returns the computation id."""
 
-    def clear_stored_files(files: list[str]) -> None:
-        for file in files:
-            io.remove_file(file)
+    def clear_stored_files(stored_files: list[tuple[str, str, bool]], user_id: str | None) -> None:
+        # files uploaded before are kept
+        for path, _, is_new in stored_files:
+            if is_new:
+                io.remove_uploaded_file(path, user_id)
 
     try:
         io.ensure_upload_files_provided(files)
@@ -89,26 +94,42 @@ async def upload(
         io.create_dir(workdir)
 
         stored_files = await asyncio.gather(
-            *[io.store_upload_file(file, workdir) for file in files]
+            *[io.store_upload_file(file, workdir, user_id) for file in files]
         )
 
-        for [path, file_hash] in stored_files:
-            try:
-                info = await chargefw2.info(path)
-            except RuntimeError:
-                # Remove files that were uploaded if an error occurs
-                clear_stored_files([path for [path, _] in stored_files])
-                _, filename = io.parse_filename(pathlib.Path(path).name)
-                raise BadRequestError(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Unable to load molecules from file '{filename}'.",
-                )
-
-            storage_service.store_file_info(file_hash, info)
+        try:
+            # files are parsed in parallel, errors are reported for the first failed file
+            analyses = await chargefw2.analyze_files([path for [path, _, _] in stored_files])
+
+            for [path, _, _], analysis in zip(stored_files, analyses):
+                if isinstance(analysis, RuntimeError):
+                    _, filename = io.parse_filename(pathlib.Path(path).name)
+                    raise BadRequestError(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Unable to load molecules from file '{filename}'.",
+                    )
+
+                if isinstance(analysis, BaseException):
+                    raise analysis
+
+            storage_service.store_files_info(
+                {
+                    file_hash: analysis.info
+                    for [_, file_hash, _], analysis in zip(stored_files, analyses)
+                },
+                {
+                    file_hash: analysis.suitable_methods
+                    for [_, file_hash, _], analysis in zip(stored_files, analyses)
+                },
+            )
+        except Exception as e:
+            # Remove files that were uploaded if an error occurs
+            clear_stored_files(stored_files, user_id)
+            raise e
 
         data = [
             UploadResponse(file=io.parse_filename(pathlib.Path(name).name)[1], file_hash=file_hash)
-            for [name, file_hash] in stored_files
+            for [name, file_hash, _] in stored_files
         ]
 
         return Response(data=data)
@@ -126,6 +147,7 @@ async def upload(
     "/download/computation/{computation_id}",
     responses={
         200: {"description": "Successful response.", "content": {"application/zip": {}}},
+        304: {"description": "Archive not modified (ETag/Last-Modified)."},
         404: {
             "description": "Computation not found",
             "model": ResponseError,
@@ -151,7 +173,7 @@ async def download_charges(
     request: Request,
     computation_id: Annotated[str, Path(description="UUID of the computation.")],
     io: IOService = Depends(Provide[Container.io_service]),
-) -> FileResponse:
+) -> HTTPResponse:
     """Returns a zip file with all charges for the provided computation."""
 
     user_id = str(request.state.user.id) if request.state.user is not None else None
@@ -161,9 +183,9 @@ async def download_charges(
         if not io.path_exists(charges_path):
             raise FileNotFoundError()
 
-        archive_path = io.zip_charges(charges_path)
+        archive = io.get_charges_archive(charges_path)
 
-        return FileResponse(path=archive_path, media_type="application/zip")
+        return _archive_response(request, archive)
     except FileNotFoundError as e:
         raise NotFoundError(detail=f"Computation '{computation_id}' not found.") from e
     except Exception as e:
@@ -172,6 +194,50 @@ async def download_charges(
         ) from e
 
 
+def _archive_response(request: Request, archive: ChargesArchive) -> HTTPResponse:
+    """Returns the provided archive, or 304 Not Modified if the client already has it."""
+
+    etag = f'"{archive.fingerprint}"'
+    # HTTP dates have a resolution of seconds
+    last_modified = archive.last_modified.astimezone(datetime.timezone.utc).replace(microsecond=0)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if _is_not_modified(request, etag, last_modified):
+        return HTTPResponse(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if archive.path is not None:
+        return FileResponse(path=archive.path, media_type="application/zip", headers=headers)
+
+    return StreamingResponse(archive.chunks, media_type="application/zip", headers=headers)
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: datetime.datetime) -> bool:
+    """Evaluates conditional request headers (If-None-Match takes precedence)."""
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+
+        return last_modified <= since
+
+    return False
+
+
 @files_router.get(
     "/download/file/{file_hash}",
     responses={
@@ -244,7 +310,7 @@ async def get_files(
         )
 
     try:
-        data = storage_service.get_files(
+        data = await storage_service.get_files_async(
             order_by=order_by,
             order=order,
             page=page,
@@ -264,17 +330,18 @@ async def get_files(
 @files_router.get("/download/examples/{example_id}", include_in_schema=False)
 @inject
 async def download_example(
+    request: Request,
     example_id: Annotated[str, Path(description="ID of the example.", example="phenols")],
     io: IOService = Depends(Provide[Container.io_service]),
-) -> FileResponse:
+) -> HTTPResponse:
     try:
         charges_path = io.get_example_path(example_id)
         if not io.path_exists(charges_path):
             raise FileNotFoundError()
 
-        archive_path = io.zip_charges(charges_path)
+        archive = io.get_charges_archive(charges_path)
 
-        return FileResponse(path=archive_path, media_type="application/zip")
+        return _archive_response(request, archive)
     except FileNotFoundError as e:
         raise NotFoundError(detail=f"Example '{example_id}' not found.") from e
     except Exception as e:
@@ -335,3 +402,4 @@ async def delete_file(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error deleting files.",
         ) from e
+
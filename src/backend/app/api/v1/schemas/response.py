@@ -1,5 +1,7 @@
 """Response schemas for API endpoints."""
 
+from typing import Literal
+
 from api.v1.schemas.base_response import BaseResponseSchema
 
 
@@ -15,3 +17,11 @@ class ResponseError(BaseResponseSchema):
 
     success: bool = False
     message: str
+
+
+class StreamEvent[T](BaseResponseSchema):
+    """Single event of a streamed response."""
+
+    event: Literal["calculation", "done", "error"]
+    data: T | None = None
+    message: str | None = None
@@ -11,7 +11,9 @@ from alembic import context
 from db.schemas import Base  # noqa: F401
 
 from db.schemas.calculation import *  # noqa: F401
+from db.schemas.job import *  # noqa: F401
 from db.schemas.stats import *  # noqa: F401
+from db.schemas.storage_usage import *  # noqa: F401
 from db.schemas.user import *  # noqa: F401
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,109 @@
+"""calculation configs nulls not distinct
+
+Revision ID: 6c2f8b3d1a94
+Revises: 4b8e1f7a9d35
+Create Date: 2025-06-12 14:22:08.913604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2f8b3d1a94'
+down_revision: Union[str, None] = '4b8e1f7a9d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT_NAME = 'calculation_configs_method_parameters_key'
+CALCULATIONS_INDEX_NAME = 'ix_calculations_file_hash_config_id_advanced_settings_id'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # configs without parameters could be duplicated (NULLs are distinct), merge them into one
+    op.execute(
+        sa.text(
+            """
+            CREATE TEMPORARY TABLE config_duplicates ON COMMIT DROP AS
+            SELECT id, kept_id FROM (
+                SELECT id, FIRST_VALUE(id) OVER (
+                    PARTITION BY method, parameters ORDER BY id
+                ) AS kept_id
+                FROM calculation_configs
+            ) AS configs
+            WHERE id != kept_id
+            """
+        )
+    )
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO calculation_set_configs (calculation_set_id, config_id)
+            SELECT DISTINCT set_configs.calculation_set_id, duplicates.kept_id
+            FROM calculation_set_configs AS set_configs
+            JOIN config_duplicates AS duplicates ON duplicates.id = set_configs.config_id
+            ON CONFLICT DO NOTHING
+            """
+        )
+    )
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM calculation_set_configs
+            USING config_duplicates AS duplicates
+            WHERE calculation_set_configs.config_id = duplicates.id
+            """
+        )
+    )
+
+    # calculations of merged configs may collide, keep one of each
+    op.drop_index(CALCULATIONS_INDEX_NAME, table_name='calculations')
+    op.execute(
+        sa.text(
+            """
+            UPDATE calculations
+            SET config_id = duplicates.kept_id
+            FROM config_duplicates AS duplicates
+            WHERE calculations.config_id = duplicates.id
+            """
+        )
+    )
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM calculations
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY file_hash, config_id, advanced_settings_id ORDER BY id
+                    ) AS row_number
+                    FROM calculations
+                ) AS numbered
+                WHERE numbered.row_number > 1
+            )
+            """
+        )
+    )
+    op.create_index(CALCULATIONS_INDEX_NAME, 'calculations', ['file_hash', 'config_id', 'advanced_settings_id'], unique=True)
+
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM calculation_configs
+            USING config_duplicates AS duplicates
+            WHERE calculation_configs.id = duplicates.id
+            """
+        )
+    )
+
+    op.drop_constraint(CONSTRAINT_NAME, 'calculation_configs', type_='unique')
+    op.create_unique_constraint(CONSTRAINT_NAME, 'calculation_configs', ['method', 'parameters'], postgresql_nulls_not_distinct=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint(CONSTRAINT_NAME, 'calculation_configs', type_='unique')
+    op.create_unique_constraint(CONSTRAINT_NAME, 'calculation_configs', ['method', 'parameters'])
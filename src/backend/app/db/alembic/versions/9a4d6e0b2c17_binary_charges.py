@@ -0,0 +1,87 @@
+"""binary charges
+
+Revision ID: 9a4d6e0b2c17
+Revises: e7b2d5c81f43
+Create Date: 2025-06-05 15:22:08.731642
+
+"""
+from typing import Callable, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db.schemas.charges import decode_charges, encode_charges
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d6e0b2c17'
+down_revision: Union[str, None] = 'e7b2d5c81f43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# number of rows converted at once
+BATCH_SIZE = 500
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('calculations', sa.Column('charges_binary', sa.LargeBinary(), nullable=True))
+    _convert('charges', sa.JSON(), 'charges_binary', sa.LargeBinary(), encode_charges)
+    op.drop_column('calculations', 'charges')
+    op.alter_column('calculations', 'charges_binary', new_column_name='charges', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('calculations', sa.Column('charges_json', sa.JSON(), nullable=True))
+    _convert(
+        'charges',
+        sa.LargeBinary(),
+        'charges_json',
+        sa.JSON(),
+        lambda value: dict(decode_charges(value)),
+    )
+    op.drop_column('calculations', 'charges')
+    op.alter_column('calculations', 'charges_json', new_column_name='charges', nullable=False)
+
+
+def _convert(
+    source: str,
+    source_type: sa.types.TypeEngine,
+    target: str,
+    target_type: sa.types.TypeEngine,
+    convert: Callable,
+) -> None:
+    """Converts values of the source column to the target column in batches ordered by id."""
+    connection = op.get_bind()
+    calculations = sa.table(
+        'calculations',
+        sa.column('id', sa.Uuid()),
+        sa.column(source, source_type),
+        sa.column(target, target_type),
+    )
+    last_id = None
+
+    while True:
+        statement = (
+            sa.select(calculations.c.id, calculations.c[source])
+            .order_by(calculations.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            statement = statement.where(calculations.c.id > last_id)
+
+        rows = connection.execute(statement).all()
+        if not rows:
+            break
+
+        connection.execute(
+            sa.update(calculations)
+            .where(calculations.c.id == sa.bindparam('calculation_id'))
+            .values({target: sa.bindparam('value', type_=target_type)}),
+            [
+                {'calculation_id': calculation_id, 'value': convert(value)}
+                for calculation_id, value in rows
+            ],
+        )
+        last_id = rows[-1][0]
@@ -0,0 +1,41 @@
+"""suitable methods computed
+
+Revision ID: a8d3f6b2c9e4
+Revises: f1c4e8a2b6d3
+Create Date: 2025-06-18 14:05:12.804391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3f6b2c9e4'
+down_revision: Union[str, None] = 'f1c4e8a2b6d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('suitable_methods_computed',
+    sa.Column('molecule_set_id', sa.VARCHAR(length=100), nullable=False),
+    sa.Column('permissive_types', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['molecule_set_id'], ['molecule_set_stats.file_hash'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('molecule_set_id', 'permissive_types')
+    )
+
+    # files with stored methods were computed, files without any suitable method are computed again
+    op.execute(
+        """
+        INSERT INTO suitable_methods_computed (molecule_set_id, permissive_types)
+        SELECT DISTINCT molecule_set_id, permissive_types FROM suitable_methods
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('suitable_methods_computed')
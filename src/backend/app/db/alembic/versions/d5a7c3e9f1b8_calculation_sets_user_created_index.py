@@ -0,0 +1,27 @@
+"""calculation sets user created index
+
+Revision ID: d5a7c3e9f1b8
+Revises: 6c2f8b3d1a94
+Create Date: 2025-06-13 10:05:41.276518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a7c3e9f1b8'
+down_revision: Union[str, None] = '6c2f8b3d1a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_calculation_sets_user_id_created_at', 'calculation_sets', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_calculation_sets_user_id_created_at', table_name='calculation_sets')
@@ -0,0 +1,45 @@
+"""calculations unique index
+
+Revision ID: e7b2d5c81f43
+Revises: c3e1f4a92b70
+Create Date: 2025-06-03 09:41:26.304815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2d5c81f43'
+down_revision: Union[str, None] = 'c3e1f4a92b70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # remove duplicate calculations created by concurrent workers, keep one of each
+    op.execute(
+        sa.text(
+            """
+            DELETE FROM calculations
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY file_hash, config_id, advanced_settings_id ORDER BY id
+                    ) AS row_number
+                    FROM calculations
+                ) AS numbered
+                WHERE numbered.row_number > 1
+            )
+            """
+        )
+    )
+    op.create_index('ix_calculations_file_hash_config_id_advanced_settings_id', 'calculations', ['file_hash', 'config_id', 'advanced_settings_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_calculations_file_hash_config_id_advanced_settings_id', table_name='calculations')
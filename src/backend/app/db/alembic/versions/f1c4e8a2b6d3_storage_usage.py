@@ -0,0 +1,34 @@
+"""storage usage
+
+Revision ID: f1c4e8a2b6d3
+Revises: d5a7c3e9f1b8
+Create Date: 2025-06-16 09:41:27.538104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c4e8a2b6d3'
+down_revision: Union[str, None] = 'd5a7c3e9f1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('storage_usage',
+    sa.Column('owner', sa.VARCHAR(length=36), nullable=False),
+    sa.Column('files_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('computations_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('owner')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('storage_usage')
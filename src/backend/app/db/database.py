@@ -1,9 +1,15 @@
 """Database connection manager."""
 
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker, scoped_session
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+
+# driver used by the async engine
+ASYNC_DRIVER = "postgresql+asyncpg"
 
 
 class Database:
@@ -40,3 +46,42 @@ class SessionManager:
             raise
         finally:
             session.close()
+
+
+class AsyncDatabase:
+    """Async database connection using the asyncpg driver.
+
+    It uses the same connection string as `Database`, only the driver is replaced.
+    """
+
+    def __init__(self, db_url: str):
+        self._engine = create_async_engine(
+            make_url(db_url).set(drivername=ASYNC_DRIVER), pool_size=20, max_overflow=10
+        )
+        self.session_factory = async_sessionmaker(
+            bind=self._engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+
+class AsyncSessionManager:
+    """Async database session manager. Objects loaded using its sessions
+    can not lazy load relationships, so everything needed has to be loaded eagerly."""
+
+    def __init__(self, session_factory):
+        self._session_factory = session_factory
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """Provide a transactional scope."""
+
+        session: AsyncSession = self._session_factory()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
@@ -0,0 +1,83 @@
+"""In-process cache of ids of dimension rows (advanced settings and calculation configs)."""
+
+import threading
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# (read_hetatm, ignore_water, permissive_types)
+SettingsKey = tuple[bool, bool, bool]
+# (method, parameters)
+ConfigKey = tuple[str, str | None]
+
+# key in `Session.info` holding ids loaded or created in the current transaction
+_PENDING_KEY = "dimension_cache_pending"
+
+
+class DimensionCache:
+    """Write-through cache mapping values of advanced settings and calculation configs to their ids.
+
+    Both tables are small, unique by value, and their rows are never updated nor deleted,
+    so a cached id stays valid for the whole lifetime of the process and workers never need
+    to invalidate each other. A worker which has not seen a row created by another worker yet
+    simply falls back to the database.
+
+    Ids are cached only after the transaction which loaded or created them commits,
+    so ids of rows whose insert is rolled back are never cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settings: dict[SettingsKey, uuid.UUID] = {}
+        self._configs: dict[ConfigKey, uuid.UUID] = {}
+
+    def get_settings_id(self, key: SettingsKey) -> uuid.UUID | None:
+        """Returns cached id of advanced settings or None."""
+
+        return self._settings.get(key)
+
+    def get_config_id(self, key: ConfigKey) -> uuid.UUID | None:
+        """Returns cached id of a calculation config or None."""
+
+        return self._configs.get(key)
+
+    def add_settings(self, session: Session, key: SettingsKey, settings_id: uuid.UUID) -> None:
+        """Caches id of advanced settings once the current transaction of the session commits."""
+
+        self._add_pending(session, self._settings, key, settings_id)
+
+    def add_config(self, session: Session, key: ConfigKey, config_id: uuid.UUID) -> None:
+        """Caches id of a calculation config once the current transaction of the session commits."""
+
+        self._add_pending(session, self._configs, key, config_id)
+
+    def clear(self) -> None:
+        """Removes all cached ids."""
+
+        with self._lock:
+            self._settings.clear()
+            self._configs.clear()
+
+    def _add_pending(self, session: Session, entries: dict, key: tuple, value: uuid.UUID) -> None:
+        session.info.setdefault(_PENDING_KEY, []).append((self, entries, key, value))
+
+    def _put(self, entries: dict, key: tuple, value: uuid.UUID) -> None:
+        with self._lock:
+            entries[key] = value
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    # releasing a savepoint does not commit anything yet
+    if session.in_nested_transaction():
+        return
+
+    for cache, entries, key, value in session.info.pop(_PENDING_KEY, []):
+        cache._put(entries, key, value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    # also called when a savepoint is rolled back, the ids are just loaded again later
+    session.info.pop(_PENDING_KEY, None)
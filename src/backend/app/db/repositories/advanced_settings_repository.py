@@ -1,9 +1,11 @@
 """This module provides a repository for calculation sets."""
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 
+from db.dimension_cache import DimensionCache, SettingsKey
 from db.schemas.calculation import AdvancedSettings
 from models.setup import AdvancedSettingsDto
 
@@ -11,6 +13,9 @@ from models.setup import AdvancedSettingsDto
 class AdvancedSettingsRepository:
     """Repository for managing calculation sets."""
 
+    def __init__(self, dimension_cache: DimensionCache | None = None):
+        self.dimension_cache = dimension_cache
+
     def get(self, session: Session, settings: AdvancedSettingsDto) -> AdvancedSettings | None:
         """Get Advanced Calculation Settings from database.
 
@@ -21,23 +26,84 @@ class AdvancedSettingsRepository:
             AdvancedSettings: Advanced calculation settings.
         """
 
-        statement = select(AdvancedSettings).where(
-            and_(
-                AdvancedSettings.ignore_water == settings.ignore_water,
-                AdvancedSettings.read_hetatm == settings.read_hetatm,
-                AdvancedSettings.permissive_types == settings.permissive_types,
-            )
-        )
+        statement = self._get_statement(settings)
 
         advanced_settings = (session.execute(statement)).unique().scalars(AdvancedSettings).first()
 
         return advanced_settings
 
+    def get_id(self, session: Session, settings: AdvancedSettingsDto) -> str | None:
+        """Get id of Advanced Calculation Settings, the database is queried only on cache miss.
+
+        Args:
+            settings (AdvancedSettingsDto): Advanced calculation settings.
+
+        Returns:
+            str | None: Id of the settings or None if they are not stored.
+        """
+
+        key = self._get_key(settings)
+
+        if self.dimension_cache is not None:
+            settings_id = self.dimension_cache.get_settings_id(key)
+            if settings_id is not None:
+                return settings_id
+
+        settings_id = (session.execute(self._get_id_statement(settings))).scalar()
+        self._cache(session, key, settings_id)
+
+        return settings_id
+
+    async def get_id_async(
+        self, session: AsyncSession, settings: AdvancedSettingsDto
+    ) -> str | None:
+        """Async variant of `get_id`."""
+
+        key = self._get_key(settings)
+
+        if self.dimension_cache is not None:
+            settings_id = self.dimension_cache.get_settings_id(key)
+            if settings_id is not None:
+                return settings_id
+
+        settings_id = (await session.execute(self._get_id_statement(settings))).scalar()
+        self._cache(session, key, settings_id)
+
+        return settings_id
+
     def store(self, session: Session, advanced_settings: AdvancedSettings) -> None:
         """Store an Advanced Calculation Settings in the database.
+        Settings are flushed, so that they can be referenced by id.
 
         Args:
             advanced_settings (AdvancedSettings): Advanced calculation settings.
         """
 
         session.add(advanced_settings)
+        session.flush()
+
+        key = (
+            advanced_settings.read_hetatm,
+            advanced_settings.ignore_water,
+            advanced_settings.permissive_types,
+        )
+        self._cache(session, key, advanced_settings.id)
+
+    def _get_statement(self, settings: AdvancedSettingsDto) -> Select:
+        return select(AdvancedSettings).where(
+            and_(
+                AdvancedSettings.ignore_water == settings.ignore_water,
+                AdvancedSettings.read_hetatm == settings.read_hetatm,
+                AdvancedSettings.permissive_types == settings.permissive_types,
+            )
+        )
+
+    def _get_id_statement(self, settings: AdvancedSettingsDto) -> Select:
+        return self._get_statement(settings).with_only_columns(AdvancedSettings.id)
+
+    def _get_key(self, settings: AdvancedSettingsDto) -> SettingsKey:
+        return (settings.read_hetatm, settings.ignore_water, settings.permissive_types)
+
+    def _cache(self, session: Session | AsyncSession, key: SettingsKey, settings_id) -> None:
+        if self.dimension_cache is not None and settings_id is not None:
+            self.dimension_cache.add_settings(session, key, settings_id)
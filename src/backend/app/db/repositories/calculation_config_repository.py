@@ -1,9 +1,11 @@
 """This module provides a repository for calculation configs."""
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 
+from db.dimension_cache import ConfigKey, DimensionCache
 from db.schemas.calculation import CalculationConfig
 from db.repositories.calculation_set_repository import CalculationSetRepository
 
@@ -14,8 +16,10 @@ class CalculationConfigRepository:
     def __init__(
         self,
         set_repository: CalculationSetRepository,
+        dimension_cache: DimensionCache | None = None,
     ):
         self.set_repository = set_repository
+        self.dimension_cache = dimension_cache
 
     def get(
         self, session: Session, method: str, parameters: str | None
@@ -30,12 +34,74 @@ class CalculationConfigRepository:
             CalculationConfig | None: Calculation config or None if not found.
         """
 
-        statement = select(CalculationConfig).where(
+        statement = self._get_statement(method, parameters)
+
+        config = (session.execute(statement)).scalars().first()
+        return config
+
+    def get_id(self, session: Session, method: str, parameters: str | None) -> str | None:
+        """Get id of a calculation config, the database is queried only on cache miss.
+
+        Args:
+            method (str): Empirical method.
+            parameters (str | None): Method parameters (if any).
+
+        Returns:
+            str | None: Id of the config or None if it is not stored.
+        """
+
+        key = (method, parameters)
+
+        if self.dimension_cache is not None:
+            config_id = self.dimension_cache.get_config_id(key)
+            if config_id is not None:
+                return config_id
+
+        statement = self._get_statement(method, parameters).with_only_columns(CalculationConfig.id)
+        config_id = (session.execute(statement)).scalar()
+        self._cache(session, key, config_id)
+
+        return config_id
+
+    async def get_id_async(
+        self, session: AsyncSession, method: str, parameters: str | None
+    ) -> str | None:
+        """Async variant of `get_id`."""
+
+        key = (method, parameters)
+
+        if self.dimension_cache is not None:
+            config_id = self.dimension_cache.get_config_id(key)
+            if config_id is not None:
+                return config_id
+
+        statement = self._get_statement(method, parameters).with_only_columns(CalculationConfig.id)
+        config_id = (await session.execute(statement)).scalar()
+        self._cache(session, key, config_id)
+
+        return config_id
+
+    def store(self, session: Session, config: CalculationConfig) -> None:
+        """Store a calculation config in the database.
+        Config is flushed, so that it can be referenced by id.
+
+        Args:
+            config (CalculationConfig): Calculation config.
+        """
+
+        session.add(config)
+        session.flush()
+
+        self._cache(session, (config.method, config.parameters), config.id)
+
+    def _get_statement(self, method: str, parameters: str | None) -> Select:
+        return select(CalculationConfig).where(
             and_(
                 CalculationConfig.method == method,
                 CalculationConfig.parameters == parameters,
             )
         )
 
-        config = (session.execute(statement)).scalars().first()
-        return config
+    def _cache(self, session: Session | AsyncSession, key: ConfigKey, config_id) -> None:
+        if self.dimension_cache is not None and config_id is not None:
+            self.dimension_cache.add_config(session, key, config_id)
@@ -1,14 +1,31 @@
 """This module provides a repository for calculations."""
 
+import uuid
+
 from sqlalchemy import and_, Select, func, select
-from sqlalchemy.orm import joinedload, Session
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, defer, joinedload, Session
 
 
 from models.paging import PagedList
 from models.calculation import CalculationsFilters
 
-from db.schemas.calculation import AdvancedSettings, Calculation, CalculationConfig
+from db.schemas.calculation import (
+    AdvancedSettings,
+    Calculation,
+    CalculationConfig,
+    CalculationSet,
+    CalculationSetConfig,
+    CalculationSetStats,
+)
 from db.repositories.calculation_set_repository import CalculationSetRepository
+from db.schemas.charges import encoded_charges_size
+
+# rows inserted by a single statement (stays well below the limit of bind parameters)
+INSERT_BATCH_SIZE = 1000
+# encoded charges inserted by a single statement (large files would make huge statements)
+INSERT_BATCH_BYTES = 64 * 1024 * 1024  # 64 MB
 
 
 class CalculationRepository:
@@ -50,20 +67,266 @@ class CalculationRepository:
         calculation = (session.execute(statement)).unique().scalars().first()
         return calculation
 
+    def get_all_for_files(
+        self,
+        session: Session,
+        file_hashes: list[str],
+        config_ids: list[str],
+        advanced_settings_id: str,
+    ) -> list[Calculation]:
+        """Get all previous calculations of the provided files with any of the provided configs
+        and settings using a single query. Configs and settings are filtered by id,
+        so their tables are not joined.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+            config_ids (list[str]): Ids of the configs of the calculations.
+            advanced_settings_id (str): Id of the advanced settings of the calculations.
+
+        Returns:
+            list[Calculation]: Matching calculations.
+        """
+
+        if not file_hashes or not config_ids:
+            return []
+
+        statement = self._get_all_for_files_statement(
+            file_hashes, config_ids, advanced_settings_id
+        )
+
+        return list((session.execute(statement)).scalars().all())
+
+    async def get_all_for_files_async(
+        self,
+        session: AsyncSession,
+        file_hashes: list[str],
+        config_ids: list[str],
+        advanced_settings_id: str,
+    ) -> list[Calculation]:
+        """Async variant of `get_all_for_files`."""
+
+        if not file_hashes or not config_ids:
+            return []
+
+        statement = self._get_all_for_files_statement(
+            file_hashes, config_ids, advanced_settings_id
+        )
+
+        return list((await session.execute(statement)).scalars().all())
+
+    def _get_all_for_files_statement(
+        self,
+        file_hashes: list[str],
+        config_ids: list[str],
+        advanced_settings_id: str,
+    ) -> Select:
+        return select(Calculation).where(
+            and_(
+                Calculation.file_hash.in_(set(file_hashes)),
+                Calculation.config_id.in_(set(config_ids)),
+                Calculation.advanced_settings_id == advanced_settings_id,
+            )
+        )
+
+    def get_for_set(
+        self,
+        session: Session,
+        calculation_set_id: str,
+        file_hash: str | None = None,
+        load_charges: bool = True,
+    ) -> list[tuple[Calculation, str | None]]:
+        """Get calculations of a calculation set ordered by config and file name.
+
+        Calculations belong to a set if they match one of its configs, one of its files and its settings.
+
+        Args:
+            calculation_set_id (str): Id of the calculation set.
+            file_hash (str | None, optional): Return only calculations of this file. Defaults to None.
+            load_charges (bool, optional): Whether to load charges, they are deferred otherwise.
+                Defaults to True.
+
+        Returns:
+            list[tuple[Calculation, str | None]]: Calculations (with config loaded)
+                together with the file name used in the set.
+        """
+
+        statement = self._get_for_set_statement(calculation_set_id, file_hash, load_charges)
+
+        return [(calculation, file_name) for calculation, file_name in session.execute(statement)]
+
+    async def get_for_set_async(
+        self,
+        session: AsyncSession,
+        calculation_set_id: str,
+        file_hash: str | None = None,
+        load_charges: bool = True,
+    ) -> list[tuple[Calculation, str | None]]:
+        """Async variant of `get_for_set`."""
+
+        statement = self._get_for_set_statement(calculation_set_id, file_hash, load_charges)
+
+        return [
+            (calculation, file_name)
+            for calculation, file_name in await session.execute(statement)
+        ]
+
+    def _get_for_set_statement(
+        self, calculation_set_id: str, file_hash: str | None, load_charges: bool
+    ) -> Select:
+        statement = (
+            select(Calculation, CalculationSetStats.file_name)
+            .join(Calculation.config)
+            .join(
+                CalculationSetConfig,
+                and_(
+                    CalculationSetConfig.config_id == Calculation.config_id,
+                    CalculationSetConfig.calculation_set_id == calculation_set_id,
+                ),
+            )
+            .join(
+                CalculationSetStats,
+                and_(
+                    CalculationSetStats.molecule_set_id == Calculation.file_hash,
+                    CalculationSetStats.calculation_set_id == calculation_set_id,
+                ),
+            )
+            .join(
+                CalculationSet,
+                and_(
+                    CalculationSet.id == calculation_set_id,
+                    CalculationSet.advanced_settings_id == Calculation.advanced_settings_id,
+                ),
+            )
+            .options(contains_eager(Calculation.config))
+            .order_by(
+                CalculationConfig.method,
+                CalculationConfig.parameters,
+                CalculationSetStats.file_name,
+            )
+        )
+
+        if file_hash is not None:
+            statement = statement.where(Calculation.file_hash == file_hash)
+
+        if not load_charges:
+            statement = statement.options(defer(Calculation.charges))
+
+        return statement
+
+    def get_existing_charges_paths(
+        self,
+        session: Session,
+        file_hashes: list[str],
+        config_ids: list[str],
+        advanced_settings_id: str,
+    ) -> dict[tuple[str, str], str | None]:
+        """Get (file_hash, config_id) pairs of stored calculations without loading their charges.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+            config_ids (list[str]): Ids of the configs.
+            advanced_settings_id (str): Id of the advanced settings.
+
+        Returns:
+            dict[tuple[str, str], str | None]: Pairs of file hash and config id having
+                a calculation stored, mapped to the path of their charges in the charges store
+                (None if charges are stored in the database).
+        """
+
+        if not file_hashes or not config_ids:
+            return {}
+
+        statement = select(
+            Calculation.file_hash, Calculation.config_id, Calculation.charges_path
+        ).where(
+            and_(
+                Calculation.file_hash.in_(set(file_hashes)),
+                Calculation.config_id.in_(set(config_ids)),
+                Calculation.advanced_settings_id == advanced_settings_id,
+            )
+        )
+
+        return {
+            (file_hash, config_id): charges_path
+            for file_hash, config_id, charges_path in session.execute(statement)
+        }
+
     def store(self, session: Session, calculation: Calculation) -> Calculation:
-        """Store a single calculation set in the database.
+        """Store a single calculation in the database.
+        Calculation with the same file hash, config and settings which already exists
+        (e.g. stored by a concurrent worker) is kept and the provided one is skipped.
 
         Args:
-            calculation_set (Calculation): Calculation to store.
+            calculation (Calculation): Calculation to store (with 'config_id' and 'advanced_settings_id' set).
 
         Returns:
-            Calculation: Stored calculation set.
+            Calculation: Provided calculation.
         """
 
-        session.add(calculation)
+        self.store_all(session, [calculation])
 
         return calculation
 
+    def store_all(self, session: Session, calculations: list[Calculation]) -> None:
+        """Store calculations using multi-row inserts of at most `INSERT_BATCH_SIZE` rows
+        and `INSERT_BATCH_BYTES` of charges (a larger calculation is inserted alone).
+        Calculations with the same file hash, config and settings as an already stored one are skipped.
+
+        Args:
+            calculations (list[Calculation]): Calculations to store (with 'config_id' and 'advanced_settings_id' set).
+        """
+
+        rows = [
+            {
+                "id": calculation.id or uuid.uuid4(),
+                "file_name": calculation.file_name,
+                "file_hash": calculation.file_hash,
+                "charges": calculation.charges,
+                "charges_path": calculation.charges_path,
+                "charges_size": calculation.charges_size,
+                "config_id": calculation.config_id,
+                "advanced_settings_id": calculation.advanced_settings_id,
+            }
+            for calculation in calculations
+        ]
+
+        for batch in self._get_batches(rows):
+            statement = (
+                insert(Calculation)
+                .values(batch)
+                .on_conflict_do_nothing(
+                    index_elements=[
+                        Calculation.file_hash,
+                        Calculation.config_id,
+                        Calculation.advanced_settings_id,
+                    ]
+                )
+            )
+
+            session.execute(statement)
+
+    def _get_batches(self, rows: list[dict]) -> list[list[dict]]:
+        batches: list[list[dict]] = []
+        batch: list[dict] = []
+        batch_bytes = 0
+
+        for row in rows:
+            row_bytes = encoded_charges_size(row["charges"]) if row["charges"] is not None else 0
+
+            if batch and (
+                len(batch) >= INSERT_BATCH_SIZE or batch_bytes + row_bytes > INSERT_BATCH_BYTES
+            ):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+
+            batch.append(row)
+            batch_bytes += row_bytes
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
     def _paginate(
         self, session: Session, statement: Select, page: int, page_size: int
     ) -> PagedList[Calculation]:
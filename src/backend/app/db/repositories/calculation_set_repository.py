@@ -1,15 +1,19 @@
 """This module provides a repository for calculation sets."""
 
+import uuid
 from dataclasses import dataclass
+from datetime import datetime
 from typing import Literal
 
-from sqlalchemy import Select, func, select, and_
-from sqlalchemy.orm import joinedload, Session
+from sqlalchemy import ColumnElement, Select, func, select, and_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, Session
 
 
-from models.paging import PagedList, PagingFilters
+from models.paging import PagedList, PagingFilters, decode_cursor, encode_cursor
 
-from db.schemas.calculation import CalculationSet
+from db.schemas.calculation import CalculationSet, CalculationSetStats
+from db.schemas.stats import MoleculeSetStats
 
 
 @dataclass
@@ -25,30 +29,121 @@ class CalculationSetRepository:
     """Repository for managing calculation sets."""
 
     def get_all(
-        self, session: Session, filters: CalculationSetFilters
+        self,
+        session: Session,
+        filters: CalculationSetFilters,
+        total_count: int | None = None,
     ) -> PagedList[CalculationSet]:
         """Get all previous calculations matching the provided filters.
+        Configs, settings and stats of the files (including atom type counts) of the page
+        are loaded eagerly using a constant number of queries.
 
         Args:
-            filters (PagingFilters): Filters for paging.
+            filters (CalculationSetFilters): Filters for paging, pages following a cursor
+                are found using the (created_at, id) key instead of OFFSET.
+            total_count (int | None, optional): Known (e.g. cached) total count,
+                sets are not counted if provided. Defaults to None.
+
+        Raises:
+            ValueError: If the cursor is not valid.
 
         Returns:
             PagedList[CalculationSet]: Paged list of calculation sets.
         """
 
+        statement = self._get_all_statement(filters)
+        items = (session.execute(statement)).unique().scalars(CalculationSet).all()
+
+        if total_count is None:
+            total_count = (session.execute(self._get_count_statement(filters))).scalar()
+
+        return self._to_paged_list(filters, items, total_count)
+
+    async def get_all_async(
+        self,
+        session: AsyncSession,
+        filters: CalculationSetFilters,
+        total_count: int | None = None,
+    ) -> PagedList[CalculationSet]:
+        """Async variant of `get_all`."""
+
+        statement = self._get_all_statement(filters)
+        items = (await session.execute(statement)).unique().scalars(CalculationSet).all()
+
+        if total_count is None:
+            total_count = (await session.execute(self._get_count_statement(filters))).scalar()
+
+        return self._to_paged_list(filters, items, total_count)
+
+    def _get_all_statement(self, filters: CalculationSetFilters) -> Select:
+        column = getattr(CalculationSet, filters.order_by)
+
         statement = (
             select(CalculationSet)
-            .options(joinedload(CalculationSet.configs))
-            .options(joinedload(CalculationSet.advanced_settings))
-            .options(joinedload(CalculationSet.molecule_set_stats))
-            .order_by(getattr(getattr(CalculationSet, filters.order_by), filters.order)())
-            # Return only sets having some calculations
-            .where(and_(CalculationSet.configs.any(), CalculationSet.user_id == filters.user_id))
+            .options(
+                selectinload(CalculationSet.configs),
+                joinedload(CalculationSet.advanced_settings),
+                selectinload(CalculationSet.molecule_set_stats_associations)
+                .joinedload(CalculationSetStats.molecule_set)
+                .selectinload(MoleculeSetStats.atom_type_counts),
+            )
+            # id makes the order unique, so that keyset pagination does not skip any sets
+            .order_by(
+                getattr(column, filters.order)(), getattr(CalculationSet.id, filters.order)()
+            )
+            .where(self._get_filter(filters))
         )
 
-        calculations = self._paginate(session, statement, filters.page, filters.page_size)
+        if filters.cursor is not None:
+            if filters.order_by != "created_at":
+                raise ValueError("Cursor can be used only when ordering by 'created_at'.")
+
+            key = tuple_(CalculationSet.created_at, CalculationSet.id)
+            cursor_key = tuple_(*self._decode_cursor(filters.cursor))
+            statement = statement.where(
+                key < cursor_key if filters.order == "desc" else key > cursor_key
+            )
+        else:
+            statement = statement.offset((filters.page - 1) * filters.page_size)
+
+        # an extra set tells whether there is a next page
+        return statement.limit(filters.page_size + 1)
+
+    def _get_count_statement(self, filters: CalculationSetFilters) -> Select:
+        # eager loads and ordering are not needed for counting
+        return select(func.count()).select_from(CalculationSet).where(self._get_filter(filters))
+
+    def _get_filter(self, filters: CalculationSetFilters) -> ColumnElement[bool]:
+        # Return only sets having some calculations
+        return and_(CalculationSet.configs.any(), CalculationSet.user_id == filters.user_id)
+
+    def _to_paged_list(
+        self, filters: CalculationSetFilters, items: list[CalculationSet], total_count: int
+    ) -> PagedList[CalculationSet]:
+        items = list(items)
+        next_cursor = None
+
+        if len(items) > filters.page_size:
+            items = items[: filters.page_size]
+
+            if filters.order_by == "created_at":
+                last = items[-1]
+                next_cursor = encode_cursor([last.created_at.isoformat(), str(last.id)])
+
+        return PagedList[CalculationSet](
+            page=filters.page,
+            page_size=filters.page_size,
+            total_count=total_count,
+            items=items,
+            next_cursor=next_cursor,
+        )
 
-        return calculations
+    def _decode_cursor(self, cursor: str) -> tuple[datetime, uuid.UUID]:
+        try:
+            created_at, set_id = decode_cursor(cursor)
+            return datetime.fromisoformat(created_at), uuid.UUID(set_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor.") from e
 
     def get(self, session: Session, calculation_id: str) -> CalculationSet | None:
         """Get a single previous calculation by id.
@@ -60,7 +155,21 @@ class CalculationSetRepository:
             CalculationSet: Calculation set.
         """
 
-        statement = (
+        statement = self._get_statement(calculation_id)
+
+        calculation_set = (session.execute(statement)).unique().scalars(CalculationSet).first()
+        return calculation_set
+
+    async def get_async(self, session: AsyncSession, calculation_id: str) -> CalculationSet | None:
+        """Async variant of `get`."""
+
+        statement = self._get_statement(calculation_id)
+
+        calculation_set = (await session.execute(statement)).unique().scalars(CalculationSet).first()
+        return calculation_set
+
+    def _get_statement(self, calculation_id: str) -> Select:
+        return (
             select(CalculationSet)
             .options(
                 joinedload(CalculationSet.configs),
@@ -71,9 +180,6 @@ class CalculationSetRepository:
             .where(CalculationSet.id == calculation_id)
         )
 
-        calculation_set = (session.execute(statement)).unique().scalars(CalculationSet).first()
-        return calculation_set
-
     def delete(self, session: Session, calculation_id: str) -> None:
         """Delete a single previous calculation by id.
 
@@ -90,6 +196,18 @@ class CalculationSetRepository:
 
         session.delete(calculation_set)
 
+    async def delete_async(self, session: AsyncSession, calculation_id: str) -> None:
+        """Async variant of `delete`."""
+
+        statement = select(CalculationSet).where(CalculationSet.id == calculation_id)
+
+        calculation_set = (await session.execute(statement)).scalars(CalculationSet).first()
+
+        if not calculation_set:
+            return
+
+        await session.delete(calculation_set)
+
     def store(self, session: Session, calculation_set: CalculationSet) -> None:
         """Store a single calculation set in the database.
 
@@ -100,18 +218,6 @@ class CalculationSetRepository:
             CalculationSet: Stored calculation set.
         """
 
-        if self.get(session, calculation_set.id) is None:
+        # identity map is checked first, so sets loaded in this session are not queried again
+        if calculation_set in session or session.get(CalculationSet, calculation_set.id) is None:
             session.add(calculation_set)
-
-    def _paginate(
-        self, session: Session, statement: Select, page: int, page_size: int
-    ) -> PagedList[CalculationSet]:
-        total_statement = select(func.count()).select_from(statement)
-        items_statement = statement.limit(page_size).offset((page - 1) * page_size)
-
-        total_count = (session.execute(total_statement)).unique().scalar()
-        items = (session.execute(items_statement)).unique().scalars(CalculationSet).all()
-
-        return PagedList[CalculationSet](
-            page=page, page_size=page_size, total_count=total_count, items=items
-        )
@@ -0,0 +1,166 @@
+"""This module provides a repository for computation jobs."""
+
+from datetime import datetime
+
+from sqlalchemy import Select, and_, case, func, or_, select, true, update
+from sqlalchemy.orm import Session, aliased
+
+from db.schemas.job import Job
+
+
+class JobRepository:
+    """Repository for managing computation jobs."""
+
+    def get(self, session: Session, job_id: str) -> Job | None:
+        """Get a single job by id.
+
+        Args:
+            job_id (str): Id of the job (computation id).
+
+        Returns:
+            Job | None: Job or None if not found.
+        """
+
+        return session.get(Job, job_id)
+
+    def store(self, session: Session, job: Job) -> Job:
+        """Store a job in the database.
+
+        Args:
+            job (Job): Job to store.
+
+        Returns:
+            Job: Stored job.
+        """
+
+        session.add(job)
+        session.flush()
+
+        return job
+
+    def claim(
+        self,
+        session: Session,
+        now: datetime,
+        stale_before: datetime,
+        max_jobs_per_user: int,
+        max_guest_jobs: int,
+    ) -> Job | None:
+        """Claim the next job to run and mark it as running.
+
+        Jobs are ordered by priority class, then by the number of jobs their owner
+        is already running (round-robin between users) and finally by creation time.
+        Owners running the maximum allowed number of jobs are skipped, all guests share a single limit.
+        Running jobs without a heartbeat since 'stale_before' are considered abandoned and claimed again.
+        The claimed row is locked with `FOR UPDATE SKIP LOCKED`, so multiple workers can claim concurrently.
+        Claims of jobs of the same owner are serialised with an advisory lock held until the end
+        of the transaction and the owner's limit is checked again under it, so concurrent workers
+        can not exceed the limit.
+
+        Args:
+            now (datetime): Current time.
+            stale_before (datetime): Running jobs with older heartbeat are claimed again.
+            max_jobs_per_user (int): Maximum number of running jobs of a single user.
+            max_guest_jobs (int): Maximum number of running jobs of all guests.
+
+        Returns:
+            Job | None: Claimed job or None if there is nothing to run.
+        """
+
+        # owners which reached their limit while waiting for the lock
+        full_users: list[str] = []
+        guests_full = False
+
+        while True:
+            statement = self._get_claim_statement(
+                stale_before, max_jobs_per_user, max_guest_jobs, full_users, guests_full
+            )
+            job = session.execute(statement).scalars().first()
+
+            if job is None:
+                return None
+
+            limit = max_guest_jobs if job.user_id is None else max_jobs_per_user
+            owner = "guest" if job.user_id is None else str(job.user_id)
+            session.execute(select(func.pg_advisory_xact_lock(func.hashtext(owner))))
+
+            if self._count_running(session, job.user_id, stale_before) < limit:
+                break
+
+            if job.user_id is None:
+                guests_full = True
+            else:
+                full_users.append(job.user_id)
+
+        job.status = "running"
+        job.started_at = now
+        job.heartbeat_at = now
+        job.attempts += 1
+        session.flush()
+
+        return job
+
+    def update(self, session: Session, job_id: str, **values) -> None:
+        """Update columns of a job.
+
+        Args:
+            job_id (str): Id of the job.
+            **values: Columns to update.
+        """
+
+        session.execute(update(Job).where(Job.id == job_id).values(**values))
+
+    def _get_claim_statement(
+        self,
+        stale_before: datetime,
+        max_jobs_per_user: int,
+        max_guest_jobs: int,
+        full_users: list[str],
+        guests_full: bool,
+    ) -> Select:
+        other = aliased(Job)
+        running = (
+            select(func.count(other.id))
+            .where(
+                and_(
+                    other.status == "running",
+                    other.heartbeat_at >= stale_before,
+                    other.user_id.is_not_distinct_from(Job.user_id),
+                )
+            )
+            .correlate(Job)
+            .scalar_subquery()
+        )
+        limit = case((Job.user_id.is_(None), max_guest_jobs), else_=max_jobs_per_user)
+        owner = Job.user_id.is_not(None) if guests_full else true()
+
+        if full_users:
+            owner = and_(owner, or_(Job.user_id.is_(None), Job.user_id.not_in(full_users)))
+
+        return (
+            select(Job)
+            .where(
+                and_(
+                    or_(
+                        Job.status == "queued",
+                        and_(Job.status == "running", Job.heartbeat_at < stale_before),
+                    ),
+                    running < limit,
+                    owner,
+                )
+            )
+            .order_by(Job.priority, running, Job.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=Job)
+        )
+
+    def _count_running(self, session: Session, user_id: str | None, stale_before: datetime) -> int:
+        statement = select(func.count(Job.id)).where(
+            and_(
+                Job.status == "running",
+                Job.heartbeat_at >= stale_before,
+                Job.user_id.is_(None) if user_id is None else Job.user_id == user_id,
+            )
+        )
+
+        return session.execute(statement).scalar_one()
@@ -1,7 +1,8 @@
 """This module provides a repository for calculation configs."""
 
 from sqlalchemy import select
-from sqlalchemy.orm import joinedload, Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, Session
 
 
 from db.schemas.calculation import CalculationConfig
@@ -32,6 +33,45 @@ class MoleculeSetStatsRepository:
 
         return info
 
+    async def get_all_async(
+        self, session: AsyncSession, file_hashes: list[str]
+    ) -> dict[str, MoleculeSetStats]:
+        """Get info about multiple files using a single query.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+
+        Returns:
+            dict[str, MoleculeSetStats]: Information about the files by file hash,
+                files without stored info are missing.
+        """
+
+        statement = (
+            select(MoleculeSetStats)
+            .options(selectinload(MoleculeSetStats.atom_type_counts))
+            .where(MoleculeSetStats.file_hash.in_(set(file_hashes)))
+        )
+
+        infos = (await session.execute(statement)).scalars().all()
+
+        return {info.file_hash: info for info in infos}
+
+    def get_stored_file_hashes(self, session: Session, file_hashes: list[str]) -> set[str]:
+        """Get hashes of files which have info stored.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+
+        Returns:
+            set[str]: Hashes of files having info stored.
+        """
+
+        statement = select(MoleculeSetStats.file_hash).where(
+            MoleculeSetStats.file_hash.in_(set(file_hashes))
+        )
+
+        return set((session.execute(statement)).scalars().all())
+
     def store(self, session: Session, info: MoleculeSetStats) -> CalculationConfig:
         """Store info about a file in the database.
            If a given config already exists, it is returned.
@@ -0,0 +1,74 @@
+"""This module provides a repository for storage usage counters."""
+
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.schemas.storage_usage import StorageUsage
+
+
+class StorageUsageRepository:
+    """Repository for managing storage usage counters."""
+
+    def get(self, session: Session, owner: str) -> StorageUsage | None:
+        """Get usage of a single storage.
+
+        Args:
+            owner (str): Id of the user or 'guest'.
+
+        Returns:
+            StorageUsage | None: Storage usage or None if it is not tracked yet.
+        """
+
+        return session.get(StorageUsage, owner)
+
+    def add(self, session: Session, owner: str, files_bytes: int, computations_bytes: int) -> None:
+        """Atomically adds the provided amounts to usage of a storage.
+
+        Args:
+            owner (str): Id of the user or 'guest'.
+            files_bytes (int): Bytes added to (or removed from if negative) files.
+            computations_bytes (int): Bytes added to (or removed from if negative) computations.
+        """
+
+        statement = insert(StorageUsage).values(
+            owner=owner, files_bytes=files_bytes, computations_bytes=computations_bytes
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[StorageUsage.owner],
+            set_={
+                "files_bytes": StorageUsage.files_bytes + statement.excluded.files_bytes,
+                "computations_bytes": StorageUsage.computations_bytes
+                + statement.excluded.computations_bytes,
+            },
+        )
+
+        session.execute(statement)
+
+    def set(
+        self,
+        session: Session,
+        owner: str,
+        files_bytes: int,
+        computations_bytes: int,
+        reconciled_at: datetime,
+    ) -> None:
+        """Replaces usage of a storage with measured values.
+
+        Args:
+            owner (str): Id of the user or 'guest'.
+            files_bytes (int): Bytes used by files.
+            computations_bytes (int): Bytes used by computations.
+            reconciled_at (datetime): Time of the measurement.
+        """
+
+        values = {
+            "files_bytes": files_bytes,
+            "computations_bytes": computations_bytes,
+            "reconciled_at": reconciled_at,
+        }
+        statement = insert(StorageUsage).values(owner=owner, **values)
+        statement = statement.on_conflict_do_update(index_elements=[StorageUsage.owner], set_=values)
+
+        session.execute(statement)
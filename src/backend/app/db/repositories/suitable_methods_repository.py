@@ -0,0 +1,94 @@
+"""This module provides a repository for suitable methods of files."""
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+
+from db.schemas.stats import SuitableMethod, SuitableMethodsComputed
+
+
+class SuitableMethodsRepository:
+    """Repository for managing suitable methods of files."""
+
+    def get_stored_file_hashes(
+        self, session: Session, file_hashes: list[str], permissive_types: bool
+    ) -> set[str]:
+        """Get hashes of files which have suitable methods stored.
+        Files without any suitable method are included once their (empty) methods are stored.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+            permissive_types (bool): Whether permissive types were used.
+
+        Returns:
+            set[str]: Hashes of files having suitable methods stored.
+        """
+
+        statement = select(SuitableMethodsComputed.molecule_set_id).where(
+            and_(
+                SuitableMethodsComputed.molecule_set_id.in_(file_hashes),
+                SuitableMethodsComputed.permissive_types == permissive_types,
+            )
+        )
+
+        return set((session.execute(statement)).scalars().all())
+
+    def get_common(
+        self, session: Session, file_hashes: list[str], permissive_types: bool
+    ) -> list[tuple[str, str | None]]:
+        """Get (method, parameters) pairs suitable for all provided files.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+            permissive_types (bool): Whether permissive types were used.
+
+        Returns:
+            list[tuple[str, str | None]]: Suitable pairs ordered from the most suitable one.
+        """
+
+        unique_hashes = set(file_hashes)
+
+        statement = (
+            select(SuitableMethod.method, SuitableMethod.parameters)
+            .where(
+                and_(
+                    SuitableMethod.molecule_set_id.in_(unique_hashes),
+                    SuitableMethod.permissive_types == permissive_types,
+                )
+            )
+            .group_by(SuitableMethod.method, SuitableMethod.parameters)
+            .having(func.count(SuitableMethod.molecule_set_id.distinct()) == len(unique_hashes))
+            .order_by(func.min(SuitableMethod.position))
+        )
+
+        return [(method, parameters) for method, parameters in session.execute(statement).all()]
+
+    def store(
+        self,
+        session: Session,
+        file_hash: str,
+        permissive_types: bool,
+        suitable_methods: list[SuitableMethod],
+    ) -> None:
+        """Store suitable methods of a file in the database and mark them as computed.
+        Methods are skipped if they were stored concurrently (e.g. by another upload of the file).
+
+        Args:
+            file_hash (str): Hash of the file.
+            permissive_types (bool): Whether permissive types were used.
+            suitable_methods (list[SuitableMethod]): Suitable methods to store, may be empty.
+        """
+
+        statement = (
+            insert(SuitableMethodsComputed)
+            .values(molecule_set_id=file_hash, permissive_types=permissive_types)
+            .on_conflict_do_nothing()
+            .returning(SuitableMethodsComputed.molecule_set_id)
+        )
+
+        # concurrent writers wait for the marker row, so only one of them stores the methods
+        if session.execute(statement).first() is None:
+            return
+
+        session.add_all(suitable_methods)
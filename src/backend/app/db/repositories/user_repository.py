@@ -1,5 +1,5 @@
 from db.schemas.user import User
-from db.database import SessionManager
+from db.database import AsyncSessionManager, SessionManager
 
 from sqlalchemy import select
 
@@ -7,8 +7,13 @@ from sqlalchemy import select
 class UserRepository:
     """Repository for managing calculation sets."""
 
-    def __init__(self, session_manager: SessionManager):
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        async_session_manager: AsyncSessionManager | None = None,
+    ):
         self.session_manager = session_manager
+        self.async_session_manager = async_session_manager
 
     def get(self, openid: str) -> User | None:
         """Get user by their openid.
@@ -26,6 +31,22 @@ class UserRepository:
             user = (session.execute(statement)).scalars().first()
             return user
 
+    async def get_async(self, openid: str) -> User | None:
+        """Get user by their openid without blocking the event loop.
+
+        Args:
+            openid (str): Openid of the user.
+
+        Returns:
+            User | None: User with provided openid if exists, otherwise None.
+        """
+
+        statement = select(User).where(User.openid == openid)
+
+        async with self.async_session_manager.session() as session:
+            user = (await session.execute(statement)).scalars().first()
+            return user
+
     def store(self, user: User) -> User:
         """Store user in the database.
 
@@ -5,6 +5,7 @@ import sqlalchemy as sa
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from db.schemas import Base
+from db.schemas.charges import ChargesType
 
 
 class CalculationSet(Base):
@@ -42,6 +43,11 @@ class CalculationSet(Base):
     def __repr__(self) -> str:
         return f"<CalculationSet id={self.id}, created_at={self.created_at}>"
 
+    # history of a user is paged by (created_at, id)
+    __table_args__ = (
+        sa.Index("ix_calculation_sets_user_id_created_at", "user_id", "created_at"),
+    )
+
 
 class CalculationSetConfig(Base):
     """M:N relationship table between CalculationSet and CalculationConfig"""
@@ -80,7 +86,10 @@ class CalculationConfig(Base):
             f"<CalculationConfig id={self.id}, method={self.method}, parameters={self.parameters}>"
         )
 
-    __table_args__ = (sa.UniqueConstraint("method", "parameters"),)
+    # configs without parameters have to be unique as well
+    __table_args__ = (
+        sa.UniqueConstraint("method", "parameters", postgresql_nulls_not_distinct=True),
+    )
 
     def __eq__(self, other):
         return self.method == other.method and self.parameters == other.parameters
@@ -117,7 +126,10 @@ class Calculation(Base):
     id: Mapped[str] = mapped_column(sa.Uuid, primary_key=True, default=uuid.uuid4)
     file_name: Mapped[str] = mapped_column(sa.VARCHAR(255), nullable=False)
     file_hash: Mapped[str] = mapped_column(sa.VARCHAR(100), nullable=False)
-    charges: Mapped[dict] = mapped_column(sa.JSON, nullable=False)
+    # charges are stored either in the database or in the charges store (see `charges_path`)
+    charges: Mapped[dict | None] = mapped_column(ChargesType, nullable=True)
+    charges_path: Mapped[str | None] = mapped_column(sa.VARCHAR(100), nullable=True)
+    charges_size: Mapped[int | None] = mapped_column(sa.BigInteger, nullable=True)
 
     config_id: Mapped[str] = mapped_column(
         sa.Uuid, sa.ForeignKey("calculation_configs.id"), nullable=False
@@ -132,6 +144,16 @@ class Calculation(Base):
     def __repr__(self) -> str:
         return f"<Calculation id={self.id}, file_name={self.file_name}, file_hash={self.file_hash}>"
 
+    __table_args__ = (
+        sa.Index(
+            "ix_calculations_file_hash_config_id_advanced_settings_id",
+            "file_hash",
+            "config_id",
+            "advanced_settings_id",
+            unique=True,
+        ),
+    )
+
 
 class AdvancedSettings(Base):
     __tablename__ = "advanced_settings"
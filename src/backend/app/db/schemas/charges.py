@@ -0,0 +1,127 @@
+"""Compact binary encoding of calculated charges.
+
+Layout (little-endian):
+    header: magic (4 bytes), version (uint8), molecule count (uint32)
+    index: for each molecule: name length (uint32), UTF-8 name, charge count (uint32)
+    data: charges of all molecules as float64 in the order of the index
+
+The index is parsed when the value is loaded, charges of a molecule are decoded
+only when the molecule is accessed.
+"""
+
+import struct
+import sys
+from array import array
+from collections.abc import Iterator, Mapping
+
+import sqlalchemy as sa
+
+MAGIC = b"ACC2"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBI")
+_UINT32 = struct.Struct("<I")
+_FLOAT_SIZE = array("d").itemsize
+
+
+def encode_charges(charges: Mapping[str, list[float]]) -> bytes:
+    """Encodes charges (molecule name -> charges of its atoms) into bytes."""
+
+    index = bytearray(_HEADER.pack(MAGIC, VERSION, len(charges)))
+    data = array("d")
+
+    for molecule, values in charges.items():
+        name = molecule.encode("utf-8")
+        index += _UINT32.pack(len(name))
+        index += name
+        index += _UINT32.pack(len(values))
+        data.extend(values)
+
+    if sys.byteorder != "little":
+        data.byteswap()
+
+    return bytes(index) + data.tobytes()
+
+
+def encoded_charges_size(charges: Mapping[str, list[float]]) -> int:
+    """Returns size of charges encoded using `encode_charges` (without encoding them)."""
+
+    return _HEADER.size + sum(
+        2 * _UINT32.size + len(molecule.encode("utf-8")) + len(values) * _FLOAT_SIZE
+        for molecule, values in charges.items()
+    )
+
+
+def decode_charges(data: bytes) -> "EncodedCharges":
+    """Decodes charges encoded using `encode_charges`."""
+
+    return EncodedCharges(data)
+
+
+class EncodedCharges(Mapping[str, list[float]]):
+    """Read-only mapping (molecule name -> charges) decoding charges on access."""
+
+    def __init__(self, data: bytes):
+        magic, version, count = _HEADER.unpack_from(data, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Invalid format of encoded charges.")
+
+        self._data = memoryview(data)
+        # molecule name -> (offset of charges in bytes, number of charges)
+        self._index: dict[str, tuple[int, int]] = {}
+
+        position = _HEADER.size
+        entries = []
+        for _ in range(count):
+            (name_length,) = _UINT32.unpack_from(data, position)
+            position += _UINT32.size
+            name = bytes(self._data[position : position + name_length]).decode("utf-8")
+            position += name_length
+            (charges_count,) = _UINT32.unpack_from(data, position)
+            position += _UINT32.size
+            entries.append((name, charges_count))
+
+        offset = position
+        for name, charges_count in entries:
+            self._index[name] = (offset, charges_count)
+            offset += charges_count * _FLOAT_SIZE
+
+    def __getitem__(self, molecule: str) -> list[float]:
+        offset, count = self._index[molecule]
+
+        values = array("d")
+        values.frombytes(self._data[offset : offset + count * _FLOAT_SIZE])
+
+        if sys.byteorder != "little":
+            values.byteswap()
+
+        return values.tolist()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"<EncodedCharges molecules={len(self)}>"
+
+
+class ChargesType(sa.TypeDecorator):
+    """Column type storing charges using `encode_charges`."""
+
+    impl = sa.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        return encode_charges(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return decode_charges(value)
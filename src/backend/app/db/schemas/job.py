@@ -0,0 +1,54 @@
+import uuid
+
+from datetime import datetime
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.schemas import Base
+
+
+class JobPriority:
+    """Priority classes of jobs. Jobs with lower value are dispatched first."""
+
+    USER = 0
+    GUEST = 1
+
+
+class Job(Base):
+    """Computation job database model. Jobs are claimed by workers of all API processes."""
+
+    __tablename__ = "jobs"
+
+    # id of the computation processed by the job
+    id: Mapped[str] = mapped_column(sa.Uuid, primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[str | None] = mapped_column(
+        sa.Uuid, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=True
+    )
+    priority: Mapped[int] = mapped_column(sa.SmallInteger, nullable=False)
+    status: Mapped[str] = mapped_column(sa.VARCHAR(10), nullable=False, default="queued")
+    # settings, file hashes and configs of the computation
+    payload: Mapped[dict] = mapped_column(sa.JSON, nullable=False)
+    # progress of individual files
+    files: Mapped[list] = mapped_column(sa.JSON, nullable=False, default=list)
+    error: Mapped[str | None] = mapped_column(sa.Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(
+        sa.DateTime(timezone=True),
+        nullable=False,
+        default=sa.func.timezone("UTC", sa.func.current_timestamp()),
+    )
+    started_at: Mapped[datetime | None] = mapped_column(sa.DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(sa.DateTime(timezone=True), nullable=True)
+    # updated periodically by the worker running the job, used to detect abandoned jobs
+    heartbeat_at: Mapped[datetime | None] = mapped_column(
+        sa.DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self) -> str:
+        return f"<Job id={self.id}, status={self.status}, priority={self.priority}>"
+
+    __table_args__ = (
+        sa.Index("ix_jobs_status_priority", "status", "priority", "created_at"),
+        sa.Index("ix_jobs_user_id_status", "user_id", "status"),
+    )
@@ -47,6 +47,66 @@ class MoleculeSetStats(Base):
     calculation_set_associations = relationship(
         "CalculationSetStats", back_populates="molecule_set"
     )
+    suitable_methods = relationship(
+        "SuitableMethod", back_populates="molecule_set_stats", passive_deletes=True
+    )
+    suitable_methods_computed = relationship(
+        "SuitableMethodsComputed", back_populates="molecule_set_stats", passive_deletes=True
+    )
 
     def __repr__(self):
         return f"""<MoleculeSetStats file_hash={self.file_hash}, total_molecules={self.total_molecules}, total_atoms={self.total_atoms}, atom_type_counts={self.atom_type_counts}"""
+
+
+class SuitableMethod(Base):
+    """
+    Suitable method database model.
+    Holds a single (method, parameters) pair suitable for the molecules in the file.
+    Suitable methods depend only on the file content and the 'permissive_types' setting.
+    """
+
+    __tablename__ = "suitable_methods"
+
+    id: Mapped[str] = mapped_column(sa.Uuid, primary_key=True, default=uuid.uuid4)
+    molecule_set_id: Mapped[str] = mapped_column(
+        sa.VARCHAR(100),
+        sa.ForeignKey("molecule_set_stats.file_hash", ondelete="CASCADE"),
+        nullable=False,
+    )
+    permissive_types: Mapped[bool] = mapped_column(sa.Boolean, nullable=False)
+    method: Mapped[str] = mapped_column(sa.VARCHAR(20), nullable=False)
+    parameters: Mapped[str | None] = mapped_column(sa.VARCHAR(50), nullable=True)
+    # order in which ChargeFW2 returned the pair (most suitable first)
+    position: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+
+    molecule_set_stats = relationship("MoleculeSetStats", back_populates="suitable_methods")
+
+    def __repr__(self):
+        return f"""<SuitableMethod molecule_set_id={self.molecule_set_id}, permissive_types={self.permissive_types}, method={self.method}, parameters={self.parameters}"""
+
+    __table_args__ = (
+        sa.Index("ix_suitable_methods_molecule_set_id", "molecule_set_id", "permissive_types"),
+    )
+
+
+class SuitableMethodsComputed(Base):
+    """
+    Marks that suitable methods of the file were computed for the 'permissive_types' setting.
+    Distinguishes files without any suitable method from files which were not processed yet.
+    """
+
+    __tablename__ = "suitable_methods_computed"
+
+    molecule_set_id: Mapped[str] = mapped_column(
+        sa.VARCHAR(100),
+        sa.ForeignKey("molecule_set_stats.file_hash", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    permissive_types: Mapped[bool] = mapped_column(sa.Boolean, primary_key=True)
+
+    molecule_set_stats = relationship(
+        "MoleculeSetStats", back_populates="suitable_methods_computed"
+    )
+
+    def __repr__(self):
+        return f"""<SuitableMethodsComputed molecule_set_id={self.molecule_set_id}, permissive_types={self.permissive_types}"""
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.schemas import Base
+
+# owner of the storage shared by all guests
+GUEST_OWNER = "guest"
+
+
+class StorageUsage(Base):
+    """Disk space used by files and computations of a single user (or all guests).
+    Counters are updated incrementally and periodically reconciled with the disk."""
+
+    __tablename__ = "storage_usage"
+
+    # id of the user or 'guest'
+    owner: Mapped[str] = mapped_column(sa.VARCHAR(36), primary_key=True)
+    files_bytes: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, default=0)
+    computations_bytes: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, default=0)
+    reconciled_at: Mapped[datetime | None] = mapped_column(
+        sa.DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<StorageUsage owner={self.owner}, files_bytes={self.files_bytes}, "
+            + f"computations_bytes={self.computations_bytes}>"
+        )
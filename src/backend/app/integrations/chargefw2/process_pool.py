@@ -0,0 +1,91 @@
+"""Functions executed inside ChargeFW2 worker processes.
+
+Parsed molecules can not be sent between processes, so each function
+receives a file path, does the parsing itself and only exchanges charges with the API process.
+Charges are transferred as `array.array` objects which are pickled as raw bytes.
+"""
+
+from array import array
+
+from integrations.chargefw2.base import ChargeFW2Base
+
+# ChargeFW2 integration used by the current worker process (set by `initialize`)
+_chargefw2: ChargeFW2Base | None = None
+
+PackedCharges = dict[str, array]
+
+
+def initialize(chargefw2_type: type[ChargeFW2Base]) -> None:
+    """Initializes the worker process.
+
+    Args:
+        chargefw2_type (type[ChargeFW2Base]): ChargeFW2 integration to be used in the worker.
+    """
+
+    global _chargefw2
+    _chargefw2 = chargefw2_type()
+
+
+def pack_charges(charges: dict[str, list[float]]) -> PackedCharges:
+    """Converts charges to a representation which is cheap to transfer between processes."""
+
+    return {molecule: array("d", values) for molecule, values in charges.items()}
+
+
+def unpack_charges(charges: PackedCharges) -> dict[str, list[float]]:
+    """Converts charges received from a worker process back to lists of floats."""
+
+    return {molecule: values.tolist() for molecule, values in charges.items()}
+
+
+def calculate_charges(
+    file_path: str,
+    read_hetatm: bool,
+    ignore_water: bool,
+    permissive_types: bool,
+    method_name: str,
+    parameters_name: str | None,
+    chg_out_dir: str,
+) -> PackedCharges:
+    """Loads molecules from the provided file and calculates their charges.
+
+    Returns:
+        PackedCharges: Calculated charges packed using `pack_charges`.
+    """
+
+    chargefw2 = _get_chargefw2()
+    molecules = chargefw2.molecules(file_path, read_hetatm, ignore_water, permissive_types)
+    charges = chargefw2.calculate_charges(molecules, method_name, parameters_name, chg_out_dir)
+
+    return pack_charges(charges)
+
+
+def save_charges(
+    file_path: str,
+    read_hetatm: bool,
+    ignore_water: bool,
+    permissive_types: bool,
+    calculations: list[tuple[PackedCharges, str, str | None]],
+    chg_out_dir: str,
+) -> None:
+    """Loads molecules from the provided file once and saves charges of all its calculations.
+
+    Args:
+        calculations (list[tuple[PackedCharges, str, str | None]]): Charges packed using
+            `pack_charges` with method and parameters names, saved in the provided order.
+    """
+
+    chargefw2 = _get_chargefw2()
+    molecules = chargefw2.molecules(file_path, read_hetatm, ignore_water, permissive_types)
+
+    for charges, method_name, parameters_name in calculations:
+        chargefw2.save_charges(
+            unpack_charges(charges), molecules, method_name, parameters_name, chg_out_dir
+        )
+
+
+def _get_chargefw2() -> ChargeFW2Base:
+    if _chargefw2 is None:
+        raise RuntimeError("ChargeFW2 worker process has not been initialized.")
+
+    return _chargefw2
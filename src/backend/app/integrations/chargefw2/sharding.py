@@ -0,0 +1,110 @@
+"""Splitting of multi-molecule files into shards which can be calculated in parallel.
+
+Only formats with clearly delimited molecule records (SDF, MOL2) are supported.
+Each shard contains a contiguous range of molecules, so merging charges
+of the shards in order gives the same result as calculating the whole file.
+"""
+
+import math
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+# SDF records end with this line
+SDF_RECORD_END = b"$$$$"
+# MOL2 records start with this line
+MOL2_RECORD_START = b"@<TRIPOS>MOLECULE"
+
+SHARDABLE_EXTENSIONS = {".sdf", ".mol2"}
+# shard files are named <prefix><shard index><extension>
+SHARD_FILE_PREFIX = "shard_"
+
+
+def is_shardable(file_path: str) -> bool:
+    """Returns True if the provided file can be split into shards."""
+
+    return Path(file_path).suffix.lower() in SHARDABLE_EXTENSIONS
+
+
+def count_molecules(file_path: str) -> int:
+    """Counts molecule records in the provided SDF/MOL2 file."""
+
+    count = 0
+
+    with open(file_path, "rb") as file:
+        for molecule_index, line in _iter_records(file, Path(file_path).suffix.lower()):
+            if line.strip():
+                count = max(count, molecule_index + 1)
+
+    return count
+
+
+def split_file(file_path: str, out_dir: str, max_shards: int) -> list[str]:
+    """Splits the provided SDF/MOL2 file into at most 'max_shards' shards of similar size.
+
+    Args:
+        file_path (str): Path to the file to split.
+        out_dir (str): Directory where shards are written (each into its own subdirectory).
+            Shards are named 'shard_<index><extension>', so they are never mistaken
+            for the stored file (e.g. when caching its molecules).
+        max_shards (int): Maximum number of shards.
+
+    Returns:
+        list[str]: Paths to the shards in the order of molecules.
+            Returns just the original path if the file can not be split.
+    """
+
+    if not is_shardable(file_path) or max_shards < 2:
+        return [file_path]
+
+    molecules = count_molecules(file_path)
+    shards = min(max_shards, molecules)
+
+    if shards < 2:
+        return [file_path]
+
+    molecules_per_shard = math.ceil(molecules / shards)
+    shard_paths: list[str] = []
+    shard_file: BinaryIO | None = None
+    extension = Path(file_path).suffix.lower()
+
+    try:
+        # split in binary mode, so the shards are byte-for-byte parts of the file
+        with open(file_path, "rb") as file:
+            for molecule_index, line in _iter_records(file, extension):
+                shard_index = min(molecule_index // molecules_per_shard, shards - 1)
+
+                if shard_index == len(shard_paths):
+                    if shard_file is not None:
+                        shard_file.close()
+
+                    shard_dir = os.path.join(out_dir, str(shard_index))
+                    os.makedirs(shard_dir, exist_ok=True)
+                    shard_name = f"{SHARD_FILE_PREFIX}{shard_index}{extension}"
+                    shard_paths.append(os.path.join(shard_dir, shard_name))
+                    shard_file = open(shard_paths[-1], "wb")
+
+                shard_file.write(line)
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+
+    return shard_paths
+
+
+def _iter_records(file: BinaryIO, extension: str) -> Iterator[tuple[int, bytes]]:
+    """Yields lines of the file together with index of the molecule they belong to."""
+
+    molecule_index = 0
+    seen_record = False
+
+    for line in file:
+        if extension == ".mol2" and line.startswith(MOL2_RECORD_START):
+            if seen_record:
+                molecule_index += 1
+            seen_record = True
+
+        yield molecule_index, line
+
+        if extension == ".sdf" and line.startswith(SDF_RECORD_END):
+            molecule_index += 1
@@ -3,6 +3,7 @@
 from abc import ABC, abstractmethod
 import datetime
 import os
+from typing import Iterator
 import uuid
 
 from fastapi import UploadFile
@@ -100,6 +101,41 @@ class IOBase(ABC):
         """
         raise NotImplementedError()
 
+    @abstractmethod
+    def readlink(self, path: str) -> str:
+        """Returns target of the provided symlink.
+
+        Args:
+            path (str): Path to the symlink.
+
+        Returns:
+            str: Target of the symlink.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def rename(self, path_src: str, path_dst: str) -> None:
+        """Atomically renames file, symlink or directory, replacing a file or symlink at path_dst.
+
+        Args:
+            path_src (str): Path to rename.
+            path_dst (str): New path.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def mkdtemp(self, directory: str, prefix: str) -> str:
+        """Creates new uniquely named directory in the provided directory.
+
+        Args:
+            directory (str): Parent directory.
+            prefix (str): Prefix of the directory name.
+
+        Returns:
+            str: Path to the created directory.
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def zip(self, path: str, destination: str) -> str:
         """Zips the provided directory.
@@ -113,6 +149,23 @@ class IOBase(ABC):
         """
         raise NotImplementedError()
 
+    @abstractmethod
+    def zip_stream(
+        self, entries: list[tuple[str, str | None]], destination: str | None = None
+    ) -> Iterator[bytes]:
+        """Generates zip archive of the provided files.
+
+        Args:
+            entries (list[tuple[str, str | None]]): Names of the archive entries
+                with paths to their files (None for directories).
+            destination (str | None): Where to also store the archive. It is stored only
+                once it is completely generated, partially generated archives are discarded.
+
+        Returns:
+            Iterator[bytes]: Chunks of the archive.
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def listdir(self, directory: str = ".") -> list[str]:
         """Lists contents of the provided directory.
@@ -126,7 +179,7 @@ class IOBase(ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def store_upload_file(self, file: UploadFile, directory: str) -> tuple[str, str]:
+    async def store_upload_file(self, file: UploadFile, directory: str) -> tuple[str, str, bool]:
         """Stores the provided file on disk.
 
         Args:
@@ -134,7 +187,8 @@ class IOBase(ABC):
             directory (str): Path to an existing directory.
 
         Returns:
-            tuple[str, str]: Tuple containing path to the file and hash of the file contents.
+            tuple[str, str, bool]: Tuple containing path to the file, hash of the file contents
+                and whether the file is new (the same file was not stored before).
         """
         raise NotImplementedError()
 
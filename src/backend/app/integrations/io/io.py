@@ -5,6 +5,10 @@ import hashlib
 import os
 import pathlib
 import shutil
+import tempfile
+from typing import Iterator
+import uuid
+import zipfile
 
 
 import aiofiles
@@ -15,6 +19,27 @@ from .base import IOBase
 
 load_dotenv()
 
+ZIP_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+class _ZipBuffer:
+    """Write-only file collecting output of `zipfile.ZipFile` until it is taken."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
 
 class IOLocal(IOBase):
     """Local IO operations."""
@@ -35,6 +60,15 @@ class IOLocal(IOBase):
     def symlink(self, path_src: str, path_dst: str) -> None:
         os.symlink(path_src, path_dst)
 
+    def readlink(self, path: str) -> str:
+        return os.readlink(path)
+
+    def rename(self, path_src: str, path_dst: str) -> None:
+        os.replace(path_src, path_dst)
+
+    def mkdtemp(self, directory: str, prefix: str) -> str:
+        return tempfile.mkdtemp(prefix=prefix, dir=directory)
+
     def last_modified(self, path: str) -> datetime.datetime:
         ppath = pathlib.Path(path)
         if ppath.exists():
@@ -55,13 +89,61 @@ class IOLocal(IOBase):
     def zip(self, path: str, destination: str) -> str:
         return shutil.make_archive(destination, "zip", path)
 
+    def zip_stream(
+        self, entries: list[tuple[str, str | None]], destination: str | None = None
+    ) -> Iterator[bytes]:
+        # the buffer is not seekable, so zipfile writes sizes of entries after their data
+        buffer = _ZipBuffer()
+        tmp_path = f"{destination}.{uuid.uuid4()}.tmp" if destination is not None else None
+        out_file = open(tmp_path, "wb") if tmp_path is not None else None
+
+        def take() -> bytes:
+            data = buffer.take()
+            if out_file is not None:
+                out_file.write(data)
+            return data
+
+        try:
+            with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for name, path in entries:
+                    if path is None:
+                        archive.mkdir(name)
+                        continue
+
+                    info = zipfile.ZipInfo.from_file(path, name)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+
+                    with open(path, "rb") as src:
+                        with archive.open(info, "w", force_zip64=force_zip64) as dst:
+                            while chunk := src.read(ZIP_CHUNK_SIZE):
+                                dst.write(chunk)
+
+                                if data := take():
+                                    yield data
+
+                    if data := take():
+                        yield data
+
+            # central directory
+            yield take()
+
+            if out_file is not None:
+                out_file.close()
+                os.replace(tmp_path, destination)
+        finally:
+            if out_file is not None and not out_file.closed:
+                # archive was not completed (e.g. client disconnected)
+                out_file.close()
+                os.remove(tmp_path)
+
     def listdir(self, directory: str = ".") -> list[str]:
         try:
             return os.listdir(directory)
         except FileNotFoundError:
             return []
 
-    async def store_upload_file(self, file: UploadFile, directory: str) -> tuple[str, str]:
+    async def store_upload_file(self, file: UploadFile, directory: str) -> tuple[str, str, bool]:
         tmp_path: str = os.path.join(directory, IOBase.get_unique_filename(file.filename or "file"))
         hasher = hashlib.sha256()
         chunk_size = 1024 * 1024  # 1 MB
@@ -75,9 +157,11 @@ class IOLocal(IOBase):
         # add hash to file name
         file_hash = hasher.hexdigest()
         new_filename = os.path.join(directory, f"{file_hash}_{file.filename}")
+        # the same file uploaded again replaces the stored one
+        is_new = not os.path.exists(new_filename)
         os.rename(tmp_path, new_filename)
 
-        return new_filename, file_hash
+        return new_filename, file_hash, is_new
 
     async def write_file(self, path: str, content: str) -> None:
         """Writes content to a file.
@@ -70,6 +70,12 @@ def create_app() -> FastAPI:
     )
 
     app.add_exception_handler(HTTPException, http_exception_handler)
+    app.add_event_handler("startup", container.job_service().start)
+    app.add_event_handler("shutdown", container.job_service().shutdown)
+    app.add_event_handler("startup", container.io_service().start_reconciliation)
+    app.add_event_handler("shutdown", container.io_service().shutdown_reconciliation)
+    # after job workers are stopped, so that no calculation is submitted afterwards
+    app.add_event_handler("shutdown", container.chargefw2_service().shutdown)
 
     app.include_router(router=charges_router, prefix=PREFIX)
     app.include_router(router=files_router, prefix=PREFIX)
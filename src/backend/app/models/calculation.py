@@ -36,7 +36,10 @@ class CalculationConfigDto(BaseModel):
     parameters: str | None = None
 
     model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True, from_attributes=True)
-    __hash__ = object.__hash__
+
+    def __hash__(self) -> int:
+        # equal configs are the same dictionary key (configs are not modified once created)
+        return hash((self.method, self.parameters))
 
 
 class CalculationDto(BaseModel):
@@ -0,0 +1,41 @@
+"""Computation job models"""
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+from pydantic.alias_generators import to_camel
+
+JobState = Literal["queued", "running", "done", "failed", "cancelled"]
+
+
+class FileProgressDto(BaseModel):
+    """Progress of calculations of a single file"""
+
+    file_hash: str
+    total: int
+    completed: int = 0
+
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True, from_attributes=True)
+
+
+class JobStatusDto(BaseModel):
+    """Status of a computation job"""
+
+    computation_id: str
+    status: JobState = "queued"
+    files: list[FileProgressDto] = []
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True, from_attributes=True)
+
+    def mark_file_completed(self, file_hash: str) -> None:
+        """Increments number of completed calculations of the provided file."""
+
+        for progress in self.files:
+            if progress.file_hash == file_hash:
+                progress.completed = min(progress.completed + 1, progress.total)
+                return
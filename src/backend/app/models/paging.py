@@ -1,16 +1,47 @@
 """Provides a dataclass for paging filters and a class for paged lists."""
 
-from dataclasses import dataclass
+import base64
+import json
+from dataclasses import dataclass, field
 from pydantic import BaseModel, ConfigDict
 from pydantic.alias_generators import to_camel
 
 
 @dataclass
 class PagingFilters:
-    """Filters for paging."""
+    """Filters for paging.
+
+    If 'cursor' (returned as 'next_cursor' of the previous page) is provided,
+    the page following the cursor is returned and 'page' is ignored (keyset pagination).
+    """
 
     page: int
     page_size: int
+    cursor: str | None = field(default=None, kw_only=True)
+
+
+def encode_cursor(values: list) -> str:
+    """Encodes JSON serializable values identifying the last item of a page into a cursor."""
+
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Decodes values encoded using `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is not valid.
+    """
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError("Invalid cursor.") from e
+
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor.")
+
+    return values
 
 
 class PagedList[T](BaseModel):  # add BaseModel
@@ -20,6 +51,9 @@ class PagedList[T](BaseModel):  # add BaseModel
     Turns a query into a paged list of items.
     If no (or <= 0) page or page_size are provided,
     it defaults to PagedList.DEFAULT_PAGE and PagedList.DEFAULT_PAGE_SIZE.
+
+    Lists supporting keyset pagination also provide 'next_cursor' (None on the last page),
+    their total count may be cached, so it is only approximate.
     """
 
     _DEFAULT_PAGE: int = 1
@@ -30,6 +64,7 @@ class PagedList[T](BaseModel):  # add BaseModel
     page_size: int
     total_count: int
     total_pages: int
+    next_cursor: str | None = None
 
     model_config = ConfigDict(
         alias_generator=to_camel,
@@ -45,6 +80,7 @@ class PagedList[T](BaseModel):  # add BaseModel
         page_size: int = _DEFAULT_PAGE_SIZE,
         total_count: int = 0,
         total_pages: int = 0,
+        next_cursor: str | None = None,
     ) -> None:
         page = page if page > 0 else PagedList._DEFAULT_PAGE
         page_size = page_size if page_size > 0 else PagedList._DEFAULT_PAGE_SIZE
@@ -57,6 +93,7 @@ class PagedList[T](BaseModel):  # add BaseModel
             page_size=page_size,
             total_count=total_count,
             total_pages=total_pages,
+            next_cursor=next_cursor,
         )
 
     @staticmethod
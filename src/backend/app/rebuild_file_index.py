@@ -0,0 +1,59 @@
+"""Rebuilds file index of all user and guest file storages.
+
+The index is maintained when files are uploaded or removed and built on first use
+of a storage without one. Rebuilding is needed only if files were added or removed
+outside of the application (e.g. restored from a backup).
+
+Usage:
+    python rebuild_file_index.py [--data-dir <ACC2_DATA_DIR>]
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from integrations.io.io import IOLocal
+from services.file_index import FileIndex
+from services.logging.file_logger import FileLogger
+
+
+def get_file_storages(data_dir: Path) -> list[Path]:
+    """Returns file storage directories of guests and all users."""
+
+    storages = [data_dir / "guest" / "files"]
+    storages.extend(sorted((data_dir / "user").glob("*/files")))
+
+    return [storage for storage in storages if storage.is_dir()]
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--data-dir",
+        default=os.environ.get("ACC2_DATA_DIR"),
+        help="Data directory of the application (defaults to ACC2_DATA_DIR).",
+    )
+    args = parser.parse_args()
+
+    if not args.data_dir:
+        parser.error("--data-dir is required if ACC2_DATA_DIR is not set.")
+
+    logger = FileLogger()
+    # messages are logged to the application log and to the console
+    logging.getLogger().addHandler(logging.StreamHandler())
+    file_index = FileIndex(IOLocal(), logger)
+
+    total = 0
+    for storage in get_file_storages(Path(args.data_dir)):
+        total += file_index.rebuild(str(storage))
+
+    logger.info(f"Indexed {total} files in total.")
+
+
+if __name__ == "__main__":
+    main()
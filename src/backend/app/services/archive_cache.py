@@ -0,0 +1,142 @@
+"""Cache of archives of computation results."""
+
+from dataclasses import dataclass
+import datetime
+import hashlib
+import os
+from pathlib import Path
+import traceback
+from typing import Iterator
+
+from integrations.io.base import IOBase
+from services.logging.base import LoggerBase
+
+
+@dataclass
+class ChargesArchive:
+    """Archive of a charges directory, either cached or generated on the fly."""
+
+    fingerprint: str
+    last_modified: datetime.datetime
+    # path to the cached archive
+    path: str | None = None
+    # chunks of the archive if it is not cached
+    chunks: Iterator[bytes] | None = None
+
+
+class ArchiveCache:
+    """Stores archives of charges directories (results of computations and examples).
+
+    Archives are stored as <directory key>_<fingerprint>.zip, where the fingerprint identifies
+    the archived content (see `IOService.get_charges_archive`). Archive of a changed directory
+    therefore gets a new name and the stale one is removed once the new one is stored.
+    When the cache grows over its size, least recently stored archives are evicted.
+    """
+
+    def __init__(self, io: IOBase, logger: LoggerBase, cache_dir: str, max_size_bytes: int):
+        self.io = io
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+
+    @property
+    def enabled(self) -> bool:
+        """Whether archives are cached."""
+
+        return self.max_size_bytes > 0
+
+    def find(self, directory: str, fingerprint: str) -> str | None:
+        """Finds cached archive of the provided directory.
+
+        Args:
+            directory (str): Archived directory.
+            fingerprint (str): Fingerprint of the archived content.
+
+        Returns:
+            str | None: Path to the archive or None if it is not cached.
+        """
+
+        path = self._get_path(directory, fingerprint)
+
+        return path if self.enabled and self.io.path_exists(path) else None
+
+    def store(
+        self, directory: str, fingerprint: str, entries: list[tuple[str, str | None]]
+    ) -> Iterator[bytes]:
+        """Generates archive of the provided directory and stores it in the cache.
+
+        Args:
+            directory (str): Archived directory.
+            fingerprint (str): Fingerprint of the archived content.
+            entries (list[tuple[str, str | None]]): Archive entries (see `IOBase.zip_stream`).
+
+        Returns:
+            Iterator[bytes]: Chunks of the archive.
+        """
+
+        if not self.enabled:
+            yield from self.io.zip_stream(entries)
+            return
+
+        self.io.mkdir(self.cache_dir)
+        self._evict()
+
+        yield from self.io.zip_stream(entries, self._get_path(directory, fingerprint))
+
+        # stored only if the archive was completely generated
+        self._remove_stale(directory, fingerprint)
+
+    def invalidate(self, directory: str) -> None:
+        """Removes cached archives of the provided directory.
+
+        Args:
+            directory (str): Archived directory.
+        """
+
+        if not self.enabled:
+            return
+
+        self._remove_stale(directory, None)
+
+    def _get_key(self, directory: str) -> str:
+        return hashlib.sha256(os.path.normpath(directory).encode()).hexdigest()[:32]
+
+    def _get_path(self, directory: str, fingerprint: str) -> str:
+        return str(Path(self.cache_dir) / f"{self._get_key(directory)}_{fingerprint}.zip")
+
+    def _list_archives(self) -> list[str]:
+        return [name for name in self.io.listdir(self.cache_dir) if name.endswith(".zip")]
+
+    def _remove_stale(self, directory: str, fingerprint: str | None) -> None:
+        key = self._get_key(directory)
+        current = Path(self._get_path(directory, fingerprint)).name if fingerprint else None
+
+        for name in self._list_archives():
+            if name.startswith(f"{key}_") and name != current:
+                self._remove(str(Path(self.cache_dir) / name))
+
+    def _evict(self) -> None:
+        archives = [str(Path(self.cache_dir) / name) for name in self._list_archives()]
+        sizes = {path: self.io.file_size(path) for path in archives}
+        size = sum(sizes.values())
+
+        if size <= self.max_size_bytes:
+            return
+
+        self.logger.info(f"Evicting archives, cache size {size} exceeds {self.max_size_bytes}.")
+
+        for path in sorted(archives, key=self.io.last_modified):
+            if size <= self.max_size_bytes:
+                break
+
+            self._remove(path)
+            size -= sizes[path]
+
+    def _remove(self, path: str) -> None:
+        try:
+            self.io.rm(path)
+        except FileNotFoundError:
+            # removed by another process
+            pass
+        except Exception:
+            self.logger.warn(f"Unable to remove cached archive '{path}': {traceback.format_exc()}")
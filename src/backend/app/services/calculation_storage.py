@@ -1,14 +1,19 @@
+import threading
 import traceback
+from collections.abc import Mapping
+from itertools import groupby
 from typing import Tuple
 
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from models.calculation import (
+    Charges,
     CalculationConfigDto,
     CalculationDto,
     CalculationResultDto,
     CalculationSetPreviewDto,
-    CalculationsFilters,
 )
 from models.paging import PagedList
 from models.molecule_info import MoleculeSetStats
@@ -19,7 +24,11 @@ from db.schemas.calculation import (
     CalculationSet,
     CalculationSetStats,
 )
-from db.schemas.stats import AtomTypeCount, MoleculeSetStats as MoleculeSetStatsModel
+from db.schemas.stats import (
+    AtomTypeCount,
+    MoleculeSetStats as MoleculeSetStatsModel,
+    SuitableMethod,
+)
 
 from db.repositories.calculation_config_repository import CalculationConfigRepository
 from db.repositories.calculation_repository import CalculationRepository
@@ -28,10 +37,15 @@ from db.repositories.calculation_set_repository import (
     CalculationSetRepository,
 )
 from db.repositories.moleculeset_stats_repository import MoleculeSetStatsRepository
+from db.repositories.suitable_methods_repository import SuitableMethodsRepository
 
+from models.method import Method
+from models.parameters import Parameters
 from models.setup import AdvancedSettingsDto
 from db.repositories.advanced_settings_repository import AdvancedSettingsRepository
-from db.database import SessionManager
+from db.database import AsyncSessionManager, SessionManager
+from db.dimension_cache import ConfigKey
+from services.charges_store import ChargesStore
 from services.logging.base import LoggerBase
 
 
@@ -46,21 +60,53 @@ class CalculationStorageService:
         config_repository: CalculationConfigRepository,
         stats_repository: MoleculeSetStatsRepository,
         advanced_settings_repository: AdvancedSettingsRepository,
+        suitable_methods_repository: SuitableMethodsRepository,
         session_manager: SessionManager,
+        charges_store: ChargesStore | None = None,
+        async_session_manager: AsyncSessionManager | None = None,
+        total_count_ttl: int = 60,
     ):
         self.set_repository = set_repository
         self.calculation_repository = calculation_repository
         self.config_repository = config_repository
         self.stats_repository = stats_repository
         self.advanced_settings_repository = advanced_settings_repository
+        self.suitable_methods_repository = suitable_methods_repository
         self.session_manager = session_manager
+        self.async_session_manager = async_session_manager
+        self.charges_store = charges_store
         self.logger = logger
 
+        # user id -> number of calculation sets, used for pages following a cursor
+        self._total_counts = TTLCache(maxsize=1024, ttl=total_count_ttl)
+        self._total_counts_lock = threading.Lock()
+
     def get_info(self, session: Session, file_hash: str) -> MoleculeSetStats | None:
         # Getting info manually due to lazy loading issue
 
         info = self.stats_repository.get(session, file_hash)
 
+        return self._to_stats(info)
+
+    async def get_infos_async(self, file_hashes: list[str]) -> dict[str, MoleculeSetStats]:
+        """Get info about multiple files without blocking the event loop.
+
+        Args:
+            file_hashes (list[str]): Hashes of the files.
+
+        Returns:
+            dict[str, MoleculeSetStats]: Info by file hash, files without stored info are missing.
+        """
+
+        try:
+            async with self.async_session_manager.session() as session:
+                infos = await self.stats_repository.get_all_async(session, file_hashes)
+                return {file_hash: self._to_stats(info) for file_hash, info in infos.items()}
+        except Exception as e:
+            self.logger.error(f"Error getting info about files: {traceback.format_exc()}")
+            raise e
+
+    def _to_stats(self, info: MoleculeSetStatsModel | None) -> MoleculeSetStats | None:
         if info is None:
             return None
 
@@ -72,33 +118,81 @@ class CalculationStorageService:
 
         return MoleculeSetStats(info_dict)
 
+    def _to_stats_model(self, file_hash: str, info: MoleculeSetStats) -> MoleculeSetStatsModel:
+        return MoleculeSetStatsModel(
+            file_hash=file_hash,
+            total_molecules=info.total_molecules,
+            total_atoms=info.total_atoms,
+            atom_type_counts=[
+                AtomTypeCount(symbol=count.symbol, count=count.count)
+                for count in info.atom_type_counts
+            ],
+        )
+
+    def _to_suitable_methods(
+        self,
+        file_hash: str,
+        permissive_types: bool,
+        suitable_methods: list[tuple[Method, list[Parameters]]],
+    ) -> list[SuitableMethod]:
+        pairs = []
+        for method, parameters in suitable_methods:
+            if not parameters:
+                pairs.append((method.internal_name, None))
+            else:
+                pairs.extend((method.internal_name, p.internal_name) for p in parameters)
+
+        return [
+            SuitableMethod(
+                molecule_set_id=file_hash,
+                permissive_types=permissive_types,
+                method=method,
+                parameters=parameters,
+                position=position,
+            )
+            for position, (method, parameters) in enumerate(pairs)
+        ]
+
     def get_calculations(
         self, filters: CalculationSetFilters
     ) -> PagedList[CalculationSetPreviewDto]:
-        """Get calculations from database based on filters."""
+        """Get calculations from database based on filters.
+        Total count of pages following a cursor is cached (see `total_count_ttl`)."""
 
         try:
             with self.session_manager.session() as session:
                 self.logger.info("Getting calculations from database.")
-                calculations_list = self.set_repository.get_all(session, filters)
+                total_count = self._get_cached_total_count(filters)
+                calculations_list = self.set_repository.get_all(session, filters, total_count)
+
+                if total_count is None:
+                    self._cache_total_count(filters, calculations_list.total_count)
                 calculations_list.items = [
-                    CalculationSetPreviewDto.model_validate(
-                        {
-                            "id": calculation_set.id,
-                            "files": {
-                                stats_assoc.file_name: self.get_info(
-                                    session, stats_assoc.molecule_set_id
-                                )
-                                for stats_assoc in calculation_set.molecule_set_stats_associations
-                            },
-                            "configs": calculation_set.configs,
-                            "settings": AdvancedSettingsDto.model_validate(
-                                vars(calculation_set.advanced_settings)
-                            ),
-                            "created_at": calculation_set.created_at,
-                        }
-                    )
-                    for calculation_set in calculations_list.items
+                    self._to_preview(calculation_set) for calculation_set in calculations_list.items
+                ]
+
+            return PagedList[CalculationSetPreviewDto].model_validate(calculations_list)
+        except Exception as e:
+            self.logger.error(f"Error getting calculations from database: {traceback.format_exc()}")
+            raise e
+
+    async def get_calculations_async(
+        self, filters: CalculationSetFilters
+    ) -> PagedList[CalculationSetPreviewDto]:
+        """Get calculations from database based on filters without blocking the event loop."""
+
+        try:
+            async with self.async_session_manager.session() as session:
+                self.logger.info("Getting calculations from database.")
+                total_count = self._get_cached_total_count(filters)
+                calculations_list = await self.set_repository.get_all_async(
+                    session, filters, total_count
+                )
+
+                if total_count is None:
+                    self._cache_total_count(filters, calculations_list.total_count)
+                calculations_list.items = [
+                    self._to_preview(calculation_set) for calculation_set in calculations_list.items
                 ]
 
             return PagedList[CalculationSetPreviewDto].model_validate(calculations_list)
@@ -119,21 +213,26 @@ class CalculationStorageService:
             )
             raise e
 
+    async def get_calculation_set_async(self, computation_id: str) -> CalculationSet | None:
+        """Get calculation set from database without blocking the event loop."""
+
+        try:
+            self.logger.info(f"Getting calculation set {computation_id}.")
+            async with self.async_session_manager.session() as session:
+                return await self.set_repository.get_async(session, computation_id)
+        except Exception as e:
+            self.logger.error(
+                f"Error getting calculation set {computation_id}: {traceback.format_exc()}"
+            )
+            raise e
+
     def store_file_info(self, file_hash: str, info: MoleculeSetStats) -> MoleculeSetStats:
         """Store file info to database."""
 
         try:
             with self.session_manager.session() as session:
                 self.logger.info(f"Storing stats of file with hash '{file_hash}'.")
-                info_model = MoleculeSetStatsModel(
-                    file_hash=file_hash,
-                    total_molecules=info.total_molecules,
-                    total_atoms=info.total_atoms,
-                    atom_type_counts=[
-                        AtomTypeCount(symbol=count.symbol, count=count.count)
-                        for count in info.atom_type_counts
-                    ],
-                )
+                info_model = self._to_stats_model(file_hash, info)
 
                 return self.stats_repository.store(session, info_model)
         except Exception as e:
@@ -143,6 +242,110 @@ class CalculationStorageService:
             )
             raise e
 
+    def store_suitable_methods(
+        self,
+        file_hash: str,
+        permissive_types: bool,
+        suitable_methods: list[tuple[Method, list[Parameters]]],
+    ) -> None:
+        """Store methods and parameters suitable for the file with the provided hash."""
+
+        try:
+            with self.session_manager.session() as session:
+                self.logger.info(f"Storing suitable methods of file with hash '{file_hash}'.")
+
+                stored = self.suitable_methods_repository.get_stored_file_hashes(
+                    session, [file_hash], permissive_types
+                )
+
+                if file_hash in stored:
+                    return
+
+                self.suitable_methods_repository.store(
+                    session,
+                    file_hash,
+                    permissive_types,
+                    self._to_suitable_methods(file_hash, permissive_types, suitable_methods),
+                )
+        except Exception as e:
+            self.logger.error(
+                f"Error storing suitable methods of file with hash '{file_hash}': "
+                + f"{traceback.format_exc()}"
+            )
+            raise e
+
+    def store_files_info(
+        self,
+        infos: dict[str, MoleculeSetStats],
+        suitable_methods: dict[str, list[tuple[Method, list[Parameters]]]],
+        permissive_types: bool = True,
+    ) -> None:
+        """Store stats and suitable methods of multiple files in a single transaction.
+        Stats and methods which are already stored are skipped.
+
+        Args:
+            infos (dict[str, MoleculeSetStats]): Stats of the files by file hash.
+            suitable_methods (dict[str, list[tuple[Method, list[Parameters]]]]):
+                Methods suitable for the files by file hash.
+            permissive_types (bool): Whether permissive types were used to find the methods.
+        """
+
+        try:
+            with self.session_manager.session() as session:
+                self.logger.info(f"Storing stats of {len(infos)} files.")
+
+                stored_infos = self.stats_repository.get_stored_file_hashes(session, list(infos))
+                for file_hash, info in infos.items():
+                    if file_hash not in stored_infos:
+                        session.add(self._to_stats_model(file_hash, info))
+
+                stored_methods = self.suitable_methods_repository.get_stored_file_hashes(
+                    session, list(suitable_methods), permissive_types
+                )
+                for file_hash, methods in suitable_methods.items():
+                    if file_hash not in stored_methods:
+                        self.suitable_methods_repository.store(
+                            session,
+                            file_hash,
+                            permissive_types,
+                            self._to_suitable_methods(file_hash, permissive_types, methods),
+                        )
+        except Exception as e:
+            self.logger.error(f"Error storing stats of files: {traceback.format_exc()}")
+            raise e
+
+    def get_files_without_suitable_methods(
+        self, file_hashes: list[str], permissive_types: bool
+    ) -> list[str]:
+        """Returns hashes of files which do not have suitable methods stored."""
+
+        try:
+            with self.session_manager.session() as session:
+                stored = self.suitable_methods_repository.get_stored_file_hashes(
+                    session, file_hashes, permissive_types
+                )
+
+                return [file_hash for file_hash in file_hashes if file_hash not in stored]
+        except Exception as e:
+            self.logger.error(f"Error getting stored suitable methods: {traceback.format_exc()}")
+            raise e
+
+    def get_common_suitable_methods(
+        self, file_hashes: list[str], permissive_types: bool
+    ) -> list[tuple[str, str | None]]:
+        """Returns (method, parameters) pairs suitable for all files with the provided hashes.
+        Pairs are ordered from the most suitable one."""
+
+        try:
+            self.logger.info(f"Getting stored suitable methods for file hashes '{file_hashes}'.")
+            with self.session_manager.session() as session:
+                return self.suitable_methods_repository.get_common(
+                    session, file_hashes, permissive_types
+                )
+        except Exception as e:
+            self.logger.error(f"Error getting stored suitable methods: {traceback.format_exc()}")
+            raise e
+
     def store_calculation_results(
         self,
         computation_id: str,
@@ -154,31 +357,43 @@ class CalculationStorageService:
             self.logger.info(f"Storing calculation results for computation {computation_id}.")
 
             with self.session_manager.session() as session:
-                settings_entity = self._get_or_create_advanced_settings(session, settings)
+                settings_id = self._get_or_create_advanced_settings(session, settings)
                 calculation_set = self._get_or_create_calculation_set(
-                    session, computation_id, user_id, settings_entity
+                    session, computation_id, user_id, settings_id
                 )
 
-                calculations = []
-                added_stats = set()
+                results_with_configs = [
+                    (result, self._get_or_create_config(session, result.config, calculation_set))
+                    for result in results
+                ]
 
-                for result in results:
-                    config_entity = self._get_or_create_config(
-                        session, result.config, calculation_set
-                    )
+                # single existence query for the whole batch
+                existing = self.calculation_repository.get_existing_charges_paths(
+                    session,
+                    [
+                        calculation.file_hash
+                        for result in results
+                        for calculation in result.calculations
+                    ],
+                    [config_id for _, config_id in results_with_configs],
+                    settings_id,
+                )
 
-                    new_calculations, files = self._process_calculations(
-                        session, result, config_entity, settings_entity
+                calculations = []
+                files = {}
+
+                for result, config_id in results_with_configs:
+                    new_calculations, result_files = self._process_calculations(
+                        result, config_id, settings_id, settings, existing
                     )
                     calculations.extend(new_calculations)
+                    files.update(result_files)
 
-                    self._add_molecule_stats(session, calculation_set, files, added_stats)
-
-                for calculation in calculations:
-                    self.calculation_repository.store(session, calculation)
-
+                self._add_molecule_stats(session, calculation_set, files)
+                self.calculation_repository.store_all(session, calculations)
                 self.set_repository.store(session, calculation_set)
 
+            self._invalidate_total_count(user_id)
         except Exception as e:
             self.logger.error(
                 f"Error storing calculation results for computation {computation_id}."
@@ -198,12 +413,12 @@ class CalculationStorageService:
             self.logger.info("Setting up calculation.")
 
             with self.session_manager.session() as session:
-                settings_entity = self._get_or_create_advanced_settings(session, settings)
+                settings_id = self._get_or_create_advanced_settings(session, settings)
 
                 calculation_set = CalculationSet(
                     id=computation_id,
                     user_id=user_id,
-                    advanced_settings=settings_entity,
+                    advanced_settings_id=settings_id,
                 )
 
                 for file_hash in file_hashes:
@@ -226,53 +441,88 @@ class CalculationStorageService:
     ]:
         """Returns a list of hashes and configs that are not in the database."""
 
-        to_calculate = {}
-        cached = {}
-
         try:
             self.logger.info("Filtering existing calculations.")
 
             with self.session_manager.session() as session:
-                for config in configs:
-                    for file_hash in file_hashes:
-                        filters = CalculationsFilters(
-                            hash=file_hash,
-                            method=config.method,
-                            parameters=config.parameters,
-                            read_hetatm=settings.read_hetatm,
-                            ignore_water=settings.ignore_water,
-                            permissive_types=settings.permissive_types,
-                        )
+                settings_id = self.advanced_settings_repository.get_id(session, settings)
+                config_ids = {
+                    (config.method, config.parameters): self.config_repository.get_id(
+                        session, config.method, config.parameters
+                    )
+                    for config in configs
+                }
+
+                existing_calculations = (
+                    self.calculation_repository.get_all_for_files(
+                        session, file_hashes, self._stored_ids(config_ids), settings_id
+                    )
+                    if settings_id is not None
+                    else []
+                )
+
+            return self._split_existing(file_hashes, configs, config_ids, existing_calculations)
+        except Exception as e:
+            self.logger.error(f"Error filtering existing calculations: {traceback.format_exc()}")
+            raise e
+
+    async def filter_existing_calculations_async(
+        self,
+        settings: AdvancedSettingsDto,
+        file_hashes: list[str],
+        configs: list[CalculationConfigDto],
+    ) -> Tuple[
+        dict[str, list[CalculationConfigDto]], dict[CalculationConfigDto, list[CalculationDto]]
+    ]:
+        """Returns a list of hashes and configs that are not in the database
+        without blocking the event loop."""
 
-                        existing_calculation = self.calculation_repository.get(session, filters)
-                        if existing_calculation is None:
-                            if config not in to_calculate:
-                                to_calculate[config] = []
-
-                            to_calculate[config].append(file_hash)
-                        else:
-                            if config not in cached:
-                                cached[config] = []
-
-                            cached[config].append(
-                                CalculationDto(
-                                    file=existing_calculation.file_name,
-                                    file_hash=existing_calculation.file_hash,
-                                    charges=existing_calculation.charges,
-                                    config=config,
-                                ),
-                            )
-                            self.logger.info(
-                                f"Existing calculation found for file '{file_hash}', skipping."
-                            )
-
-            return to_calculate, cached
+        try:
+            self.logger.info("Filtering existing calculations.")
+
+            async with self.async_session_manager.session() as session:
+                settings_id = await self.advanced_settings_repository.get_id_async(
+                    session, settings
+                )
+                config_ids = {
+                    (config.method, config.parameters): await self.config_repository.get_id_async(
+                        session, config.method, config.parameters
+                    )
+                    for config in configs
+                }
+
+                existing_calculations = (
+                    await self.calculation_repository.get_all_for_files_async(
+                        session, file_hashes, self._stored_ids(config_ids), settings_id
+                    )
+                    if settings_id is not None
+                    else []
+                )
+
+            return self._split_existing(file_hashes, configs, config_ids, existing_calculations)
         except Exception as e:
             self.logger.error(f"Error filtering existing calculations: {traceback.format_exc()}")
             raise e
 
-    def get_calculation_results(self, computation_id: str) -> list[CalculationResultDto]:
-        """Get calculation results from database."""
+    def get_calculation_results(
+        self,
+        computation_id: str,
+        file_hash: str | None = None,
+        molecule: str | None = None,
+        include_charges: bool = True,
+    ) -> list[CalculationResultDto]:
+        """Get calculation results from database grouped by config.
+
+        Args:
+            computation_id (str): Computation id.
+            file_hash (str | None, optional): Return only results of this file. Defaults to None.
+            molecule (str | None, optional): Return only charges of this molecule. Defaults to None.
+            include_charges (bool, optional): Whether to return charges,
+                they are not loaded from the database otherwise. Defaults to True.
+
+        Returns:
+            list[CalculationResultDto]: Results of the computation, one per config.
+        """
 
         try:
             self.logger.info(f"Getting calculation results for computation {computation_id}.")
@@ -282,19 +532,45 @@ class CalculationStorageService:
                 if not calculation_set:
                     return []
 
-                result = [
-                    CalculationResultDto(
-                        config=CalculationConfigDto.model_validate(config),
-                        calculations=[
-                            CalculationDto.model_validate(calculation)
-                            for calculation in calculation_set.calculations
-                            if calculation.config == config
-                        ],
-                    )
-                    for config in calculation_set.configs
-                ]
+                calculations = self.calculation_repository.get_for_set(
+                    session, computation_id, file_hash, include_charges
+                )
 
-                return result
+                return self._group_results(
+                    calculation_set, calculations, molecule, include_charges
+                )
+
+        except Exception as e:
+            self.logger.error(
+                f"Error getting calculation results for computation {computation_id}: {traceback.format_exc()}"
+            )
+            raise e
+
+    async def get_calculation_results_async(
+        self,
+        computation_id: str,
+        file_hash: str | None = None,
+        molecule: str | None = None,
+        include_charges: bool = True,
+    ) -> list[CalculationResultDto]:
+        """Get calculation results from database grouped by config without blocking the event loop.
+        See `get_calculation_results` for description of the arguments."""
+
+        try:
+            self.logger.info(f"Getting calculation results for computation {computation_id}.")
+            async with self.async_session_manager.session() as session:
+                calculation_set = await self.set_repository.get_async(session, computation_id)
+
+                if not calculation_set:
+                    return []
+
+                calculations = await self.calculation_repository.get_for_set_async(
+                    session, computation_id, file_hash, include_charges
+                )
+
+                return self._group_results(
+                    calculation_set, calculations, molecule, include_charges
+                )
 
         except Exception as e:
             self.logger.error(
@@ -309,33 +585,187 @@ class CalculationStorageService:
             self.logger.info(f"Deleting calculation set {computation_id}.")
             with self.session_manager.session() as session:
                 self.set_repository.delete(session, computation_id)
+
+            self._invalidate_total_count()
+        except Exception as e:
+            self.logger.error(
+                f"Error deleting calculation set {computation_id}: {traceback.format_exc()}"
+            )
+            raise e
+
+    async def delete_calculation_set_async(self, computation_id: str) -> None:
+        """Delete calculation set from database without blocking the event loop."""
+
+        try:
+            self.logger.info(f"Deleting calculation set {computation_id}.")
+            async with self.async_session_manager.session() as session:
+                await self.set_repository.delete_async(session, computation_id)
+
+            self._invalidate_total_count()
         except Exception as e:
             self.logger.error(
                 f"Error deleting calculation set {computation_id}: {traceback.format_exc()}"
             )
             raise e
 
+    def _get_cached_total_count(self, filters: CalculationSetFilters) -> int | None:
+        """Returns cached total count for pages following a cursor, other pages are counted."""
+
+        if filters.cursor is None:
+            return None
+
+        with self._total_counts_lock:
+            return self._total_counts.get(filters.user_id)
+
+    def _cache_total_count(self, filters: CalculationSetFilters, total_count: int) -> None:
+        with self._total_counts_lock:
+            self._total_counts[filters.user_id] = total_count
+
+    def _invalidate_total_count(self, user_id: str | None = None) -> None:
+        """Removes cached total count of the user, or of all users if no user is provided.
+        Other processes keep their counts until they expire."""
+
+        with self._total_counts_lock:
+            if user_id is None:
+                self._total_counts.clear()
+            else:
+                self._total_counts.pop(user_id, None)
+
+    def _to_preview(self, calculation_set: CalculationSet) -> CalculationSetPreviewDto:
+        # configs, settings and stats are eagerly loaded by the repository
+        return CalculationSetPreviewDto.model_validate(
+            {
+                "id": calculation_set.id,
+                "files": {
+                    stats_assoc.file_name: self._to_stats(stats_assoc.molecule_set)
+                    for stats_assoc in calculation_set.molecule_set_stats_associations
+                },
+                "configs": calculation_set.configs,
+                "settings": AdvancedSettingsDto.model_validate(
+                    vars(calculation_set.advanced_settings)
+                ),
+                "created_at": calculation_set.created_at,
+            }
+        )
+
+    def _split_existing(
+        self,
+        file_hashes: list[str],
+        configs: list[CalculationConfigDto],
+        config_ids: dict[ConfigKey, str | None],
+        existing_calculations: list[Calculation],
+    ) -> Tuple[
+        dict[str, list[CalculationConfigDto]], dict[CalculationConfigDto, list[CalculationDto]]
+    ]:
+        """Splits requested calculations to those which need to be calculated and cached ones.
+        'config_ids' maps (method, parameters) of the configs to their ids (None if not stored)."""
+
+        to_calculate = {}
+        cached = {}
+
+        existing = {}
+        for calculation in existing_calculations:
+            existing.setdefault((calculation.file_hash, calculation.config_id), calculation)
+
+        for config in configs:
+            config_id = config_ids.get((config.method, config.parameters))
+
+            for file_hash in file_hashes:
+                existing_calculation = existing.get((file_hash, config_id))
+
+                if existing_calculation is None:
+                    if config not in to_calculate:
+                        to_calculate[config] = []
+
+                    to_calculate[config].append(file_hash)
+                else:
+                    try:
+                        charges = self._get_charges(existing_calculation)
+                    except FileNotFoundError:
+                        self.logger.warn(
+                            f"Stored charges of file '{file_hash}' are missing, recalculating."
+                        )
+                        to_calculate.setdefault(config, []).append(file_hash)
+                        continue
+
+                    if config not in cached:
+                        cached[config] = []
+
+                    cached[config].append(
+                        CalculationDto(
+                            file=existing_calculation.file_name,
+                            file_hash=existing_calculation.file_hash,
+                            charges=charges,
+                            config=config,
+                        ),
+                    )
+                    self.logger.info(f"Existing calculation found for file '{file_hash}', skipping.")
+
+        return to_calculate, cached
+
+    def _group_results(
+        self,
+        calculation_set: CalculationSet,
+        calculations: list[tuple[Calculation, str | None]],
+        molecule: str | None,
+        include_charges: bool,
+    ) -> list[CalculationResultDto]:
+        """Groups calculations ordered by config into results of the configs of the set."""
+
+        grouped: dict[str, list[CalculationDto]] = {}
+        for config_id, group in groupby(calculations, key=lambda row: row[0].config_id):
+            grouped[config_id] = [
+                CalculationDto(
+                    file=file_name or calculation.file_name,
+                    file_hash=calculation.file_hash,
+                    charges=(
+                        self._select_charges(self._get_charges(calculation), molecule)
+                        if include_charges
+                        else {}
+                    ),
+                    config=CalculationConfigDto.model_validate(calculation.config),
+                )
+                for calculation, file_name in group
+            ]
+
+        return [
+            CalculationResultDto(
+                config=CalculationConfigDto.model_validate(config),
+                calculations=grouped.get(config.id, []),
+            )
+            for config in calculation_set.configs
+        ]
+
     def _get_or_create_advanced_settings(
         self, session: Session, settings: AdvancedSettingsDto
-    ) -> AdvancedSettings:
-        """Get existing settings or create new."""
-
-        settings_entity = self.advanced_settings_repository.get(session, settings)
-        if settings_entity is None:
-            settings_entity = AdvancedSettings(
-                ignore_water=settings.ignore_water,
-                read_hetatm=settings.read_hetatm,
-                permissive_types=settings.permissive_types,
-            )
-            self.advanced_settings_repository.store(session, settings_entity)
-        return settings_entity
+    ) -> str:
+        """Get id of existing settings or create new."""
+
+        settings_id = self.advanced_settings_repository.get_id(session, settings)
+        if settings_id is not None:
+            return settings_id
+
+        settings_entity = AdvancedSettings(
+            ignore_water=settings.ignore_water,
+            read_hetatm=settings.read_hetatm,
+            permissive_types=settings.permissive_types,
+        )
+
+        try:
+            with session.begin_nested():
+                self.advanced_settings_repository.store(session, settings_entity)
+        except IntegrityError:
+            # created concurrently by another worker
+            return self.advanced_settings_repository.get_id(session, settings)
+
+        return settings_entity.id
 
     def _get_or_create_calculation_set(
         self,
         session: Session,
         computation_id: str,
         user_id: str | None,
-        settings_entity: AdvancedSettings,
+        settings_id: str,
     ) -> CalculationSet:
         """Get existing calculation set or create new."""
 
@@ -344,7 +774,7 @@ class CalculationStorageService:
             calculation_set = CalculationSet(
                 id=computation_id,
                 user_id=user_id,
-                advanced_settings=settings_entity,
+                advanced_settings_id=settings_id,
             )
             self.set_repository.store(session, calculation_set)
 
@@ -352,81 +782,146 @@ class CalculationStorageService:
 
     def _get_or_create_config(
         self, session: Session, config: CalculationConfigDto, calculation_set: CalculationSet
-    ) -> CalculationConfig:
-        """Get existing config or create new."""
+    ) -> str:
+        """Get id of existing config or create new, the config is added to the calculation set."""
 
-        existing_config = self.config_repository.get(session, config.method, config.parameters)
+        config_id = self.config_repository.get_id(session, config.method, config.parameters)
 
-        if existing_config is None:
+        if config_id is None:
             config_entity = CalculationConfig(method=config.method, parameters=config.parameters)
-        else:
-            config_entity = existing_config
 
-        if config_entity not in calculation_set.configs:
-            calculation_set.configs.append(config_entity)
+            try:
+                with session.begin_nested():
+                    self.config_repository.store(session, config_entity)
+                config_id = config_entity.id
+            except IntegrityError:
+                # created concurrently by another worker
+                config_id = self.config_repository.get_id(
+                    session, config.method, config.parameters
+                )
+
+        if all(set_config.id != config_id for set_config in calculation_set.configs):
+            # taken from the identity map if the config has been loaded in this session
+            calculation_set.configs.append(session.get(CalculationConfig, config_id))
 
-        return config_entity
+        return config_id
 
     def _process_calculations(
         self,
-        session: Session,
         result: CalculationResultDto,
-        config_entity: CalculationConfig,
-        settings_entity: AdvancedSettings,
+        config_id: str,
+        settings_id: str,
+        settings: AdvancedSettingsDto,
+        existing: dict[tuple[str, str], str | None],
     ) -> tuple[list[Calculation], dict[str, str]]:
-        """Process calculation results and return new calculations and files (file_hash -> file)."""
+        """Process calculation results and return new calculations and files (file_hash -> file).
+
+        'existing' maps (file_hash, config_id) pairs of stored calculations to paths
+        of their charges in the charges store, calculations added here are added to it as well.
+        Missing charges files of stored calculations (recalculated ones) are written again."""
 
         new_calculations = []
         files = {}
 
         for calculation in result.calculations:
             files[calculation.file_hash] = calculation.file
+            key = (calculation.file_hash, config_id)
 
-            calculation_exists = self.calculation_repository.get(
-                session,
-                CalculationsFilters(
-                    hash=calculation.file_hash,
-                    method=calculation.config.method,
-                    parameters=calculation.config.parameters,
-                    read_hetatm=settings_entity.read_hetatm,
-                    ignore_water=settings_entity.ignore_water,
-                    permissive_types=settings_entity.permissive_types,
-                ),
-            )
+            if key in existing:
+                self._restore_charges(existing[key], calculation)
+                continue
 
-            if calculation_exists is None:
-                new_calculations.append(
-                    Calculation(
-                        file_name=calculation.file,
-                        file_hash=calculation.file_hash,
-                        charges=calculation.charges,
-                        config=config_entity,
-                        advanced_settings=settings_entity,
-                    )
-                )
+            entity = self._to_calculation(calculation, config_id, settings_id, settings)
+            existing[key] = entity.charges_path
+            new_calculations.append(entity)
 
         return new_calculations, files
 
+    def _restore_charges(self, charges_path: str | None, calculation: CalculationDto) -> None:
+        """Writes charges of a stored calculation to the charges store if their file is missing."""
+
+        if charges_path is None or self.charges_store is None or not self.charges_store.enabled:
+            return
+
+        self.charges_store.restore(charges_path, calculation.charges)
+
+    def _to_calculation(
+        self,
+        calculation: CalculationDto,
+        config_id: str,
+        settings_id: str,
+        settings: AdvancedSettingsDto,
+    ) -> Calculation:
+        """Creates calculation entity, its charges are written to the charges store if enabled."""
+
+        entity = Calculation(
+            file_name=calculation.file,
+            file_hash=calculation.file_hash,
+            config_id=config_id,
+            advanced_settings_id=settings_id,
+        )
+
+        if self.charges_store is not None and self.charges_store.enabled:
+            entity.charges_path, entity.charges_size = self.charges_store.write(
+                calculation.file_hash, calculation.config, settings, calculation.charges
+            )
+        else:
+            entity.charges = calculation.charges
+
+        return entity
+
+    def _stored_ids(self, ids: dict[ConfigKey, str | None]) -> list[str]:
+        """Returns ids of stored rows (without None values of missing ones)."""
+
+        return [value for value in ids.values() if value is not None]
+
+    def _select_charges(self, charges: Mapping[str, list[float]], molecule: str | None) -> Charges:
+        """Returns charges of the provided molecule only (if any),
+        other molecules of lazily decoded charges are not decoded at all."""
+
+        if molecule is None:
+            return charges
+
+        return {molecule: charges[molecule]} if molecule in charges else {}
+
+    def _get_charges(self, calculation: Calculation) -> Charges:
+        """Returns charges of a calculation, reading them from the charges store if needed."""
+
+        if calculation.charges_path is None:
+            return calculation.charges
+
+        if self.charges_store is None or not self.charges_store.enabled:
+            raise ValueError(
+                f"Charges of calculation '{calculation.id}' are stored on disk, "
+                + "but the charges store is not configured."
+            )
+
+        return self.charges_store.read(calculation.charges_path)
+
     def _add_molecule_stats(
         self,
         session: Session,
         calculation_set: CalculationSet,
         files: dict[str, str],
-        added_stats: set[str],
     ) -> None:
-        file_hashes = set(files.keys())
-        new_file_hashes = file_hashes - added_stats
+        added_stats = {
+            association.molecule_set_id
+            for association in calculation_set.molecule_set_stats_associations
+        }
+        new_file_hashes = [file_hash for file_hash in files if file_hash not in added_stats]
 
-        for file_hash in new_file_hashes:
-            stats = self.stats_repository.get(session, file_hash)
+        if not new_file_hashes:
+            return
+
+        # stats should always exist, files without them are skipped
+        stored = self.stats_repository.get_stored_file_hashes(session, new_file_hashes)
 
-            if stats is None:
-                # This should never happen
+        for file_hash in new_file_hashes:
+            if file_hash not in stored:
                 continue
 
             association = CalculationSetStats(
-                molecule_set_id=stats.file_hash,
-                file_name=files.get(stats.file_hash),
+                molecule_set_id=file_hash,
+                file_name=files.get(file_hash),
             )
             calculation_set.molecule_set_stats_associations.append(association)
-            added_stats.add(stats.file_hash)
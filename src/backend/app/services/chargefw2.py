@@ -1,19 +1,24 @@
 """ChargeFW2 service module."""
 
 import asyncio
+import multiprocessing
 import os
 from pathlib import Path
+import tempfile
 import traceback
 
-from collections import Counter, defaultdict
-from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple
+from collections import defaultdict
+from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Awaitable, Callable, Literal
 
 
 # Temporary solution to get Molecules class
 from chargefw2 import Molecules
 
 from models.calculation import (
+    Charges,
     CalculationDto,
     CalculationConfigDto,
     CalculationResultDto,
@@ -25,6 +30,7 @@ from models.setup import AdvancedSettingsDto
 from models.suitable_methods import SuitableMethods
 
 from integrations.chargefw2.base import ChargeFW2Base
+from integrations.chargefw2 import process_pool, sharding
 
 from api.v1.constants import CHARGES_OUTPUT_EXTENSION
 
@@ -32,7 +38,21 @@ from api.v1.constants import CHARGES_OUTPUT_EXTENSION
 from services.io import IOService
 from services.logging.base import LoggerBase
 from services.mmcif import MmCIFService
+from services.molecules_cache import MoleculesCache, MoleculesKey
 from services.calculation_storage import CalculationStorageService
+from services.computation_plan import ComputationPlan, plan_calculations, plan_computation
+
+
+class ComputationCancelledError(Exception):
+    """Raised when a running computation is cancelled."""
+
+
+@dataclass
+class FileAnalysis:
+    """Info about a file and methods suitable for it."""
+
+    info: MoleculeSetStats
+    suitable_methods: list[tuple[Method, list[Parameters]]]
 
 
 class ChargeFW2Service:
@@ -47,20 +67,146 @@ class ChargeFW2Service:
         calculation_storage: CalculationStorageService,
         max_workers: int = 4,
         max_concurrent_calculations: int = 4,
+        executor_type: Literal["thread", "process"] = "thread",
+        molecules_cache: MoleculesCache | None = None,
+        shard_min_size_bytes: int = 0,
     ):
         self.chargefw2 = chargefw2
         self.logger = logger
         self.io = io
         self.mmcif_service = mmcif_service
         self.calculation_storage = calculation_storage
+        self.molecules_cache = molecules_cache
+        self.max_workers = max_workers
+        # SDF/MOL2 files of at least this size are split into shards calculated in parallel
+        self.shard_min_size_bytes = shard_min_size_bytes
+        if executor_type not in ("thread", "process"):
+            # fail on startup instead of silently running calculations in threads
+            raise ValueError(
+                f"Invalid executor type '{executor_type}' (ACC2_EXECUTOR_TYPE), "
+                + "expected 'thread' or 'process'."
+            )
+        self.executor_type = executor_type
         self.executor = ThreadPoolExecutor(max_workers)
+        self.process_executor: ProcessPoolExecutor | None = None
+        # molecules parsed during a computation (computation_id -> (path, settings) -> molecules)
+        self.computation_molecules: dict[str, dict[tuple, asyncio.Future[Molecules]]] = {}
         self.semaphore = asyncio.Semaphore(max_concurrent_calculations)
+        # tasks of running computations (computation_id -> (user_id, tasks))
+        self.computation_tasks: dict[str, tuple[str | None, set[asyncio.Task]]] = {}
+        self.cancelled_computations: set[str] = set()
+        # locks of molecules used by running calls (id of molecules -> (lock, number of calls))
+        self.molecules_locks: dict[int, tuple[asyncio.Lock, int]] = {}
 
     async def _run_in_executor(self, func, *args, executor=None):
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            self.executor if executor is None else executor, func, *args
-        )
+        """Runs the provided function in an executor.
+        If the calling task is cancelled, a call which has not started yet is dropped.
+        Running (native) calls can not be interrupted, so cancellation waits until they return
+        and the executor slot is released."""
+
+        future = (self.executor if executor is None else executor).submit(func, *args)
+
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            if not future.cancel():
+                await asyncio.wait([asyncio.wrap_future(future)])
+            raise
+
+    async def _run_with_molecules(self, molecules: Molecules, func, *args):
+        """Runs the provided function using the provided molecules in the executor.
+        Molecules may be shared (molecules cache, configs of a computation) and ChargeFW2
+        does not support concurrent calls on the same molecules, so these calls are serialized.
+        Waiting calls do not occupy executor slots, calls on different molecules run in parallel."""
+
+        key = id(molecules)
+        lock, calls = self.molecules_locks.get(key, (asyncio.Lock(), 0))
+        self.molecules_locks[key] = (lock, calls + 1)
+
+        try:
+            async with lock:
+                return await self._run_in_executor(func, *args)
+        finally:
+            lock, calls = self.molecules_locks[key]
+            if calls == 1:
+                del self.molecules_locks[key]
+            else:
+                self.molecules_locks[key] = (lock, calls - 1)
+
+    async def _run_in_process(self, func, *args):
+        """Runs the provided function from `process_pool` module in a worker process.
+        If a worker process dies (e.g. crash of ChargeFW2 on invalid input),
+        the pool is recreated so that following calculations are not affected."""
+
+        executor = self._get_process_executor()
+
+        try:
+            return await self._run_in_executor(func, *args, executor=executor)
+        except BrokenProcessPool as e:
+            self.logger.error("ChargeFW2 worker process terminated unexpectedly, restarting pool.")
+            if self.process_executor is executor:
+                self.process_executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError("ChargeFW2 worker process terminated unexpectedly.") from e
+
+    def _get_process_executor(self) -> Executor:
+        if self.process_executor is None:
+            self.process_executor = ProcessPoolExecutor(
+                self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=process_pool.initialize,
+                initargs=(type(self.chargefw2),),
+            )
+
+        return self.process_executor
+
+    def shutdown(self) -> None:
+        """Shuts down the executors. Calls which have not started yet are cancelled,
+        so that worker processes do not outlive the application."""
+
+        self.logger.info("Shutting down ChargeFW2 executors.")
+
+        if self.process_executor is not None:
+            self.process_executor.shutdown(cancel_futures=True)
+            self.process_executor = None
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def cancel(self, computation_id: str, user_id: str | None) -> bool:
+        """Cancels a computation running in this process.
+        Calculations waiting for a calculation slot are dropped, following steps
+        (saving charges, writing mmCIF files) are not run.
+
+        Args:
+            computation_id (str): Computation id.
+            user_id (str | None): User cancelling the computation.
+
+        Returns:
+            bool: True if the computation was found and cancelled.
+        """
+
+        owner, tasks = self.computation_tasks.get(computation_id, (None, set()))
+
+        if not tasks or owner != user_id:
+            return False
+
+        self.logger.info(f"Cancelling computation '{computation_id}'.")
+        self.cancelled_computations.add(computation_id)
+
+        for task in tasks:
+            task.cancel()
+
+        return True
+
+    def _register_tasks(
+        self, computation_id: str, user_id: str | None, tasks: list[asyncio.Task]
+    ) -> None:
+        _, registered = self.computation_tasks.setdefault(computation_id, (user_id, set()))
+        registered.update(tasks)
+
+    def _unregister_tasks(self, computation_id: str) -> None:
+        self.computation_tasks.pop(computation_id, None)
+        self.cancelled_computations.discard(computation_id)
 
     # Method related operations
     def get_available_methods(self) -> list[Method]:
@@ -98,7 +244,9 @@ class ChargeFW2Service:
         try:
             self.logger.info(f"Getting suitable methods for computation '{computation_id}'")
 
-            calculation_set = self.calculation_storage.get_calculation_set(computation_id)
+            calculation_set = await self.calculation_storage.get_calculation_set_async(
+                computation_id
+            )
 
             settings = AdvancedSettingsDto()
             if calculation_set is not None:
@@ -119,52 +267,113 @@ class ChargeFW2Service:
     async def _find_suitable_methods(
         self, file_hashes: list[str], permissive_types: bool, user_id: str | None
     ) -> SuitableMethods:
-        """Helper method to find suitable methods for calculation."""
+        """Helper method to find suitable methods for calculation.
+        Suitable methods are stored per file, so only files without stored methods are parsed."""
 
-        suitable_methods = Counter()
         workdir = self.io.get_file_storage_path(user_id)
+        file_hashes = list(dict.fromkeys(file_hashes))
 
-        dir_contents = self.io.listdir(workdir)
+        files = self.io.get_filepaths(file_hashes, user_id)
         for file_hash in file_hashes:
-            file = next(
-                (f for f in dir_contents if self.io.parse_filename(f)[0] == file_hash), None
-            )
-            if file is None:
+            if file_hash not in files:
                 self.logger.warn(f"File with hash {file_hash} not found in {workdir}, skipping.")
-                continue
+                return SuitableMethods(methods=[], parameters={})
+
+        missing = self.calculation_storage.get_files_without_suitable_methods(
+            file_hashes, permissive_types
+        )
+        for file_hash in missing:
+            await self.store_suitable_methods(file_hash, files[file_hash], permissive_types)
+
+        pairs = self.calculation_storage.get_common_suitable_methods(file_hashes, permissive_types)
+
+        return self._to_suitable_methods(pairs)
+
+    async def store_suitable_methods(
+        self, file_hash: str, file_path: str, permissive_types: bool = True
+    ) -> None:
+        """Find methods suitable for the provided file and store them in the database."""
+
+        methods = await self.find_suitable_methods(file_path, permissive_types)
+        self.calculation_storage.store_suitable_methods(file_hash, permissive_types, methods)
 
-            input_file = os.path.join(workdir, file)
-            molecules = await self.read_molecules(input_file, True, False, permissive_types)
-            methods: list[tuple[Method, list[Parameters]]] = await self._run_in_executor(
-                self.chargefw2.get_suitable_methods, molecules
+    async def find_suitable_methods(
+        self, file_path: str, permissive_types: bool = True
+    ) -> list[tuple[Method, list[Parameters]]]:
+        """Find methods (and their parameters) suitable for the provided file."""
+
+        try:
+            self.logger.info(f"Finding suitable methods for file {file_path}.")
+
+            molecules = await self.read_molecules(file_path, True, False, permissive_types)
+
+            return await self._run_with_molecules(
+                molecules, self.chargefw2.get_suitable_methods, molecules
             )
-            for method, parameters in methods:
-                if not parameters or len(parameters) == 0:
-                    suitable_methods[(method,)] += 1
-                else:
-                    for p in parameters:
-                        suitable_methods[(method, p)] += 1
-
-        all_valid = [
-            pair for pair in suitable_methods if suitable_methods[pair] == len(file_hashes)
-        ]
+        except Exception as e:
+            self.logger.error(f"Error finding suitable methods for file {file_path}: {e}")
+            raise e
 
-        # Remove duplicates from methods
-        tmp = {}
-        for data in all_valid:
-            tmp[data[0]] = None
+    async def analyze_files(self, file_paths: list[str]) -> list[FileAnalysis | Exception]:
+        """Get info and suitable methods of the provided (e.g. uploaded) files.
+        Files are processed in parallel, at most `max_workers` files at once.
 
-        methods = list(tmp.keys())
+        Args:
+            file_paths (list[str]): Paths to the files.
 
-        parameters = defaultdict(list)
-        for pair in all_valid:
-            if len(pair) == 2:
-                parameters[pair[0]].append(pair[1])
+        Returns:
+            list[FileAnalysis | Exception]: Results in order of the files,
+                error for files which could not be processed.
+        """
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def analyze(file_path: str) -> FileAnalysis:
+            async with semaphore:
+                self.logger.info(f"Analyzing file {file_path}.")
+
+                # info does not depend on the settings, so the file is parsed only once
+                molecules = await self.read_molecules(file_path, True, False, True)
+                info = await self._run_with_molecules(molecules, molecules.info)
+                suitable_methods = await self._run_with_molecules(
+                    molecules, self.chargefw2.get_suitable_methods, molecules
+                )
 
-        parameters_with_metadata = {
-            method.internal_name: params for method, params in parameters.items()
+                return FileAnalysis(MoleculeSetStats(info.to_dict()), suitable_methods)
+
+        return await asyncio.gather(
+            *[analyze(file_path) for file_path in file_paths], return_exceptions=True
+        )
+
+    def _to_suitable_methods(self, pairs: list[tuple[str, str | None]]) -> SuitableMethods:
+        """Converts stored (method, parameters) pairs to SuitableMethods."""
+
+        available_methods = {
+            method.internal_name: method for method in self.chargefw2.get_available_methods()
         }
-        return SuitableMethods(methods=methods, parameters=parameters_with_metadata)
+        available_parameters: dict[str, dict[str, Parameters]] = {}
+
+        methods = {}
+        parameters = defaultdict(list)
+        for method_name, parameters_name in pairs:
+            if method_name not in available_methods:
+                continue
+
+            methods[method_name] = available_methods[method_name]
+
+            if parameters_name is None:
+                continue
+
+            if method_name not in available_parameters:
+                available_parameters[method_name] = {
+                    p.internal_name: p
+                    for p in self.chargefw2.get_available_parameters(method_name)
+                }
+
+            if parameters_name in available_parameters[method_name]:
+                parameters[method_name].append(available_parameters[method_name][parameters_name])
+
+        return SuitableMethods(methods=list(methods.values()), parameters=dict(parameters))
 
     async def get_available_parameters(self, method: str) -> list[Parameters]:
         """Get available parameters for charge calculation method."""
@@ -189,8 +398,8 @@ class ChargeFW2Service:
             molecules = await self.read_molecules(file_path)
 
             self.logger.info(f"Getting best parameters for method {method}.")
-            parameters = await self._run_in_executor(
-                self.chargefw2.get_best_parameters, molecules, method, permissive_types
+            parameters = await self._run_with_molecules(
+                molecules, self.chargefw2.get_best_parameters, molecules, method, permissive_types
             )
 
             return parameters
@@ -204,132 +413,538 @@ class ChargeFW2Service:
         read_hetatm: bool = True,
         ignore_water: bool = False,
         permissive_types: bool = False,
+        computation_id: str | None = None,
+    ) -> Molecules:
+        """Load molecules from a file.
+
+        If computation_id is provided, the file is parsed only once for the given settings
+        and the parsed molecules are shared until `release_molecules` is called.
+        """
+
+        if computation_id is None:
+            return await self._load_molecules(
+                file_path, read_hetatm, ignore_water, permissive_types
+            )
+
+        key = (file_path, read_hetatm, ignore_water, permissive_types)
+        loaded = self.computation_molecules.setdefault(computation_id, {})
+
+        if key not in loaded:
+            task = asyncio.ensure_future(
+                self._load_molecules(file_path, read_hetatm, ignore_water, permissive_types)
+            )
+            task.add_done_callback(
+                lambda t: loaded.pop(key, None) if t.cancelled() or t.exception() else None
+            )
+            loaded[key] = task
+
+        # shielded so that a cancelled waiter does not cancel loading for the others
+        return await asyncio.shield(loaded[key])
+
+    def release_molecules(self, computation_id: str) -> None:
+        """Release molecules parsed during the provided computation."""
+
+        self.computation_molecules.pop(computation_id, None)
+
+    async def _load_molecules(
+        self,
+        file_path: str,
+        read_hetatm: bool,
+        ignore_water: bool,
+        permissive_types: bool,
     ) -> Molecules:
-        """Load molecules from a file"""
+        cache_key = self._get_molecules_cache_key(
+            file_path, read_hetatm, ignore_water, permissive_types
+        )
+
+        if cache_key is not None and (molecules := self.molecules_cache.get(cache_key)):
+            self.logger.info(f"Using cached molecules of file {file_path}.")
+            return molecules
+
         try:
             self.logger.info(f"Loading molecules from file {file_path}.")
             molecules = await self._run_in_executor(
                 self.chargefw2.molecules, file_path, read_hetatm, ignore_water, permissive_types
             )
 
+            if cache_key is not None:
+                info = await self._run_in_executor(molecules.info)
+                total_atoms = MoleculeSetStats(info.to_dict()).total_atoms
+                self.molecules_cache.put(cache_key, molecules, total_atoms)
+
             return molecules
         except Exception as e:
             self.logger.error(f"Error loading molecules from file {file_path}: {e}")
             raise e
 
+    def _get_molecules_cache_key(
+        self,
+        file_path: str,
+        read_hetatm: bool,
+        ignore_water: bool,
+        permissive_types: bool,
+    ) -> MoleculesKey | None:
+        """Returns key of the molecules cache or None if molecules of the file can not be cached."""
+
+        if self.molecules_cache is None or not self.molecules_cache.enabled:
+            return None
+
+        if Path(file_path).name.startswith(sharding.SHARD_FILE_PREFIX):
+            # shards contain only a part of the stored file
+            return None
+
+        try:
+            file_hash, _ = self.io.parse_filename(Path(file_path).name)
+        except ValueError:
+            # only stored files (<file_hash>_<file_name>) are cached
+            return None
+
+        return (file_hash, read_hetatm, ignore_water, permissive_types)
+
+    def plan_computation(
+        self,
+        computation_id: str,
+        settings: AdvancedSettingsDto,
+        file_hashes: list[str],
+        configs: list[CalculationConfigDto],
+    ) -> ComputationPlan:
+        """Normalises a computation request into unique calculation tasks.
+
+        Args:
+            computation_id (str): Computation id.
+            settings (AdvancedSettingsDto): Advanced settings of the computation.
+            file_hashes (list[str]): Hashes of files to calculate charges for.
+            configs (list[CalculationConfigDto]): Configs to calculate charges with.
+
+        Returns:
+            ComputationPlan: Plan of the computation.
+        """
+
+        plan = plan_computation(settings, file_hashes, configs)
+
+        self.logger.info(
+            f"Computation '{computation_id}' planned {plan.task_count} calculations "
+            + f"of {len(plan.files)} files with {len(plan.configs)} configs."
+        )
+
+        return plan
+
     async def calculate_charges(
         self,
         computation_id: str,
         settings: AdvancedSettingsDto,
-        data: Tuple[CalculationConfigDto, list[str]],
+        data: dict[CalculationConfigDto, list[str]],
         user_id: str | None,
+        on_file_done: Callable[[str], Awaitable[None]] | None = None,
     ) -> list[CalculationResultDto]:
         """Calculate charges for provided files.
+        Calculations are planned by file, so each file is looked up only once
+        and duplicate calculations are skipped.
 
         Args:
             computation_id (str): Computation id.
-            data (Tuple[CalculationConfigDto, list[str]]): Dictionary of configs and file_hashes.
+            data (dict[CalculationConfigDto, list[str]]): Dictionary of configs and file_hashes.
             user_id (str): User id making the calculation.
+            on_file_done (Callable[[str], Awaitable[None]] | None): Called with a file hash
+                every time calculation of a file finishes.
 
         Returns:
             ChargeCalculationResult: List of successful calculations.
                 Failed calculations are skipped.
         """
 
-        calculations = await asyncio.gather(
-            *[
-                self._calculate_charges(user_id, computation_id, settings, config, file_hashes)
-                for config, file_hashes in data.items()
-            ],
-            return_exceptions=False,
+        plan = plan_calculations(settings, data)
+        file_names = self._get_file_names(user_id, plan.file_hashes)
+
+        self.logger.info(
+            f"Calculating {plan.task_count} planned calculations of {len(plan.files)} files."
         )
-        configs = [calculation.config for calculation in calculations]
 
-        await self.io.store_configs(computation_id, configs, user_id)
+        try:
+            calculations = await asyncio.gather(
+                *[
+                    self._calculate_file_charges(
+                        user_id,
+                        computation_id,
+                        settings,
+                        config,
+                        file_hash,
+                        file_names[file_hash],
+                        on_file_done,
+                    )
+                    for file_hash, configs in plan.files.items()
+                    if file_hash in file_names
+                    for config in configs
+                ],
+                return_exceptions=False,
+            )
+        except Exception as e:
+            self.logger.error(f"Error calculating charges: {traceback.format_exc()}")
+            raise e
+
+        grouped: dict[CalculationConfigDto, list[CalculationDto]] = {
+            config: [] for config in plan.configs
+        }
+        for calculation in calculations:
+            grouped[calculation.config].append(calculation)
+
+        results = [
+            CalculationResultDto(
+                config=CalculationConfigDto(method=config.method, parameters=config.parameters),
+                calculations=config_calculations,
+            )
+            for config, config_calculations in grouped.items()
+        ]
+
+        await self.io.store_configs(computation_id, [result.config for result in results], user_id)
+
+        return results
+
+    def _get_file_names(self, user_id: str | None, file_hashes: list[str]) -> dict[str, str]:
+        """Finds stored names (<file_hash>_<file_name>) of the provided files
+        (using the file index or a single directory listing). Missing files are skipped."""
+
+        workdir = self.io.get_file_storage_path(user_id)
+        file_names = {
+            file_hash: Path(path).name
+            for file_hash, path in self.io.get_filepaths(file_hashes, user_id).items()
+        }
+
+        for file_hash in file_hashes:
+            if file_hash not in file_names:
+                self.logger.warn(f"File with hash {file_hash} not found in {workdir}, skipping.")
 
-        return calculations
+        return file_names
 
-    async def _calculate_charges(
+    async def _calculate_file_charges(
         self,
         user_id: str | None,
         computation_id: str,
         settings: AdvancedSettingsDto,
         config: CalculationConfigDto,
-        file_hashes: list[str],
-    ) -> CalculationResultDto:
-        """Calculate charges for provided files."""
+        file_hash: str,
+        stored_name: str,
+        on_file_done: Callable[[str], Awaitable[None]] | None = None,
+    ) -> CalculationDto:
+        """Calculate charges for a single file stored as 'stored_name'."""
 
-        self.logger.info(
-            f"Calculating charges with method {config.method} and parameters {config.parameters}."
+        workdir = self.io.get_file_storage_path(user_id)
+        charges_dir = self.io.get_charges_path(computation_id, user_id)
+        self.io.create_dir(charges_dir)
+
+        full_path = os.path.join(workdir, stored_name)
+        file_name = self.io.parse_filename(stored_name)[1]
+
+        charges = None
+        if self._should_shard(full_path):
+            charges = await self._calculate_sharded_charges(full_path, settings, config)
+
+        if charges is None:
+            async with self.semaphore:
+                charges = await self._calculate_path_charges(
+                    full_path, settings, config, charges_dir, computation_id
+                )
+
+        result = CalculationDto(file=file_name, file_hash=file_hash, charges=charges, config=config)
+
+        if on_file_done is not None:
+            await on_file_done(file_hash)
+
+        return result
+
+    async def _calculate_path_charges(
+        self,
+        path: str,
+        settings: AdvancedSettingsDto,
+        config: CalculationConfigDto,
+        charges_dir: str,
+        computation_id: str | None = None,
+    ) -> Charges:
+        """Calculate charges of molecules in the provided file using the configured executor."""
+
+        if self.executor_type == "process":
+            self.logger.info(f"Calculating charges for file {path} in worker process.")
+            packed_charges = await self._run_in_process(
+                process_pool.calculate_charges,
+                path,
+                settings.read_hetatm,
+                settings.ignore_water,
+                settings.permissive_types,
+                config.method,
+                config.parameters,
+                charges_dir,
+            )
+            return process_pool.unpack_charges(packed_charges)
+
+        molecules = await self.read_molecules(
+            path,
+            settings.read_hetatm,
+            settings.ignore_water,
+            settings.permissive_types,
+            computation_id,
         )
 
-        workdir = self.io.get_file_storage_path(user_id)
+        return await self._run_with_molecules(
+            molecules,
+            self.chargefw2.calculate_charges,
+            molecules,
+            config.method,
+            config.parameters,
+            charges_dir,
+        )
+
+    def _should_shard(self, path: str) -> bool:
+        return (
+            self.shard_min_size_bytes > 0
+            and self.max_workers > 1
+            and sharding.is_shardable(path)
+            and os.path.getsize(path) >= self.shard_min_size_bytes
+        )
+
+    async def _calculate_sharded_charges(
+        self, path: str, settings: AdvancedSettingsDto, config: CalculationConfigDto
+    ) -> Charges | None:
+        """Splits the provided file into molecule-range shards, calculates them in parallel
+        and merges their charges. Output files of the shards are discarded,
+        output files of the whole file are written by `save_charges`.
 
-        async def process_file(
-            file_hash: str, config: CalculationConfigDto
-        ) -> CalculationDto | None:
-            file_name = next(
-                (
-                    file
-                    for file in self.io.listdir(workdir)
-                    if self.io.parse_filename(file)[0] == file_hash
-                ),
-                None,
+        Returns None if molecules of different shards have the same name, as their charges
+        can not be merged the same way as when calculating the whole file."""
+
+        with tempfile.TemporaryDirectory(prefix="acc2_shards_") as shards_dir:
+            shard_paths = await self._run_in_executor(
+                sharding.split_file, path, shards_dir, self.max_workers
             )
 
-            if file_name is None:
-                self.logger.warn(f"File with hash {file_hash} not found in {workdir}, skipping.")
-                return
+            self.logger.info(f"Calculating charges for file {path} in {len(shard_paths)} shards.")
 
-            async with self.semaphore:
-                charges_dir = self.io.get_charges_path(computation_id, user_id)
-                self.io.create_dir(charges_dir)
+            async def calculate_shard(shard_path: str) -> Charges:
+                async with self.semaphore:
+                    shard_out_dir = os.path.join(os.path.dirname(shard_path), "out")
+                    os.makedirs(shard_out_dir, exist_ok=True)
+                    return await self._calculate_path_charges(
+                        shard_path, settings, config, shard_out_dir
+                    )
 
-                full_path = os.path.join(workdir, file_name)
-                file_name = self.io.parse_filename(file_name)[1]
+            shard_charges = await asyncio.gather(
+                *[calculate_shard(shard_path) for shard_path in shard_paths]
+            )
 
-                molecules = await self.read_molecules(
-                    full_path,
-                    settings.read_hetatm,
-                    settings.ignore_water,
-                    settings.permissive_types,
+        charges: Charges = {}
+        for shard in shard_charges:
+            if not charges.keys().isdisjoint(shard.keys()):
+                self.logger.warn(
+                    f"Shards of file {path} contain molecules with the same name, "
+                    + "calculating the whole file."
                 )
+                return None
 
-                charges = await self._run_in_executor(
-                    self.chargefw2.calculate_charges,
-                    molecules,
-                    config.method,
-                    config.parameters,
-                    charges_dir,
-                )
+            charges.update(shard)
 
-                result = CalculationDto(
-                    file=file_name, file_hash=file_hash, charges=charges, config=config
-                )
+        return charges
 
-                return result
+    async def run_computation(
+        self,
+        computation_id: str,
+        settings: AdvancedSettingsDto,
+        to_calculate: dict[CalculationConfigDto, list[str]],
+        cached: dict[CalculationConfigDto, list[CalculationDto]],
+        user_id: str | None,
+        on_file_done: Callable[[str], Awaitable[None]] | None = None,
+    ) -> list[CalculationResultDto]:
+        """Runs the whole computation pipeline.
+        Calculates charges, merges them with cached calculations, stores the results
+        and writes charges to output files.
+
+        Args:
+            computation_id (str): Computation id.
+            settings (AdvancedSettingsDto): Advanced settings of the computation.
+            to_calculate (dict[CalculationConfigDto, list[str]]): Configs and file hashes to calculate.
+            cached (dict[CalculationConfigDto, list[CalculationDto]]): Already existing calculations.
+            user_id (str | None): User id making the calculation.
+            on_file_done (Callable[[str], Awaitable[None]] | None): Called with a file hash
+                every time calculation of a file finishes.
+
+        Returns:
+            list[CalculationResultDto]: Results of the computation.
+        """
+
+        self._register_tasks(computation_id, user_id, [asyncio.current_task()])
 
         try:
-            calculations = [
-                calculation
-                for calculation in await asyncio.gather(
-                    *[process_file(file_hash, config) for file_hash in file_hashes],
-                    return_exceptions=False,
+            with self.io.track_computation_usage(computation_id, user_id):
+                calculations = await self.calculate_charges(
+                    computation_id, settings, to_calculate, user_id, on_file_done
                 )
-                if calculation is not None
-            ]
-            config_dto = CalculationConfigDto(
-                method=config.method,
-                parameters=config.parameters,
-            )
 
-            return CalculationResultDto(
-                config=config_dto,
-                calculations=calculations,
+                # add cached items to results of the same config
+                for result in calculations:
+                    if result.config in cached:
+                        result.calculations.extend(cached[result.config])
+
+                calculated = [result.config for result in calculations]
+                calculations.extend(
+                    [
+                        CalculationResultDto(config=config, calculations=results)
+                        for config, results in cached.items()
+                        if config not in calculated
+                    ]
+                )
+
+                self.calculation_storage.store_calculation_results(
+                    computation_id, settings, calculations, user_id
+                )
+                await self.save_charges(settings, computation_id, calculations, user_id)
+                _ = self.mmcif_service.write_to_mmcif(user_id, computation_id, calculations)
+
+            if user_id is None:
+                # free guest compute space if needed
+                self.io.free_guest_compute_space()
+
+            return calculations
+        finally:
+            self._unregister_tasks(computation_id)
+            # molecules parsed during the computation are no longer needed
+            self.release_molecules(computation_id)
+
+    async def stream_computation(
+        self,
+        computation_id: str,
+        settings: AdvancedSettingsDto,
+        to_calculate: dict[CalculationConfigDto, list[str]],
+        cached: dict[CalculationConfigDto, list[CalculationDto]],
+        user_id: str | None,
+    ) -> AsyncIterator[CalculationDto]:
+        """Runs the computation pipeline and yields each calculation as soon as it is finished.
+        Results are stored and written to output files file by file once all configs
+        of a file are calculated, so results of the whole computation are never kept in memory.
+
+        Args:
+            computation_id (str): Computation id.
+            settings (AdvancedSettingsDto): Advanced settings of the computation.
+            to_calculate (dict[CalculationConfigDto, list[str]]): Configs and file hashes to calculate.
+            cached (dict[CalculationConfigDto, list[CalculationDto]]): Already existing calculations.
+            user_id (str | None): User id making the calculation.
+
+        Yields:
+            CalculationDto: Calculated (or cached) charges of a single file and config.
+        """
+
+        plan = plan_calculations(settings, to_calculate)
+        file_names = self._get_file_names(user_id, plan.file_hashes)
+
+        configs = plan.configs
+        configs.extend(config for config in cached if config not in configs)
+
+        self.logger.info(
+            f"Streaming {plan.task_count} planned calculations of {len(plan.files)} files."
+        )
+
+        # calculations of each file, file is finalized once no calculations are pending
+        file_calculations: dict[str, list[CalculationDto]] = defaultdict(list)
+        pending: dict[str, int] = defaultdict(int)
+
+        for file_hash, file_configs in plan.files.items():
+            if file_hash in file_names:
+                pending[file_hash] += len(file_configs)
+
+        async def calculate(config: CalculationConfigDto, file_hash: str) -> CalculationDto:
+            return await self._calculate_file_charges(
+                user_id, computation_id, settings, config, file_hash, file_names[file_hash]
             )
+
+        tasks = [
+            asyncio.ensure_future(calculate(config, file_hash))
+            for file_hash, file_configs in plan.files.items()
+            if file_hash in file_names
+            for config in file_configs
+        ]
+
+        self._register_tasks(computation_id, user_id, tasks)
+
+        try:
+            with self.io.track_computation_usage(computation_id, user_id):
+                for calculations in cached.values():
+                    for calculation in calculations:
+                        file_calculations[calculation.file_hash].append(calculation)
+                        yield calculation
+
+                finished = [
+                    file_hash for file_hash in file_calculations if pending[file_hash] == 0
+                ]
+                for file_hash in finished:
+                    await self._finalize_file(
+                        computation_id, settings, configs, file_calculations.pop(file_hash), user_id
+                    )
+
+                for task in asyncio.as_completed(tasks):
+                    try:
+                        calculation = await task
+                    except asyncio.CancelledError as e:
+                        if computation_id not in self.cancelled_computations:
+                            raise e
+                        raise ComputationCancelledError(
+                            f"Computation '{computation_id}' was cancelled."
+                        ) from e
+
+                    file_hash = calculation.file_hash
+                    file_calculations[file_hash].append(calculation)
+                    yield calculation
+
+                    pending[file_hash] -= 1
+                    if pending[file_hash] == 0 and file_calculations.get(file_hash):
+                        await self._finalize_file(
+                            computation_id,
+                            settings,
+                            configs,
+                            file_calculations.pop(file_hash),
+                            user_id,
+                        )
+
+                await self.io.store_configs(computation_id, configs, user_id)
+
+            if user_id is None:
+                # free guest compute space if needed
+                self.io.free_guest_compute_space()
+        except ComputationCancelledError as e:
+            self.logger.info(f"Computation '{computation_id}' was cancelled.")
+            raise e
         except Exception as e:
-            self.logger.error(f"Error calculating charges: {traceback.format_exc()}")
+            self.logger.error(f"Error streaming computation: {traceback.format_exc()}")
             raise e
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            self._unregister_tasks(computation_id)
+            self.release_molecules(computation_id)
+
+    async def _finalize_file(
+        self,
+        computation_id: str,
+        settings: AdvancedSettingsDto,
+        configs: list[CalculationConfigDto],
+        calculations: list[CalculationDto],
+        user_id: str | None,
+    ) -> None:
+        """Stores calculations of a single file and writes them to output files."""
+
+        # all configs are kept (in the same order) so that output files match the non-streamed ones
+        results = [
+            CalculationResultDto(
+                config=config,
+                calculations=[
+                    calculation for calculation in calculations if calculation.config == config
+                ],
+            )
+            for config in configs
+        ]
+
+        self.calculation_storage.store_calculation_results(
+            computation_id, settings, [result for result in results if result.calculations], user_id
+        )
+        await self.save_charges(settings, computation_id, results, user_id)
+        _ = self.mmcif_service.write_to_mmcif(user_id, computation_id, results)
 
     async def save_charges(
         self,
@@ -342,17 +957,35 @@ class ChargeFW2Service:
         charges_dir = self.io.get_charges_path(computation_id, user_id)
         self.io.create_dir(charges_dir)
 
+        # calculations of each file (in order), saved by a single worker call parsing the file once
+        process_calculations: dict[
+            str, list[tuple[process_pool.PackedCharges, str, str | None]]
+        ] = {}
+
         for result in results:
             for calculation in result.calculations:
                 file_path = str(Path(workdir) / f"{calculation.file_hash}_{calculation.file}")
+                config = calculation.config
+
+                if self.executor_type == "process":
+                    process_calculations.setdefault(file_path, []).append(
+                        (
+                            process_pool.pack_charges(calculation.charges),
+                            config.method,
+                            config.parameters,
+                        )
+                    )
+                    continue
+
                 molecules = await self.read_molecules(
                     file_path,
                     settings.read_hetatm,
                     settings.ignore_water,
                     settings.permissive_types,
+                    computation_id,
                 )
-                config = calculation.config
-                await self._run_in_executor(
+                await self._run_with_molecules(
+                    molecules,
                     self.chargefw2.save_charges,
                     calculation.charges,
                     molecules,
@@ -361,6 +994,20 @@ class ChargeFW2Service:
                     charges_dir,
                 )
 
+        for file_path, calculations in process_calculations.items():
+            await self._run_in_process(
+                process_pool.save_charges,
+                file_path,
+                settings.read_hetatm,
+                settings.ignore_water,
+                settings.permissive_types,
+                calculations,
+                charges_dir,
+            )
+
+        # archives of previous results are outdated
+        self.io.invalidate_charges_archive(charges_dir)
+
     async def info(self, path: str) -> MoleculeSetStats:
         """Get information about the provided file."""
 
@@ -368,7 +1015,7 @@ class ChargeFW2Service:
             self.logger.info(f"Getting info for file {path}.")
 
             molecules = await self.read_molecules(path)
-            info = molecules.info()
+            info = await self._run_with_molecules(molecules, molecules.info)
 
             return MoleculeSetStats(info.to_dict())
         except Exception as e:
@@ -0,0 +1,138 @@
+"""Content-addressed on-disk store of calculated charges."""
+
+import hashlib
+import mmap
+import os
+import tempfile
+from collections.abc import Mapping
+
+from db.schemas.charges import EncodedCharges, decode_charges, encode_charges
+from models.calculation import CalculationConfigDto
+from models.setup import AdvancedSettingsDto
+from services.logging.base import LoggerBase
+
+
+class ChargesStore:
+    """Stores charges of calculations as files instead of the database.
+
+    Each calculation (file hash, config and settings) is written once to a file named by hash
+    of its key, using the same encoding as the database column (see `db.schemas.charges`).
+    Files are memory-mapped when read, so only charges of accessed molecules are loaded.
+    The store is disabled when no directory is provided.
+    """
+
+    def __init__(self, logger: LoggerBase, root_dir: str | None = None):
+        self.logger = logger
+        self.root_dir = root_dir or None
+
+    @property
+    def enabled(self) -> bool:
+        """True if charges should be stored on disk."""
+
+        return self.root_dir is not None
+
+    def write(
+        self,
+        file_hash: str,
+        config: CalculationConfigDto,
+        settings: AdvancedSettingsDto,
+        charges: Mapping[str, list[float]],
+    ) -> tuple[str, int]:
+        """Writes charges of a calculation unless they are stored already.
+
+        Args:
+            file_hash (str): Hash of the calculated file.
+            config (CalculationConfigDto): Config of the calculation.
+            settings (AdvancedSettingsDto): Settings of the calculation.
+            charges (Mapping[str, list[float]]): Calculated charges.
+
+        Returns:
+            tuple[str, int]: Path of the charges relative to the store directory and their size in bytes.
+        """
+
+        path = self.get_path(file_hash, config, settings)
+        full_path = os.path.join(self.root_dir, path)
+
+        if os.path.exists(full_path):
+            return path, os.path.getsize(full_path)
+
+        self.logger.info(f"Writing charges of file '{file_hash}' to charges store.")
+
+        return path, self._write_file(full_path, charges)
+
+    def restore(self, path: str, charges: Mapping[str, list[float]]) -> bool:
+        """Writes charges of a stored calculation again if its file is missing
+        (e.g. it was removed from the store directory).
+
+        Args:
+            path (str): Path returned by `write`.
+            charges (Mapping[str, list[float]]): Calculated charges.
+
+        Returns:
+            bool: True if the file was missing and has been written.
+        """
+
+        full_path = os.path.join(self.root_dir, path)
+
+        if os.path.exists(full_path):
+            return False
+
+        self.logger.warn(f"Restoring missing charges '{path}' in charges store.")
+        self._write_file(full_path, charges)
+
+        return True
+
+    def read(self, path: str) -> EncodedCharges:
+        """Reads charges stored using `write`.
+
+        Args:
+            path (str): Path returned by `write`.
+
+        Raises:
+            FileNotFoundError: If charges are not stored.
+
+        Returns:
+            EncodedCharges: Charges decoded from the memory-mapped file.
+        """
+
+        with open(os.path.join(self.root_dir, path), "rb") as file:
+            # the mapping stays valid after the file is closed
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return decode_charges(data)
+
+    def _write_file(self, full_path: str, charges: Mapping[str, list[float]]) -> int:
+        data = encode_charges(charges)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        # concurrent writers produce the same content, so the last rename wins harmlessly
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, full_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return len(data)
+
+    def get_path(
+        self, file_hash: str, config: CalculationConfigDto, settings: AdvancedSettingsDto
+    ) -> str:
+        """Returns path of charges of a calculation relative to the store directory."""
+
+        key = "|".join(
+            [
+                file_hash,
+                config.method or "",
+                config.parameters or "",
+                str(settings.read_hetatm),
+                str(settings.ignore_water),
+                str(settings.permissive_types),
+            ]
+        )
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+        return os.path.join(digest[:2], f"{digest}.charges")
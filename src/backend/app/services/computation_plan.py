@@ -0,0 +1,91 @@
+"""Planning of computations.
+
+A computation request is normalised into unique calculation tasks (file hash and config,
+calculated with the settings of the computation) grouped by file before anything runs,
+so identical work is done only once and files are looked up (and parsed) once.
+"""
+
+from dataclasses import dataclass, field
+
+from models.calculation import CalculationConfigDto
+from models.setup import AdvancedSettingsDto
+
+
+@dataclass
+class ComputationPlan:
+    """Unique calculation tasks of a computation grouped by file."""
+
+    settings: AdvancedSettingsDto
+    # file hash -> configs to calculate, both in order of the request
+    files: dict[str, list[CalculationConfigDto]] = field(default_factory=dict)
+
+    @property
+    def task_count(self) -> int:
+        """Number of planned calculations (file and config pairs)."""
+
+        return sum(len(configs) for configs in self.files.values())
+
+    @property
+    def file_hashes(self) -> list[str]:
+        """Unique file hashes of the plan."""
+
+        return list(self.files)
+
+    @property
+    def configs(self) -> list[CalculationConfigDto]:
+        """Unique configs of the plan in order of their first occurrence."""
+
+        return list(dict.fromkeys(config for configs in self.files.values() for config in configs))
+
+    def add(self, file_hash: str, config: CalculationConfigDto) -> None:
+        """Adds a calculation task to the plan, duplicate tasks are ignored."""
+
+        configs = self.files.setdefault(file_hash, [])
+
+        if config not in configs:
+            configs.append(config)
+
+
+def plan_computation(
+    settings: AdvancedSettingsDto, file_hashes: list[str], configs: list[CalculationConfigDto]
+) -> ComputationPlan:
+    """Plans calculation of all provided files with all provided configs.
+
+    Args:
+        settings (AdvancedSettingsDto): Advanced settings of the computation.
+        file_hashes (list[str]): Hashes of files to calculate charges for (may repeat).
+        configs (list[CalculationConfigDto]): Configs to calculate charges with (may repeat).
+
+    Returns:
+        ComputationPlan: Plan with unique tasks.
+    """
+
+    plan = ComputationPlan(settings)
+
+    for file_hash in file_hashes:
+        for config in configs:
+            plan.add(file_hash, config)
+
+    return plan
+
+
+def plan_calculations(
+    settings: AdvancedSettingsDto, to_calculate: dict[CalculationConfigDto, list[str]]
+) -> ComputationPlan:
+    """Plans calculations of the provided configs and their files grouped by file.
+
+    Args:
+        settings (AdvancedSettingsDto): Advanced settings of the computation.
+        to_calculate (dict[CalculationConfigDto, list[str]]): Configs and file hashes to calculate.
+
+    Returns:
+        ComputationPlan: Plan with unique tasks.
+    """
+
+    plan = ComputationPlan(settings)
+
+    for config, file_hashes in to_calculate.items():
+        for file_hash in file_hashes:
+            plan.add(file_hash, config)
+
+    return plan
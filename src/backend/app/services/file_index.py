@@ -0,0 +1,173 @@
+"""Index of stored files by their hash."""
+
+import os
+import uuid
+
+from integrations.io.base import IOBase
+from services.logging.base import LoggerBase
+
+INDEX_DIR_NAME = "index"
+SHA256_HASH_LENGTH = 64
+
+
+class FileIndex:
+    """Maps file hashes to stored files (<file_hash>_<file_name>) of a file storage directory.
+
+    The index is a sibling directory of the file storage with a symlink named by the hash
+    of each stored file, so a lookup is a single `readlink` instead of listing the storage.
+    Symlinks are created and replaced atomically, so the index can be shared by all API
+    processes without locking. Index of a storage without one is built on first use.
+    """
+
+    def __init__(self, io: IOBase, logger: LoggerBase):
+        self.io = io
+        self.logger = logger
+
+    def find(self, files_dir: str, file_hash: str) -> str | None:
+        """Finds stored file with the provided hash.
+
+        Args:
+            files_dir (str): File storage directory.
+            file_hash (str): File hash.
+
+        Returns:
+            str | None: Name of the stored file or None if it is not stored.
+        """
+
+        self._ensure_index(files_dir)
+        link_path = os.path.join(self.get_index_dir(files_dir), file_hash)
+
+        try:
+            file_name = os.path.basename(self.io.readlink(link_path))
+        except OSError:
+            return None
+
+        if not self.io.path_exists(os.path.join(files_dir, file_name)):
+            # file was removed without updating the index
+            self._unlink(link_path)
+            return None
+
+        return file_name
+
+    def add(self, files_dir: str, file_name: str) -> None:
+        """Adds stored file to the index, replacing previous file with the same hash.
+
+        Args:
+            files_dir (str): File storage directory.
+            file_name (str): Name of the stored file (<file_hash>_<file_name>).
+        """
+
+        self._ensure_index(files_dir)
+        self._link(files_dir, self.get_index_dir(files_dir), file_name)
+
+    def remove(self, files_dir: str, file_hash: str, file_name: str | None = None) -> None:
+        """Removes file with the provided hash from the index.
+
+        Args:
+            files_dir (str): File storage directory.
+            file_hash (str): File hash.
+            file_name (str | None): Name of the removed file. If provided, the file is removed
+                only if it is the indexed one (and not another file with the same hash).
+        """
+
+        link_path = os.path.join(self.get_index_dir(files_dir), file_hash)
+
+        if file_name is not None:
+            try:
+                if os.path.basename(self.io.readlink(link_path)) != file_name:
+                    return
+            except OSError:
+                return
+
+        self._unlink(link_path)
+
+    def rebuild(self, files_dir: str) -> int:
+        """Builds index of the provided file storage from scratch and replaces the current one.
+
+        Args:
+            files_dir (str): File storage directory.
+
+        Returns:
+            int: Number of indexed files.
+        """
+
+        index_dir = self.get_index_dir(files_dir)
+        new_index_dir, count = self._build(files_dir)
+
+        old_index_dir = None
+        if self.io.path_exists(index_dir):
+            old_index_dir = self.io.mkdtemp(os.path.dirname(index_dir), f".{INDEX_DIR_NAME}_old_")
+            self.io.rename(index_dir, os.path.join(old_index_dir, INDEX_DIR_NAME))
+
+        self.io.rename(new_index_dir, index_dir)
+
+        if old_index_dir is not None:
+            self._rmdir(old_index_dir)
+
+        self.logger.info(f"Indexed {count} files of '{files_dir}'.")
+
+        return count
+
+    def get_index_dir(self, files_dir: str) -> str:
+        """Returns index directory of the provided file storage directory."""
+
+        return os.path.join(os.path.dirname(os.path.normpath(files_dir)), INDEX_DIR_NAME)
+
+    def _ensure_index(self, files_dir: str) -> None:
+        index_dir = self.get_index_dir(files_dir)
+
+        if self.io.path_exists(index_dir):
+            return
+
+        self.logger.info(f"Building index of '{files_dir}'.")
+        new_index_dir, _ = self._build(files_dir)
+
+        try:
+            # another process may have built the index in the meantime
+            self.io.rename(new_index_dir, index_dir)
+        except OSError:
+            self._rmdir(new_index_dir)
+
+    def _build(self, files_dir: str) -> tuple[str, int]:
+        """Builds index of the provided directory in a temporary directory next to the index."""
+
+        parent_dir = os.path.dirname(self.get_index_dir(files_dir))
+        self.io.mkdir(parent_dir)
+        index_dir = self.io.mkdtemp(parent_dir, f".{INDEX_DIR_NAME}_")
+
+        file_names = sorted(
+            self.io.listdir(files_dir),
+            key=lambda file_name: self.io.last_modified(os.path.join(files_dir, file_name)),
+        )
+
+        # files with the same hash are indexed by the most recently stored one
+        for file_name in file_names:
+            self._link(files_dir, index_dir, file_name)
+
+        return index_dir, len(self.io.listdir(index_dir))
+
+    def _link(self, files_dir: str, index_dir: str, file_name: str) -> None:
+        file_hash, separator, _ = file_name.partition("_")
+
+        if not separator or len(file_hash) != SHA256_HASH_LENGTH:
+            # e.g. files which are still being uploaded
+            return
+
+        link_path = os.path.join(index_dir, file_hash)
+        tmp_link_path = os.path.join(index_dir, f".{file_hash}_{uuid.uuid4()}")
+        target = os.path.join("..", os.path.basename(os.path.normpath(files_dir)), file_name)
+
+        self.io.symlink(target, tmp_link_path)
+        self.io.rename(tmp_link_path, link_path)
+
+    def _unlink(self, link_path: str) -> None:
+        try:
+            self.io.rm(link_path)
+        except FileNotFoundError:
+            pass
+
+    def _rmdir(self, path: str) -> None:
+        try:
+            self.io.rmdir(path)
+        except OSError:
+            pass
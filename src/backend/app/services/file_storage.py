@@ -34,6 +34,45 @@ class FileStorageService:
         search: str,
         user_id: str,
     ) -> PagedList[FileResponse]:
+        files, total_count = self._list_files(order_by, order, page, page_size, search, user_id)
+
+        with self.session_manager.session() as session:
+            stats = {
+                file_hash: self.storage_service.get_info(session, file_hash)
+                for file_hash, _ in files
+            }
+
+        items = self._to_responses(files, stats, user_id)
+        return PagedList(page=page, page_size=page_size, total_count=total_count, items=items)
+
+    async def get_files_async(
+        self,
+        order_by: Literal["name", "size", "uploaded_at"],
+        order: Literal["asc", "desc"],
+        page: int,
+        page_size: int,
+        search: str,
+        user_id: str,
+    ) -> PagedList[FileResponse]:
+        """Same as `get_files`, but loads stats of the files using a single async query."""
+
+        files, total_count = self._list_files(order_by, order, page, page_size, search, user_id)
+        stats = await self.storage_service.get_infos_async([file_hash for file_hash, _ in files])
+
+        items = self._to_responses(files, stats, user_id)
+        return PagedList(page=page, page_size=page_size, total_count=total_count, items=items)
+
+    def _list_files(
+        self,
+        order_by: Literal["name", "size", "uploaded_at"],
+        order: Literal["asc", "desc"],
+        page: int,
+        page_size: int,
+        search: str,
+        user_id: str,
+    ) -> tuple[list[tuple[str, str]], int]:
+        """Returns (file hash, file name) pairs on the page and total number of files."""
+
         workdir = self.io.get_file_storage_path(user_id)
         files = [self.io.parse_filename(Path(name).name) for name in self.io.listdir(workdir)]
 
@@ -55,18 +94,21 @@ class FileStorageService:
         page_start = (page - 1) * page_size
         page_end = page * page_size
 
-        with self.session_manager.session() as session:
-            items = [
-                FileResponse(
-                    file_name=name,
-                    file_hash=file_hash,
-                    size=self.io.get_file_size(file_hash, user_id) or 0,
-                    stats=self.storage_service.get_info(session, file_hash)
-                    or MoleculeSetStats.default(),
-                    uploaded_at=self.io.get_last_modification(file_hash, user_id) or datetime.min,
-                )
-                for [file_hash, name] in files[page_start:page_end]
-            ]
+        return [(file_hash, name) for [file_hash, name] in files[page_start:page_end]], len(files)
 
-            data = PagedList(page=page, page_size=page_size, total_count=len(files), items=items)
-            return data
+    def _to_responses(
+        self,
+        files: list[tuple[str, str]],
+        stats: dict[str, MoleculeSetStats | None],
+        user_id: str,
+    ) -> list[FileResponse]:
+        return [
+            FileResponse(
+                file_name=name,
+                file_hash=file_hash,
+                size=self.io.get_file_size(file_hash, user_id) or 0,
+                stats=stats.get(file_hash) or MoleculeSetStats.default(),
+                uploaded_at=self.io.get_last_modification(file_hash, user_id) or datetime.min,
+            )
+            for file_hash, name in files
+        ]
@@ -1,11 +1,14 @@
 """Service for handling file operations."""
 
+import asyncio
+from contextlib import contextmanager
 import datetime
+import hashlib
 import json
 import os
 from pathlib import Path
 import traceback
-from typing import Tuple
+from typing import Iterator, Tuple
 
 from dotenv import load_dotenv
 from fastapi import UploadFile, status
@@ -15,17 +18,41 @@ from api.v1.constants import ALLOWED_FILE_TYPES
 from models.calculation import CalculationConfigDto
 
 from integrations.io.base import IOBase
+from services.archive_cache import ArchiveCache, ChargesArchive
+from services.file_index import FileIndex
 from services.logging.base import LoggerBase
+from services.molecules_cache import MoleculesCache
+from services.storage_usage import StorageUsageService
 
 load_dotenv()
 
+ARCHIVE_EXTENSIONS = ["cif", "pqr", "txt", "mol2"]
+
 
 class IOService:
     """Service for handling file operations."""
 
-    def __init__(self, io: IOBase, logger: LoggerBase):
+    def __init__(
+        self,
+        io: IOBase,
+        logger: LoggerBase,
+        molecules_cache: MoleculesCache | None = None,
+        file_index: FileIndex | None = None,
+        storage_usage: StorageUsageService | None = None,
+        reconcile_interval: float = 3600.0,
+        archive_cache: ArchiveCache | None = None,
+    ):
         self.io = io
         self.logger = logger
+        self.molecules_cache = molecules_cache
+        # without index, files are found by listing the file storage
+        self.file_index = file_index
+        # without usage counters, used space is measured by walking the storage
+        self.storage_usage = storage_usage
+        self.reconcile_interval = reconcile_interval
+        self.reconciliation: asyncio.Task | None = None
+        # without cache, archives are generated for every download
+        self.archive_cache = archive_cache
 
         self.workdir = Path(os.environ.get("ACC2_DATA_DIR", ""))
         self.examples_dir = Path(os.environ.get("ACC2_EXAMPLES_DIR", ""))
@@ -67,12 +94,27 @@ class IOService:
             )
             raise e
 
-    async def store_upload_file(self, file: UploadFile, directory: str) -> tuple[str, str]:
-        """Store uploaded file in the provided directory."""
+    async def store_upload_file(
+        self, file: UploadFile, directory: str, user_id: str | None = None
+    ) -> tuple[str, str, bool]:
+        """Store uploaded file in the provided directory (file storage of the provided user).
+
+        Returns:
+            tuple[str, str, bool]: Path to the file, its hash and whether the file is new
+                (False if the same file was uploaded before).
+        """
         self.logger.info(f"Storing file {file.filename}.")
 
         try:
-            return await self.io.store_upload_file(file, directory)
+            path, file_hash, is_new = await self.io.store_upload_file(file, directory)
+
+            if self.file_index is not None:
+                self.file_index.add(directory, Path(path).name)
+
+            if self.storage_usage is not None and is_new:
+                self._add_usage(user_id, files_bytes=self.io.file_size(path))
+
+            return path, file_hash, is_new
         except Exception as e:
             self.logger.error(f"Error storing file {file.filename}: {traceback.format_exc()}")
             raise e
@@ -93,38 +135,132 @@ class IOService:
         try:
             path = self.get_filepath(file_hash, user_id)
             if path:
+                size = self.io.file_size(path) if self.storage_usage is not None else 0
                 self.io.rm(path)
+                self._add_usage(user_id, files_bytes=-size)
+                self._forget_file(str(Path(path).parent), Path(path).name, file_hash)
         except Exception as e:
             self.logger.error(f"Error removing file {file_hash}: {traceback.format_exc()}")
             raise e
 
-    def zip_charges(self, directory: str) -> str:
-        """Create archive from directory."""
+    def remove_uploaded_file(self, path: str, user_id: str | None = None) -> None:
+        """Remove file stored by `store_upload_file`, e.g. when the upload fails.
+        Unlike `remove_file`, only the provided path is removed
+        (and not another file with the same hash).
 
-        self.logger.info(f"Creating archive from {directory}.")
+        Args:
+            path (str): Path returned by `store_upload_file`.
+            user_id (str | None): User id.
+
+        Raises:
+            e: Error removing file.
+        """
+
+        self.logger.info(f"Removing uploaded file {path}.")
 
         try:
-            archive_dir = Path(directory) / "archive"
-            self.io.mkdir(str(archive_dir))
+            size = self.io.file_size(path) if self.storage_usage is not None else 0
+            self.io.rm(path)
+            self._add_usage(user_id, files_bytes=-size)
+            file_name = Path(path).name
+            self._forget_file(str(Path(path).parent), file_name, file_name.split("_", 1)[0])
+        except Exception as e:
+            self.logger.error(f"Error removing uploaded file {path}: {traceback.format_exc()}")
+            raise e
+
+    def _forget_file(
+        self, directory: str, file_name: str, file_hash: str, remaining: list[str] | None = None
+    ) -> None:
+        """Updates the file index and the molecules cache after a stored file was removed.
+        If another file with the same hash is still stored (under a different name),
+        it is indexed instead and its cached molecules are kept.
+        'remaining' are files of the directory, listed only if not provided."""
+
+        if self.file_index is None and self.molecules_cache is None:
+            return
+
+        if remaining is None:
+            remaining = self.listdir(directory)
+
+        other = next(
+            (file for file in remaining if file != file_name and file.startswith(f"{file_hash}_")),
+            None,
+        )
 
-            for extension in ["cif", "pqr", "txt", "mol2"]:
-                self.io.mkdir(str(archive_dir / extension))
+        if other is not None:
+            if self.file_index is not None:
+                self.file_index.add(directory, other)
+            return
+
+        if self.file_index is not None:
+            self.file_index.remove(directory, file_hash, file_name)
+
+        if self.molecules_cache is not None:
+            self.molecules_cache.invalidate(file_hash)
+
+    def get_charges_archive(self, directory: str) -> ChargesArchive:
+        """Get zip archive of charges in the provided directory.
+
+        Files are sorted into directories by their extension, hashes are removed from names
+        of pqr, txt and mol2 files. Archive is identified by a fingerprint of the archived files
+        (names, sizes and modification times). If it is not cached yet, it is generated on the fly
+        from the original files (and cached once completely generated).
+
+        Args:
+            directory (str): Directory with charges.
 
-            for file in self.io.listdir(directory):
+        Returns:
+            ChargesArchive: Cached archive or chunks of the generated archive.
+        """
+
+        try:
+            entries: list[tuple[str, str | None]] = [
+                (extension, None) for extension in ARCHIVE_EXTENSIONS
+            ]
+
+            for file in sorted(self.io.listdir(directory)):
                 extension = file.rsplit(".", 1)[-1]
                 file_path = str(Path(directory) / file)
 
                 if extension in ["pqr", "txt", "mol2"]:
                     new_name = self.parse_filename(file)[-1]  # removing hash from filename
-                    self.io.cp(file_path, str(Path(archive_dir) / extension / new_name))
+                    entries.append((f"{extension}/{new_name}", file_path))
                 elif extension == "cif":
-                    self.io.cp(file_path, str(Path(archive_dir) / extension))
+                    entries.append((f"{extension}/{file}", file_path))
+
+            fingerprint, last_modified = self._get_archive_fingerprint(directory, entries)
+
+            if self.archive_cache is None:
+                self.logger.info(f"Creating archive from {directory}.")
+                return ChargesArchive(fingerprint, last_modified, chunks=self.io.zip_stream(entries))
+
+            if path := self.archive_cache.find(directory, fingerprint):
+                return ChargesArchive(fingerprint, last_modified, path=path)
 
-            return self.io.zip(str(archive_dir), str(archive_dir))
+            self.logger.info(f"Creating archive from {directory}.")
+            chunks = self.archive_cache.store(directory, fingerprint, entries)
+
+            return ChargesArchive(fingerprint, last_modified, chunks=chunks)
         except Exception as e:
             self.logger.error(f"Error creating archive from {directory}: {traceback.format_exc()}")
             raise e
 
+    def invalidate_charges_archive(self, directory: str) -> None:
+        """Removes cached archives of the provided charges directory.
+
+        Args:
+            directory (str): Directory with charges.
+        """
+
+        if self.archive_cache is None:
+            return
+
+        try:
+            self.archive_cache.invalidate(directory)
+        except Exception:
+            # stale archives are not served anyway as their fingerprint does not match
+            self.logger.warn(f"Unable to invalidate archives of {directory}.")
+
     def listdir(self, directory: str) -> list[str]:
         """List directory contents."""
         return self.io.listdir(directory)
@@ -248,24 +384,18 @@ class IOService:
         self.create_dir(inputs_path)
         self.create_dir(files_path)
 
+        file_paths = self.get_filepaths(file_hashes, user_id)
+
         for file_hash in file_hashes:
-            file_name = next(
-                (
-                    file
-                    for file in self.listdir(files_path)
-                    if self.parse_filename(file)[0] == file_hash
-                ),
-                None,
-            )
+            src_path = file_paths.get(file_hash)
 
-            if not file_name:
+            if not src_path:
                 self.logger.warn(
                     f"File with hash {file_hash} not found in {inputs_path}, skipping."
                 )
                 continue
 
-            src_path = str(Path(files_path) / file_name)
-            dst_path = str(Path(inputs_path) / file_name)
+            dst_path = str(Path(inputs_path) / Path(src_path).name)
             try:
                 self.io.symlink(src_path, dst_path)
             except Exception as e:
@@ -306,6 +436,11 @@ class IOService:
 
         try:
             path = Path(self.get_file_storage_path(user_id))
+
+            if self.file_index is not None:
+                file_name = self.file_index.find(str(path), file_hash)
+                return str(path / file_name) if file_name is not None else None
+
             for file in self.listdir(str(path)):
                 curr_hash, _ = self.parse_filename(file)
                 if curr_hash == file_hash:
@@ -316,6 +451,38 @@ class IOService:
             self.logger.error(f"Unable to get file path: {traceback.format_exc()}")
             raise e
 
+    def get_filepaths(self, file_hashes: list[str], user_id: str | None = None) -> dict[str, str]:
+        """Get paths to files with provided hashes.
+
+        Args:
+            file_hashes (list[str]): File hashes.
+            user_id (str | None): User id.
+
+        Returns:
+            dict[str, str]: Paths to files by their hash, files which are not stored are missing.
+        """
+
+        if self.file_index is not None:
+            file_paths = {
+                file_hash: self.get_filepath(file_hash, user_id) for file_hash in file_hashes
+            }
+            return {file_hash: path for file_hash, path in file_paths.items() if path is not None}
+
+        try:
+            path = Path(self.get_file_storage_path(user_id))
+            wanted = set(file_hashes)
+
+            file_paths = {}
+            for file in self.listdir(str(path)):
+                curr_hash, _ = self.parse_filename(file)
+                if curr_hash in wanted:
+                    file_paths.setdefault(curr_hash, str(path / file))
+
+            return file_paths
+        except Exception as e:
+            self.logger.error(f"Unable to get file paths: {traceback.format_exc()}")
+            raise e
+
     def get_last_modification(
         self, file_hash: str, user_id: str | None = None
     ) -> datetime.datetime | None:
@@ -365,7 +532,11 @@ class IOService:
 
         self.logger.info(f"Freeing {amount_to_free} bytes of guest file space.")
 
-        available_to_free = self.io.dir_size(path)
+        if self.storage_usage is not None:
+            available_to_free = self._get_usage(None)[0]
+        else:
+            available_to_free = self.io.dir_size(path)
+
         has_to_free = self.guest_file_quota - available_to_free < amount_to_free
 
         if not has_to_free:
@@ -387,8 +558,11 @@ class IOService:
             file_path = str(Path(path) / file)
 
             try:
-                amount_to_free -= self.io.file_size(file_path)
+                size = self.io.file_size(file_path)
+                amount_to_free -= size
                 self.io.rm(file_path)
+                self._add_usage(None, files_bytes=-size)
+                self._forget_file(path, file, file.split("_", 1)[0], files)
             except Exception as e:
                 self.logger.error(f"Unable to delete file {file_path}: {traceback.format_exc()}")
                 raise e
@@ -398,7 +572,11 @@ class IOService:
 
         path = self.get_computations_path()
 
-        available_to_free = self.io.dir_size(path)
+        if self.storage_usage is not None:
+            available_to_free = self._get_usage(None)[1]
+        else:
+            available_to_free = self.io.dir_size(path)
+
         amount_to_free = available_to_free - self.guest_compute_quota
 
         if amount_to_free <= 0:
@@ -416,8 +594,10 @@ class IOService:
             computation_path = str(Path(path) / computation)
 
             try:
-                amount_to_free -= self.io.dir_size(computation_path)
+                size = self.io.dir_size(computation_path)
+                amount_to_free -= size
                 self.io.rmdir(computation_path)
+                self._add_usage(None, computations_bytes=-size)
             except Exception as e:
                 self.logger.error(
                     f"Unable to delete computation {computation_path}: {traceback.format_exc()}"
@@ -435,7 +615,11 @@ class IOService:
             e: Error deleting computation.
         """
         try:
-            self.io.rmdir(self.get_computation_path(computation_id, user_id))
+            path = self.get_computation_path(computation_id, user_id)
+            size = self.io.dir_size(path) if self.storage_usage is not None else 0
+            self.io.rmdir(path)
+            self._add_usage(user_id, computations_bytes=-size)
+            self.invalidate_charges_archive(self.get_charges_path(computation_id, user_id))
         except Exception as e:
             self.logger(f"Error deleting computation {computation_id}: {traceback.format_exc()}")
             raise e
@@ -474,14 +658,134 @@ class IOService:
             Tuple[int, int, int]: Tuple with used space, available space and quota.
         """
 
-        storage_dir = Path(self.get_storage_path(user_id))
         quota = self.user_quota if user_id else self.guest_file_quota + self.guest_compute_quota
 
-        used_space = self.io.dir_size(storage_dir)
+        if self.storage_usage is not None:
+            used_space = sum(self._get_usage(user_id))
+        else:
+            used_space = self.io.dir_size(Path(self.get_storage_path(user_id)))
+
         available_space = quota - used_space
 
         return used_space, available_space, quota
 
+    @contextmanager
+    def track_computation_usage(self, computation_id: str, user_id: str | None) -> Iterator[None]:
+        """Adds space taken by files written to the computation directory
+        within the context to the computations usage of the user.
+
+        Args:
+            computation_id (str): Computation id.
+            user_id (str | None): User id.
+        """
+
+        if self.storage_usage is None:
+            yield
+            return
+
+        path = self.get_computation_path(computation_id, user_id)
+        size = self.io.dir_size(path)
+
+        try:
+            yield
+        finally:
+            self._add_usage(user_id, computations_bytes=self.io.dir_size(path) - size)
+
+    def reconcile_usage(self) -> None:
+        """Replaces usage counters of all storages with measured usage,
+        correcting drift of the incremental updates (e.g. files changed outside the application)."""
+
+        if self.storage_usage is None:
+            return
+
+        self.logger.info("Reconciling storage usage.")
+
+        user_ids = [None, *self.listdir(str(self.workdir / "user"))]
+        for user_id in user_ids:
+            try:
+                self.storage_usage.set(user_id, *self._measure_usage(user_id))
+            except Exception:
+                self.logger.error(
+                    f"Unable to reconcile storage usage of '{user_id}': {traceback.format_exc()}"
+                )
+
+    def start_reconciliation(self) -> None:
+        """Starts periodic reconciliation of usage counters (if enabled)."""
+
+        if self.storage_usage is None or self.reconcile_interval <= 0:
+            return
+
+        self.reconciliation = asyncio.create_task(self._reconcile_periodically())
+
+    async def shutdown_reconciliation(self) -> None:
+        """Stops periodic reconciliation of usage counters."""
+
+        if self.reconciliation is None:
+            return
+
+        self.reconciliation.cancel()
+        await asyncio.gather(self.reconciliation, return_exceptions=True)
+        self.reconciliation = None
+
+    async def _reconcile_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            # walking the storages is slow, it must not block the event loop
+            await asyncio.to_thread(self.reconcile_usage)
+
+    def _get_archive_fingerprint(
+        self, directory: str, entries: list[tuple[str, str | None]]
+    ) -> tuple[str, datetime.datetime]:
+        """Returns fingerprint of the archived files and time of their last modification."""
+
+        hasher = hashlib.sha256()
+        modified = []
+
+        for name, path in entries:
+            hasher.update(name.encode())
+
+            if path is not None:
+                modified.append(self.io.last_modified(path))
+                hasher.update(f"{self.io.file_size(path)}:{modified[-1].timestamp()}".encode())
+
+            hasher.update(b"\0")
+
+        last_modified = max(modified) if modified else self.io.last_modified(directory)
+
+        return hasher.hexdigest()[:32], last_modified
+
+    def _get_usage(self, user_id: str | None) -> tuple[int, int]:
+        """Returns space used by files and computations of a user (or guests).
+        Storages which are not tracked yet are measured and tracked from now on."""
+
+        if self.storage_usage is not None and (usage := self.storage_usage.get(user_id)):
+            return usage
+
+        usage = self._measure_usage(user_id)
+
+        if self.storage_usage is not None:
+            self.storage_usage.set(user_id, *usage)
+
+        return usage
+
+    def _measure_usage(self, user_id: str | None) -> tuple[int, int]:
+        return (
+            self.io.dir_size(self.get_file_storage_path(user_id)),
+            self.io.dir_size(self.get_computations_path(user_id)),
+        )
+
+    def _add_usage(
+        self, user_id: str | None, files_bytes: int = 0, computations_bytes: int = 0
+    ) -> None:
+        if self.storage_usage is None or (files_bytes == 0 and computations_bytes == 0):
+            return
+
+        try:
+            self.storage_usage.add(user_id, files_bytes, computations_bytes)
+        except Exception:
+            # failed update is corrected by the next reconciliation
+            self.logger.warn("Storage usage was not updated, it will be reconciled later.")
+
     def ensure_upload_files_provided(self, files: list[UploadFile]) -> None:
         if len(files) == 0:
             raise BadRequestError(
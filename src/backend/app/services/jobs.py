@@ -0,0 +1,408 @@
+"""Service for running computations as background jobs."""
+
+import asyncio
+import traceback
+
+from datetime import datetime, timedelta, timezone
+
+from db.database import SessionManager
+from db.repositories.job_repository import JobRepository
+from db.schemas.job import Job, JobPriority
+
+from models.calculation import CalculationConfigDto
+from models.job import FileProgressDto, JobStatusDto
+from models.setup import AdvancedSettingsDto
+
+from services.calculation_storage import CalculationStorageService
+from services.chargefw2 import ChargeFW2Service
+from services.logging.base import LoggerBase
+
+
+class JobService:
+    """Runs computations in background workers.
+
+    Jobs are stored in the database, so they survive restarts and can be claimed
+    by workers of any API process. Each process runs `max_concurrent_jobs` workers.
+    Database calls run in a thread, so they do not block the event loop.
+    """
+
+    def __init__(
+        self,
+        logger: LoggerBase,
+        chargefw2: ChargeFW2Service,
+        calculation_storage: CalculationStorageService,
+        job_repository: JobRepository,
+        session_manager: SessionManager,
+        max_concurrent_jobs: int = 2,
+        max_jobs_per_user: int = 1,
+        max_guest_jobs: int = 2,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 30.0,
+        cancel_check_interval: float = 5.0,
+        stale_timeout: float = 120.0,
+    ):
+        self.logger = logger
+        self.chargefw2 = chargefw2
+        self.calculation_storage = calculation_storage
+        self.job_repository = job_repository
+        self.session_manager = session_manager
+
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_jobs_per_user = max_jobs_per_user
+        self.max_guest_jobs = max_guest_jobs
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.cancel_check_interval = cancel_check_interval
+        self.stale_timeout = stale_timeout
+
+        self.workers: list[asyncio.Task] = []
+        # set when a job is enqueued so that idle workers do not wait for the next poll
+        self.wakeup: asyncio.Event | None = None
+
+    async def enqueue(
+        self,
+        computation_id: str,
+        settings: AdvancedSettingsDto,
+        file_hashes: list[str],
+        configs: list[CalculationConfigDto],
+        user_id: str | None,
+    ) -> JobStatusDto:
+        """Adds computation to the queue.
+        A finished job of the same computation (e.g. when it is run again) is queued again,
+        status of an unfinished one is returned as is.
+
+        Args:
+            computation_id (str): Computation id.
+            settings (AdvancedSettingsDto): Advanced settings of the computation.
+            file_hashes (list[str]): Hashes of files to calculate charges for.
+            configs (list[CalculationConfigDto]): Configs to calculate charges with.
+            user_id (str | None): User id making the calculation.
+
+        Raises:
+            ValueError: If the computation belongs to another user.
+
+        Returns:
+            JobStatusDto: Status of the queued job.
+        """
+
+        try:
+            self.logger.info(f"Enqueuing computation '{computation_id}'.")
+
+            job = Job(
+                id=computation_id,
+                user_id=user_id,
+                priority=JobPriority.GUEST if user_id is None else JobPriority.USER,
+                status="queued",
+                payload={
+                    "settings": settings.model_dump(),
+                    "file_hashes": file_hashes,
+                    "configs": [config.model_dump() for config in configs],
+                },
+                files=[
+                    FileProgressDto(file_hash=file_hash, total=len(configs)).model_dump()
+                    for file_hash in file_hashes
+                ],
+                attempts=0,
+                created_at=datetime.now(timezone.utc),
+            )
+
+            status = await asyncio.to_thread(self._store, job)
+
+            if self.wakeup is not None:
+                self.wakeup.set()
+
+            return status
+        except Exception as e:
+            self.logger.error(f"Unable to enqueue computation: {traceback.format_exc()}")
+            raise e
+
+    def _store(self, job: Job) -> JobStatusDto:
+        """Stores a new job or queues a finished job of the same computation again."""
+
+        computation_id = str(job.id)
+        user_id = self._get_user_id(job)
+
+        with self.session_manager.session() as session:
+            existing = self.job_repository.get(session, computation_id)
+
+            if existing is not None and self._get_user_id(existing) != user_id:
+                raise ValueError(f"Computation '{computation_id}' belongs to another user.")
+
+            if existing is not None and existing.status in ("queued", "running"):
+                self.logger.info(f"Computation '{computation_id}' is already queued.")
+                return self._to_status(existing)
+
+            if existing is None:
+                job = self.job_repository.store(session, job)
+            else:
+                self.job_repository.update(
+                    session,
+                    computation_id,
+                    priority=job.priority,
+                    status=job.status,
+                    payload=job.payload,
+                    files=job.files,
+                    error=None,
+                    attempts=job.attempts,
+                    created_at=job.created_at,
+                    started_at=None,
+                    finished_at=None,
+                    heartbeat_at=None,
+                )
+
+            return self._to_status(job)
+
+    async def get_status(self, computation_id: str, user_id: str | None) -> JobStatusDto | None:
+        """Get status of a job.
+
+        Args:
+            computation_id (str): Computation id.
+            user_id (str | None): User id.
+
+        Returns:
+            JobStatusDto | None: Status of the job or None if the user has no such job.
+        """
+
+        try:
+            return await asyncio.to_thread(self._load_status, computation_id, user_id)
+        except Exception as e:
+            self.logger.error(f"Unable to get job status: {traceback.format_exc()}")
+            raise e
+
+    def _load_status(self, computation_id: str, user_id: str | None) -> JobStatusDto | None:
+        with self.session_manager.session() as session:
+            job = self.job_repository.get(session, computation_id)
+
+            if job is None or self._get_user_id(job) != user_id:
+                return None
+
+            return self._to_status(job)
+
+    async def cancel(self, computation_id: str, user_id: str | None) -> bool:
+        """Cancels a queued or running job.
+        Job running in another API process is stopped by its worker within `cancel_check_interval`.
+
+        Args:
+            computation_id (str): Computation id.
+            user_id (str | None): User cancelling the job.
+
+        Returns:
+            bool: True if the job was cancelled, False if the user has no such unfinished job.
+        """
+
+        try:
+            if not await asyncio.to_thread(self._mark_cancelled, computation_id, user_id):
+                return False
+
+            # stop the computation right away if it is running in this process
+            self.chargefw2.cancel(computation_id, user_id)
+
+            return True
+        except Exception as e:
+            self.logger.error(f"Unable to cancel job: {traceback.format_exc()}")
+            raise e
+
+    def _mark_cancelled(self, computation_id: str, user_id: str | None) -> bool:
+        with self.session_manager.session() as session:
+            job = self.job_repository.get(session, computation_id)
+
+            if job is None or self._get_user_id(job) != user_id:
+                return False
+
+            if job.status not in ("queued", "running"):
+                return False
+
+            self.logger.info(f"Cancelling job '{computation_id}'.")
+            self.job_repository.update(
+                session,
+                computation_id,
+                status="cancelled",
+                finished_at=datetime.now(timezone.utc),
+            )
+
+            return True
+
+    def start(self) -> None:
+        """Starts workers processing the queue."""
+
+        self.wakeup = asyncio.Event()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_jobs)]
+
+    async def shutdown(self) -> None:
+        """Cancels all workers. Jobs they were running are claimed again once they become stale."""
+
+        for worker in self.workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception:
+                self.logger.error(f"Unable to claim job: {traceback.format_exc()}")
+                job = None
+
+            if job is None:
+                await self._wait_for_jobs()
+                continue
+
+            await self._run(job)
+
+    async def _wait_for_jobs(self) -> None:
+        self.wakeup.clear()
+
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    def _claim(self) -> Job | None:
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=self.stale_timeout)
+
+        with self.session_manager.session() as session:
+            return self.job_repository.claim(
+                session, now, stale_before, self.max_jobs_per_user, self.max_guest_jobs
+            )
+
+    async def _run(self, job: Job) -> None:
+        computation_id = str(job.id)
+        user_id = self._get_user_id(job)
+        status = self._to_status(job)
+
+        if job.attempts > self.max_attempts:
+            self.logger.warn(f"Computation '{computation_id}' was interrupted too many times.")
+            await self._finish(status, "failed", "Computation was interrupted too many times.")
+            return
+
+        monitor = asyncio.create_task(self._monitor(computation_id, user_id))
+        computation: asyncio.Future | None = None
+
+        try:
+            self.logger.info(f"Running computation '{computation_id}'.")
+
+            settings = AdvancedSettingsDto.model_validate(job.payload["settings"])
+            configs = [
+                CalculationConfigDto.model_validate(config) for config in job.payload["configs"]
+            ]
+            to_calculate, cached = await asyncio.to_thread(
+                self.calculation_storage.filter_existing_calculations,
+                settings,
+                job.payload["file_hashes"],
+                configs,
+            )
+
+            # cached calculations are done already
+            remaining: dict[str, int] = {}
+            for file_hashes in to_calculate.values():
+                for file_hash in file_hashes:
+                    remaining[file_hash] = remaining.get(file_hash, 0) + 1
+
+            for progress in status.files:
+                progress.completed = progress.total - remaining.get(progress.file_hash, 0)
+
+            await self._update(computation_id, files=self._dump_files(status))
+
+            async def on_file_done(file_hash: str) -> None:
+                status.mark_file_completed(file_hash)
+                await self._update(computation_id, files=self._dump_files(status))
+
+            # computation runs in its own task so that it can be cancelled without the worker
+            computation = asyncio.ensure_future(
+                self.chargefw2.run_computation(
+                    computation_id, settings, to_calculate, cached, user_id, on_file_done
+                )
+            )
+            await computation
+
+            for progress in status.files:
+                progress.completed = progress.total
+
+            await self._finish(status, "done")
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling() == 0:
+                # job was cancelled, its status is already set by `cancel`
+                self.logger.info(f"Computation '{computation_id}' was cancelled.")
+                return
+
+            # worker is shutting down, job will be claimed again once it becomes stale
+            if computation is not None:
+                computation.cancel()
+            raise
+        except Exception as e:
+            self.logger.error(f"Computation '{computation_id}' failed: {traceback.format_exc()}")
+            await self._finish(status, "failed", str(e))
+        finally:
+            monitor.cancel()
+
+    async def _monitor(self, computation_id: str, user_id: str | None) -> None:
+        """Updates heartbeat of a running job and stops it when it is cancelled
+        (possibly from another API process)."""
+
+        last_heartbeat = asyncio.get_running_loop().time()
+        interval = min(self.cancel_check_interval, self.heartbeat_interval)
+
+        while True:
+            await asyncio.sleep(interval)
+
+            cancelled = await asyncio.to_thread(self._is_cancelled, computation_id)
+
+            if cancelled and self.chargefw2.cancel(
+                computation_id, user_id
+            ):
+                return
+
+            if asyncio.get_running_loop().time() - last_heartbeat >= self.heartbeat_interval:
+                await self._update(computation_id, heartbeat_at=datetime.now(timezone.utc))
+                last_heartbeat = asyncio.get_running_loop().time()
+
+    def _is_cancelled(self, computation_id: str) -> bool:
+        try:
+            with self.session_manager.session() as session:
+                job = self.job_repository.get(session, computation_id)
+                return job is not None and job.status == "cancelled"
+        except Exception:
+            self.logger.warn(f"Unable to check job '{computation_id}': {traceback.format_exc()}")
+            return False
+
+    async def _finish(self, status: JobStatusDto, state: str, error: str | None = None) -> None:
+        await self._update(
+            status.computation_id,
+            status=state,
+            error=error,
+            files=self._dump_files(status),
+            finished_at=datetime.now(timezone.utc),
+        )
+
+    async def _update(self, computation_id: str, **values) -> None:
+        try:
+            await asyncio.to_thread(self._write_update, computation_id, values)
+        except Exception:
+            # failing to report progress should not fail the computation itself
+            self.logger.warn(f"Unable to update job '{computation_id}': {traceback.format_exc()}")
+
+    def _write_update(self, computation_id: str, values: dict) -> None:
+        with self.session_manager.session() as session:
+            self.job_repository.update(session, computation_id, **values)
+
+    def _dump_files(self, status: JobStatusDto) -> list[dict]:
+        return [progress.model_dump() for progress in status.files]
+
+    def _get_user_id(self, job: Job) -> str | None:
+        return str(job.user_id) if job.user_id is not None else None
+
+    def _to_status(self, job: Job) -> JobStatusDto:
+        return JobStatusDto(
+            computation_id=str(job.id),
+            status=job.status,
+            files=[FileProgressDto.model_validate(progress) for progress in job.files],
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+        )
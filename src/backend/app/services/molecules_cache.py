@@ -0,0 +1,137 @@
+"""Cache of parsed molecules shared across requests."""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+from cachetools import LRUCache
+
+from chargefw2 import Molecules
+
+from services.logging.base import LoggerBase
+
+# (file_hash, read_hetatm, ignore_water, permissive_types)
+MoleculesKey = tuple[str, bool, bool, bool]
+
+
+@dataclass
+class _CacheEntry:
+    molecules: Molecules
+    size: int
+
+
+class _EvictionAwareLRUCache(LRUCache):
+    """LRU cache notifying about evicted items."""
+
+    def __init__(self, maxsize: int, getsizeof: Callable, on_evict: Callable):
+        super().__init__(maxsize, getsizeof)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key, value)
+        return key, value
+
+
+class MoleculesCache:
+    """Memory bounded LRU cache of parsed molecules.
+
+    Size of the cached molecules is estimated from the number of atoms they contain.
+    """
+
+    # Rough estimate of memory used by a single parsed atom (including bonds)
+    ESTIMATED_BYTES_PER_ATOM = 512
+
+    def __init__(self, logger: LoggerBase, max_size_bytes: int = 0):
+        self.logger = logger
+        self.max_size_bytes = max_size_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._cache = _EvictionAwareLRUCache(
+            maxsize=max(max_size_bytes, 1),
+            getsizeof=lambda entry: entry.size,
+            on_evict=self._on_evict,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True if caching is enabled (cache size is set)."""
+
+        return self.max_size_bytes > 0
+
+    @property
+    def size_bytes(self) -> int:
+        """Returns estimated size of currently cached molecules in bytes."""
+
+        return int(self._cache.currsize)
+
+    def get(self, key: MoleculesKey) -> Molecules | None:
+        """Get parsed molecules from cache.
+
+        Args:
+            key (MoleculesKey): File hash and settings used for parsing.
+
+        Returns:
+            Molecules | None: Parsed molecules or None if not cached.
+        """
+
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._cache.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry.molecules
+
+    def put(self, key: MoleculesKey, molecules: Molecules, total_atoms: int) -> None:
+        """Store parsed molecules in cache. Least recently used molecules are evicted if needed.
+
+        Args:
+            key (MoleculesKey): File hash and settings used for parsing.
+            molecules (Molecules): Parsed molecules.
+            total_atoms (int): Number of atoms in the parsed molecules.
+        """
+
+        if not self.enabled:
+            return
+
+        size = max(total_atoms, 1) * self.ESTIMATED_BYTES_PER_ATOM
+
+        if size > self.max_size_bytes:
+            self.logger.info(f"Molecules of file '{key[0]}' are too large to be cached.")
+            return
+
+        with self._lock:
+            self._cache[key] = _CacheEntry(molecules=molecules, size=size)
+
+    def invalidate(self, file_hash: str) -> None:
+        """Remove all cached molecules parsed from the file with the provided hash."""
+
+        with self._lock:
+            for key in [key for key in self._cache.keys() if key[0] == file_hash]:
+                del self._cache[key]
+
+    def stats(self) -> dict[str, int]:
+        """Returns cache counters."""
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._cache),
+            "size_bytes": self.size_bytes,
+            "max_size_bytes": self.max_size_bytes,
+        }
+
+    def _on_evict(self, key: MoleculesKey, _: _CacheEntry) -> None:
+        self.evictions += 1
+        self.logger.info(f"Evicting molecules of file '{key[0]}' from cache.")
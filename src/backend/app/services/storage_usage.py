@@ -0,0 +1,97 @@
+"""Service for tracking disk space used by users and guests."""
+
+from datetime import datetime, timezone
+import traceback
+
+from db.database import SessionManager
+from db.repositories.storage_usage_repository import StorageUsageRepository
+from db.schemas.storage_usage import GUEST_OWNER
+from services.logging.base import LoggerBase
+
+
+class StorageUsageService:
+    """Persistent counters of disk space used by files and computations.
+
+    Counters are stored in the database, so they are shared by all API processes.
+    They are updated incrementally whenever files or computations are written or removed
+    and replaced by measured values during reconciliation (see `IOService.reconcile_usage`).
+    """
+
+    def __init__(
+        self,
+        logger: LoggerBase,
+        repository: StorageUsageRepository,
+        session_manager: SessionManager,
+    ):
+        self.logger = logger
+        self.repository = repository
+        self.session_manager = session_manager
+
+    def get(self, user_id: str | None) -> tuple[int, int] | None:
+        """Get usage of a storage.
+
+        Args:
+            user_id (str | None): User id, None for the guest storage.
+
+        Returns:
+            tuple[int, int] | None: Bytes used by files and computations
+                or None if the storage is not tracked yet.
+        """
+
+        try:
+            with self.session_manager.session() as session:
+                usage = self.repository.get(session, self._get_owner(user_id))
+
+                if usage is None:
+                    return None
+
+                return usage.files_bytes, usage.computations_bytes
+        except Exception as e:
+            self.logger.error(f"Unable to get storage usage: {traceback.format_exc()}")
+            raise e
+
+    def add(self, user_id: str | None, files_bytes: int = 0, computations_bytes: int = 0) -> None:
+        """Adds the provided amounts (negative when space is freed) to usage of a storage.
+
+        Args:
+            user_id (str | None): User id, None for the guest storage.
+            files_bytes (int): Change of space used by files.
+            computations_bytes (int): Change of space used by computations.
+        """
+
+        if files_bytes == 0 and computations_bytes == 0:
+            return
+
+        try:
+            with self.session_manager.session() as session:
+                self.repository.add(
+                    session, self._get_owner(user_id), files_bytes, computations_bytes
+                )
+        except Exception as e:
+            self.logger.error(f"Unable to update storage usage: {traceback.format_exc()}")
+            raise e
+
+    def set(self, user_id: str | None, files_bytes: int, computations_bytes: int) -> None:
+        """Replaces usage of a storage with measured values.
+
+        Args:
+            user_id (str | None): User id, None for the guest storage.
+            files_bytes (int): Bytes used by files.
+            computations_bytes (int): Bytes used by computations.
+        """
+
+        try:
+            with self.session_manager.session() as session:
+                self.repository.set(
+                    session,
+                    self._get_owner(user_id),
+                    files_bytes,
+                    computations_bytes,
+                    datetime.now(timezone.utc),
+                )
+        except Exception as e:
+            self.logger.error(f"Unable to set storage usage: {traceback.format_exc()}")
+            raise e
+
+    def _get_owner(self, user_id: str | None) -> str:
+        return str(user_id) if user_id is not None else GUEST_OWNER
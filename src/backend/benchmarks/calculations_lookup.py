@@ -0,0 +1,181 @@
+"""Benchmark of cache lookups in the 'calculations' table.
+
+Fills the table with the provided number of rows and measures latency of the single
+(`CalculationRepository.get`) and bulk (`CalculationRepository.get_all_for_files`) lookup
+with and without the (file_hash, config_id, advanced_settings_id) index.
+
+All tables are created in a separate schema which is dropped afterwards.
+
+Usage:
+    python benchmarks/calculations_lookup.py --db-url <postgresql+psycopg2 url> [--rows 1000000]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from db.schemas import Base  # noqa: E402
+from db.schemas.user import User  # noqa: E402, F401
+from db.schemas.stats import MoleculeSetStats  # noqa: E402, F401
+from db.schemas.job import Job  # noqa: E402, F401
+from db.schemas.calculation import Calculation  # noqa: E402, F401
+from db.schemas.charges import encode_charges  # noqa: E402
+from db.repositories.advanced_settings_repository import AdvancedSettingsRepository  # noqa: E402
+from db.repositories.calculation_config_repository import CalculationConfigRepository  # noqa: E402
+from db.repositories.calculation_repository import CalculationRepository  # noqa: E402
+from models.calculation import CalculationConfigDto, CalculationsFilters  # noqa: E402
+from models.setup import AdvancedSettingsDto  # noqa: E402
+
+SCHEMA = "acc2_benchmark"
+INDEX_NAME = "ix_calculations_file_hash_config_id_advanced_settings_id"
+
+CONFIGS = [(f"method{i}", f"parameters{i}") for i in range(10)]
+SETTINGS = AdvancedSettingsDto()
+
+
+def fill(session: Session, rows: int) -> None:
+    """Fills the tables with one settings row, 'CONFIGS' and 'rows' calculations."""
+
+    session.execute(
+        text(
+            "INSERT INTO advanced_settings (id, read_hetatm, ignore_water, permissive_types) "
+            "VALUES (gen_random_uuid(), :read_hetatm, :ignore_water, :permissive_types)"
+        ),
+        SETTINGS.model_dump(),
+    )
+    session.execute(
+        text(
+            "INSERT INTO calculation_configs (id, method, parameters) "
+            "VALUES (gen_random_uuid(), :method, :parameters)"
+        ),
+        [{"method": method, "parameters": parameters} for method, parameters in CONFIGS],
+    )
+    # every file is calculated with a single config, charges are not relevant for lookups
+    session.execute(
+        text(
+            """
+            INSERT INTO calculations
+                (id, file_name, file_hash, charges, config_id, advanced_settings_id)
+            SELECT
+                gen_random_uuid(),
+                'file' || i || '.sdf',
+                md5(i::text),
+                :charges,
+                configs.id,
+                (SELECT id FROM advanced_settings LIMIT 1)
+            FROM generate_series(0, :rows - 1) AS i
+            JOIN (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY method) - 1 AS position
+                FROM calculation_configs
+            ) AS configs ON configs.position = i % :configs
+            """
+        ),
+        {"rows": rows, "configs": len(CONFIGS), "charges": encode_charges({})},
+    )
+    session.execute(text("ANALYZE"))
+
+
+def measure(name: str, lookup: Callable[[], object], repeats: int) -> None:
+    """Prints median and 95th percentile latency of the lookup."""
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        lookup()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    median = statistics.median(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<40} median {median:9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def run_lookups(session: Session, rows: int, repeats: int, files: int) -> None:
+    repository = CalculationRepository(None)
+    configs = [CalculationConfigDto(method=m, parameters=p) for m, p in CONFIGS[:5]]
+    config_ids = [
+        CalculationConfigRepository(None).get_id(session, config.method, config.parameters)
+        for config in configs
+    ]
+    settings_id = AdvancedSettingsRepository().get_id(session, SETTINGS)
+
+    def random_hash() -> str:
+        # same as md5(i::text) used when filling the table
+        return hashlib.md5(str(random.randrange(rows)).encode()).hexdigest()
+
+    def single() -> None:
+        method, parameters = random.choice(CONFIGS)
+        repository.get(
+            session,
+            CalculationsFilters(
+                hash=random_hash(),
+                method=method,
+                parameters=parameters,
+                read_hetatm=SETTINGS.read_hetatm,
+                ignore_water=SETTINGS.ignore_water,
+                permissive_types=SETTINGS.permissive_types,
+            ),
+        )
+
+    def bulk() -> None:
+        file_hashes = [random_hash() for _ in range(files)]
+        repository.get_all_for_files(session, file_hashes, config_ids, settings_id)
+
+    measure("single lookup (get)", single, repeats)
+    measure(f"bulk lookup ({files} files x {len(configs)} configs)", bulk, repeats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", required=True, help="PostgreSQL database url.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of calculations.")
+    parser.add_argument("--repeats", type=int, default=50, help="Number of measured lookups.")
+    parser.add_argument("--files", type=int, default=50, help="Files in a bulk lookup.")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url, connect_args={"options": f"-csearch_path={SCHEMA}"})
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(connection)
+
+    try:
+        with Session(engine) as session:
+            session.execute(text(f"DROP INDEX {INDEX_NAME}"))
+
+            print(f"Inserting {args.rows} calculations...")
+            fill(session, args.rows)
+            session.commit()
+
+            print("\nWithout index:")
+            run_lookups(session, args.rows, args.repeats, args.files)
+
+            session.execute(
+                text(
+                    f"CREATE UNIQUE INDEX {INDEX_NAME} "
+                    "ON calculations (file_hash, config_id, advanced_settings_id)"
+                )
+            )
+            session.execute(text("ANALYZE calculations"))
+            session.commit()
+
+            print("\nWith index:")
+            run_lookups(session, args.rows, args.repeats, args.files)
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
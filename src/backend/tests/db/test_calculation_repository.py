@@ -0,0 +1,41 @@
+from unittest.mock import Mock
+
+import pytest
+
+import app  # noqa: F401
+from db.repositories import calculation_repository
+from db.repositories.calculation_repository import CalculationRepository
+from db.schemas.calculation import Calculation
+
+
+def calculation(atoms: int | None) -> Calculation:
+    return Calculation(
+        file_name="file.pdb",
+        file_hash="hash",
+        # encoded size is 18 + 8 * atoms bytes
+        charges={"m": [0.0] * atoms} if atoms is not None else None,
+        config_id=1,
+        advanced_settings_id=1,
+    )
+
+
+class TestCalculationRepository:
+    @pytest.mark.parametrize(
+        "atoms,expected_statements",
+        [
+            ([10, 10, 10], 1),
+            ([10, 10, 10, 10], 2),
+            ([60, 60, 60], 3),
+            ([150, 10], 2),
+            ([None, None, None, None], 2),
+        ],
+    )
+    def test_store_all_batches(self, monkeypatch, atoms, expected_statements):
+        """Test that inserts are split by number of rows and by size of encoded charges."""
+        monkeypatch.setattr(calculation_repository, "INSERT_BATCH_SIZE", 3)
+        monkeypatch.setattr(calculation_repository, "INSERT_BATCH_BYTES", 800)
+        session = Mock()
+
+        CalculationRepository(Mock()).store_all(session, [calculation(count) for count in atoms])
+
+        assert session.execute.call_count == expected_statements
@@ -0,0 +1,98 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app  # noqa: F401
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from db.repositories.calculation_set_repository import (
+    CalculationSetFilters,
+    CalculationSetRepository,
+)
+from db.schemas import Base
+from db.schemas.user import User
+from db.schemas.job import Job  # noqa: F401
+from db.schemas.stats import MoleculeSetStats  # noqa: F401
+from db.schemas.calculation import AdvancedSettings, CalculationConfig, CalculationSet
+
+USER_ID = uuid.UUID("5a3e0d4c-2b1f-4e6a-8c9d-7f1e2a3b4c5d")
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine, expire_on_commit=False) as session:
+        settings = AdvancedSettings(read_hetatm=True, ignore_water=False, permissive_types=True)
+        config = CalculationConfig(method="eem", parameters=None)
+        session.add(User(id=USER_ID, openid="user"))
+
+        created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for i in range(7):
+            session.add(
+                CalculationSet(
+                    id=uuid.uuid4(),
+                    user_id=USER_ID,
+                    # two sets share each timestamp, so the id decides their order
+                    created_at=created_at + timedelta(minutes=i // 2),
+                    advanced_settings=settings,
+                    configs=[config],
+                )
+            )
+
+        session.commit()
+        yield session
+
+
+def create_filters(**kwargs) -> CalculationSetFilters:
+    return CalculationSetFilters(
+        **{"page": 1, "page_size": 3, "order_by": "created_at", "order": "desc", **kwargs},
+        user_id=USER_ID,
+    )
+
+
+class TestCalculationSetRepository:
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_get_all_cursor(self, session, order):
+        """Test that following cursors returns the same sets as offset pagination."""
+
+        repository = CalculationSetRepository()
+
+        offset_ids = [
+            calculation_set.id
+            for page in range(1, 4)
+            for calculation_set in repository.get_all(
+                session, create_filters(page=page, order=order)
+            ).items
+        ]
+
+        cursor_ids = []
+        page = repository.get_all(session, create_filters(order=order))
+        cursor_ids.extend(calculation_set.id for calculation_set in page.items)
+        while page.next_cursor is not None:
+            page = repository.get_all(
+                session, create_filters(order=order, cursor=page.next_cursor), page.total_count
+            )
+            cursor_ids.extend(calculation_set.id for calculation_set in page.items)
+
+        assert len(cursor_ids) == 7
+        assert cursor_ids == offset_ids
+        assert page.total_count == 7
+
+    def test_get_all_last_page(self, session):
+        """Test that the last page has no next cursor."""
+
+        page = CalculationSetRepository().get_all(session, create_filters(page=3))
+
+        assert len(page.items) == 1
+        assert page.next_cursor is None
+        assert page.total_pages == 3
+
+    def test_get_all_invalid_cursor(self, session):
+        """Test that invalid cursor is rejected."""
+
+        with pytest.raises(ValueError):
+            CalculationSetRepository().get_all(session, create_filters(cursor="invalid"))
@@ -0,0 +1,54 @@
+import pytest
+
+from app.db.schemas.charges import (
+    ChargesType,
+    EncodedCharges,
+    decode_charges,
+    encode_charges,
+    encoded_charges_size,
+)
+
+
+@pytest.fixture
+def charges():
+    return {
+        "molecule1": [0.125, -0.5, 0.375],
+        "molécule2": [],
+        "molecule3": [1e-12, -3.141592653589793],
+    }
+
+
+class TestCharges:
+    def test_roundtrip(self, charges):
+        decoded = decode_charges(encode_charges(charges))
+
+        assert isinstance(decoded, EncodedCharges)
+        assert list(decoded) == list(charges)
+        assert dict(decoded) == charges
+
+    def test_encoded_size(self, charges):
+        assert encoded_charges_size(charges) == len(encode_charges(charges))
+        assert encoded_charges_size({}) == len(encode_charges({}))
+
+    def test_lazy_access(self, charges):
+        decoded = decode_charges(encode_charges(charges))
+
+        assert len(decoded) == 3
+        assert decoded["molecule3"] == charges["molecule3"]
+        assert "molecule4" not in decoded
+
+    def test_empty(self):
+        assert dict(decode_charges(encode_charges({}))) == {}
+
+    def test_invalid_data(self):
+        with pytest.raises(ValueError):
+            decode_charges(b"JSON\x01\x00\x00\x00\x00")
+
+    def test_column_type(self, charges):
+        column_type = ChargesType()
+
+        encoded = column_type.process_bind_param(charges, None)
+
+        assert isinstance(encoded, bytes)
+        assert dict(column_type.process_result_value(encoded, None)) == charges
+        assert column_type.process_bind_param(None, None) is None
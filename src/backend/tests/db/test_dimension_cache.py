@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import patch
+
+import app  # noqa: F401
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from db.dimension_cache import DimensionCache
+from db.repositories.advanced_settings_repository import AdvancedSettingsRepository
+from db.repositories.calculation_config_repository import CalculationConfigRepository
+from db.schemas import Base
+from db.schemas.user import User  # noqa: F401
+from db.schemas.job import Job  # noqa: F401
+from db.schemas.stats import MoleculeSetStats  # noqa: F401
+from db.schemas.calculation import AdvancedSettings, CalculationConfig
+from models.setup import AdvancedSettingsDto
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def create_session(engine) -> Session:
+    # same as sessions of the application
+    return Session(engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def cache():
+    return DimensionCache()
+
+
+@pytest.fixture
+def config_repository(cache):
+    return CalculationConfigRepository(None, dimension_cache=cache)
+
+
+@pytest.fixture
+def settings_repository(cache):
+    return AdvancedSettingsRepository(dimension_cache=cache)
+
+
+class TestDimensionCache:
+    def test_cached_after_commit(self, engine, cache, config_repository):
+        """Test that ids of created rows are cached once the transaction commits."""
+
+        with create_session(engine) as session:
+            config = CalculationConfig(method="eem", parameters=None)
+            config_repository.store(session, config)
+
+            assert cache.get_config_id(("eem", None)) is None
+            session.commit()
+
+        assert cache.get_config_id(("eem", None)) == config.id
+
+    def test_not_cached_after_rollback(self, engine, cache, config_repository):
+        """Test that ids of rolled back rows are not cached."""
+
+        with create_session(engine) as session:
+            config_repository.store(session, CalculationConfig(method="eem", parameters=None))
+            session.rollback()
+            session.commit()
+
+        assert cache.get_config_id(("eem", None)) is None
+
+    def test_not_cached_after_savepoint(self, engine, cache, config_repository):
+        """Test that releasing a savepoint does not cache ids of an uncommitted transaction."""
+
+        with create_session(engine) as session:
+            with session.begin_nested():
+                config_repository.store(session, CalculationConfig(method="eem", parameters="p"))
+
+            assert cache.get_config_id(("eem", "p")) is None
+            session.rollback()
+
+        assert cache.get_config_id(("eem", "p")) is None
+
+    def test_get_id(self, engine, cache, settings_repository):
+        """Test that ids are loaded from the database only on cache miss."""
+
+        settings = AdvancedSettingsDto(read_hetatm=False)
+
+        with create_session(engine) as session:
+            assert settings_repository.get_id(session, settings) is None
+
+            entity = AdvancedSettings(read_hetatm=False, ignore_water=False, permissive_types=True)
+            session.add(entity)
+            session.commit()
+
+        with create_session(engine) as session:
+            assert settings_repository.get_id(session, settings) == entity.id
+            session.commit()
+
+        with create_session(engine) as session, patch.object(session, "execute") as execute:
+            assert settings_repository.get_id(session, settings) == entity.id
+            execute.assert_not_called()
+
+    def test_clear(self, engine, cache, config_repository):
+        """Test clearing the cache."""
+
+        with create_session(engine) as session:
+            config_repository.store(session, CalculationConfig(method="eem", parameters=None))
+            session.commit()
+
+        cache.clear()
+
+        assert cache.get_config_id(("eem", None)) is None
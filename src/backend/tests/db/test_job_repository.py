@@ -0,0 +1,106 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+
+import app  # noqa: F401
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from db.repositories.job_repository import JobRepository
+from db.schemas import Base
+from db.schemas.user import User
+from db.schemas.job import Job, JobPriority
+from db.schemas.stats import MoleculeSetStats  # noqa: F401
+
+USER_ID = uuid.UUID("5a3e0d4c-2b1f-4e6a-8c9d-7f1e2a3b4c5d")
+OTHER_USER_ID = uuid.UUID("0b7c1e2d-3f4a-4b5c-9d6e-8f7a6b5c4d3e")
+NOW = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+STALE_BEFORE = NOW - timedelta(minutes=2)
+
+
+@pytest.fixture
+def locks():
+    return []
+
+
+@pytest.fixture
+def session(locks):
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def register_functions(connection, _):
+        # stand-ins for the PostgreSQL functions used for locking
+        connection.create_function("hashtext", 1, lambda text: hash(text) % 2**31)
+        connection.create_function("pg_advisory_xact_lock", 1, locks.append)
+
+    Base.metadata.create_all(engine)
+
+    with Session(engine, expire_on_commit=False) as session:
+        session.add(User(id=USER_ID, openid="user"))
+        session.add(User(id=OTHER_USER_ID, openid="other"))
+        session.commit()
+        yield session
+
+
+def add_job(session: Session, user_id: uuid.UUID | None, minutes: int, **values) -> Job:
+    job = Job(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        priority=JobPriority.GUEST if user_id is None else JobPriority.USER,
+        payload={},
+        created_at=NOW - timedelta(minutes=minutes),
+        **values,
+    )
+    session.add(job)
+    session.commit()
+    return job
+
+
+def claim(repository: JobRepository, session: Session) -> Job | None:
+    return repository.claim(session, NOW, STALE_BEFORE, max_jobs_per_user=1, max_guest_jobs=2)
+
+
+class TestJobRepository:
+    def test_claim(self, session, locks):
+        """Test that the oldest job is claimed under the lock of its owner."""
+        add_job(session, USER_ID, 5)
+        oldest = add_job(session, USER_ID, 10)
+
+        job = claim(JobRepository(), session)
+
+        assert job.id == oldest.id
+        assert job.status == "running"
+        assert job.attempts == 1
+        assert len(locks) == 1
+
+    def test_claim_skips_full_owner(self, session):
+        """Test that jobs of owners running the maximum number of jobs are skipped."""
+        add_job(session, USER_ID, 10, status="running", heartbeat_at=NOW)
+        add_job(session, USER_ID, 5)
+        other = add_job(session, OTHER_USER_ID, 1)
+
+        assert claim(JobRepository(), session).id == other.id
+
+    def test_claim_rechecks_limit_under_lock(self, session, locks):
+        """Test that owner which reached the limit while waiting for the lock is skipped."""
+        add_job(session, USER_ID, 10)
+        other = add_job(session, OTHER_USER_ID, 5)
+        repository = JobRepository()
+        # a concurrent worker claimed a job of the first owner before the lock was acquired
+        repository._count_running = Mock(side_effect=[1, 0])
+
+        job = claim(repository, session)
+
+        assert job.id == other.id
+        assert len(locks) == 2
+        assert locks[0] != locks[1]
+
+    def test_claim_rechecks_guest_limit(self, session):
+        """Test that guests reaching their shared limit are skipped."""
+        add_job(session, None, 10)
+        repository = JobRepository()
+        repository._count_running = Mock(return_value=2)
+
+        assert claim(repository, session) is None
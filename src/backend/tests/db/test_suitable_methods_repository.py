@@ -0,0 +1,54 @@
+import pytest
+
+import app  # noqa: F401
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from db.repositories.suitable_methods_repository import SuitableMethodsRepository
+from db.schemas import Base
+from db.schemas.job import Job  # noqa: F401
+from db.schemas.stats import MoleculeSetStats, SuitableMethod
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine, expire_on_commit=False) as session:
+        for file_hash in ["hash1", "hash2", "hash3"]:
+            session.add(MoleculeSetStats(file_hash=file_hash, total_molecules=1, total_atoms=1))
+
+        session.commit()
+        yield session
+
+
+class TestSuitableMethodsRepository:
+    def test_get_stored_file_hashes(self, session):
+        """Test that files without any suitable method are reported as stored."""
+        repository = SuitableMethodsRepository()
+        method = SuitableMethod(
+            molecule_set_id="hash1", permissive_types=True, method="eem", position=0
+        )
+
+        repository.store(session, "hash1", True, [method])
+        repository.store(session, "hash2", True, [])
+        session.commit()
+
+        hashes = ["hash1", "hash2", "hash3"]
+        assert repository.get_stored_file_hashes(session, hashes, True) == {"hash1", "hash2"}
+        assert repository.get_stored_file_hashes(session, hashes, False) == set()
+        assert repository.get_common(session, ["hash1"], True) == [("eem", None)]
+
+    def test_store_twice(self, session):
+        """Test that methods stored concurrently are not stored again."""
+        repository = SuitableMethodsRepository()
+
+        for _ in range(2):
+            method = SuitableMethod(
+                molecule_set_id="hash1", permissive_types=True, method="eem", position=0
+            )
+            repository.store(session, "hash1", True, [method])
+            session.commit()
+
+        assert session.query(SuitableMethod).count() == 1
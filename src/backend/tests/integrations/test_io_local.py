@@ -1,9 +1,11 @@
 import datetime
 import os
+from io import BytesIO
 from pathlib import Path
 import shutil
 import tempfile
 from typing import Any, Generator
+import zipfile
 import pytest
 
 from app.integrations.io.io import IOLocal
@@ -130,6 +132,40 @@ class TestIOService:
             # Skipping on Windows
             pytest.skip("Symlinks not supported on this platform/environment")
 
+    def test_readlink(self, io_service: tuple[IOLocal, Path]) -> None:
+        io, base_dir = io_service
+        link = os.path.join(base_dir, "link")
+
+        try:
+            os.symlink(os.path.join("..", "target.txt"), link)
+        except OSError:
+            pytest.skip("Symlinks not supported on this platform/environment")
+
+        assert io.readlink(link) == os.path.join("..", "target.txt")
+
+    def test_rename_replaces(self, io_service: tuple[IOLocal, Path]) -> None:
+        io, base_dir = io_service
+        src_file = base_dir / "src.txt"
+        dst_file = base_dir / "dst.txt"
+        src_file.write_text("new")
+        dst_file.write_text("old")
+
+        io.rename(str(src_file), str(dst_file))
+
+        assert not src_file.exists()
+        assert dst_file.read_text() == "new"
+
+    def test_mkdtemp(self, io_service: tuple[IOLocal, Path]) -> None:
+        io, base_dir = io_service
+
+        first = io.mkdtemp(str(base_dir), ".tmp_")
+        second = io.mkdtemp(str(base_dir), ".tmp_")
+
+        assert first != second
+        assert os.path.isdir(first) and os.path.isdir(second)
+        assert os.path.basename(first).startswith(".tmp_")
+        assert os.path.dirname(first) == str(base_dir)
+
     def test_zip(self, io_service: tuple[IOLocal, Path]) -> None:
         io, base_dir = io_service
         src_dir = os.path.join(base_dir, "dir_to_zip")
@@ -147,6 +183,30 @@ class TestIOService:
         assert result == f"{zip_dest}.zip"
         assert os.path.exists(result)
 
+    def test_zip_stream(self, io_service: tuple[IOLocal, Path]) -> None:
+        io, base_dir = io_service
+        file1 = os.path.join(base_dir, "file1.txt")
+        file2 = os.path.join(base_dir, "file2.txt")
+
+        with open(file1, "w") as f:
+            f.write("test zip content 1")
+        with open(file2, "wb") as f:
+            f.write(os.urandom(3 * 1024 * 1024))
+
+        entries = [("txt", None), ("empty", None), ("txt/a.txt", file1), ("txt/b.txt", file2)]
+        chunks = list(io.zip_stream(entries))
+
+        assert len(chunks) > 1
+        assert not os.path.exists(os.path.join(base_dir, "archive"))
+
+        with zipfile.ZipFile(BytesIO(b"".join(chunks))) as archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == ["txt/", "empty/", "txt/a.txt", "txt/b.txt"]
+            assert archive.read("txt/a.txt") == b"test zip content 1"
+
+            with open(file2, "rb") as f:
+                assert archive.read("txt/b.txt") == f.read()
+
     def test_listdir(self, io_service: tuple[IOLocal, Path]) -> None:
         io, base_dir = io_service
 
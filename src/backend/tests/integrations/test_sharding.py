@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from app.integrations.chargefw2 import sharding
+
+
+def write_sdf(path: Path, molecules: int) -> None:
+    records = [
+        f"mol{i}\n  test\n\n  0  0  0  0  0  0  0  0  0  0999 V2000\nM  END\n$$$$\n"
+        for i in range(molecules)
+    ]
+    path.write_text("".join(records))
+
+
+def write_mol2(path: Path, molecules: int) -> None:
+    records = [
+        f"@<TRIPOS>MOLECULE\nmol{i}\n 1 0 0 0 0\nSMALL\nNO_CHARGES\n\n@<TRIPOS>ATOM\n"
+        f"      1 C1          0.0000    0.0000    0.0000 C.3     1  MOL         0.0000\n"
+        for i in range(molecules)
+    ]
+    path.write_text("# comment\n" + "".join(records))
+
+
+class TestSharding:
+    def test_is_shardable(self) -> None:
+        assert sharding.is_shardable("/path/file.sdf")
+        assert sharding.is_shardable("/path/file.MOL2")
+        assert not sharding.is_shardable("/path/file.pdb")
+        assert not sharding.is_shardable("/path/file.cif")
+
+    def test_count_molecules(self, tmp_path: Path) -> None:
+        sdf = tmp_path / "file.sdf"
+        write_sdf(sdf, 5)
+        mol2 = tmp_path / "file.mol2"
+        write_mol2(mol2, 3)
+
+        assert sharding.count_molecules(str(sdf)) == 5
+        assert sharding.count_molecules(str(mol2)) == 3
+
+    def test_split_sdf(self, tmp_path: Path) -> None:
+        sdf = tmp_path / "file.sdf"
+        write_sdf(sdf, 10)
+
+        shards = sharding.split_file(str(sdf), str(tmp_path / "shards"), 3)
+
+        assert len(shards) == 3
+        assert [sharding.count_molecules(shard) for shard in shards] == [4, 4, 2]
+        assert [Path(shard).name for shard in shards] == ["shard_0.sdf", "shard_1.sdf", "shard_2.sdf"]
+        assert "".join(Path(shard).read_text() for shard in shards) == sdf.read_text()
+
+    def test_split_mol2(self, tmp_path: Path) -> None:
+        mol2 = tmp_path / "file.mol2"
+        write_mol2(mol2, 4)
+
+        shards = sharding.split_file(str(mol2), str(tmp_path / "shards"), 2)
+
+        assert len(shards) == 2
+        assert [sharding.count_molecules(shard) for shard in shards] == [2, 2]
+        assert Path(shards[1]).read_bytes().startswith(sharding.MOL2_RECORD_START)
+        assert "".join(Path(shard).read_text() for shard in shards) == mol2.read_text()
+
+    def test_split_binary(self, tmp_path: Path) -> None:
+        sdf = tmp_path / "file.sdf"
+        content = b"mol\xe9\n  test\r\nM  END\n$$$$\r\nmol2\xff\nM  END\n$$$$\n"
+        sdf.write_bytes(content)
+
+        shards = sharding.split_file(str(sdf), str(tmp_path / "shards"), 2)
+
+        assert len(shards) == 2
+        assert b"".join(Path(shard).read_bytes() for shard in shards) == content
+
+    def test_split_single_molecule(self, tmp_path: Path) -> None:
+        sdf = tmp_path / "file.sdf"
+        write_sdf(sdf, 1)
+
+        assert sharding.split_file(str(sdf), str(tmp_path / "shards"), 4) == [str(sdf)]
+
+    def test_split_unsupported_format(self, tmp_path: Path) -> None:
+        pdb = tmp_path / "file.pdb"
+        pdb.write_text("ATOM\nEND\n")
+
+        assert sharding.split_file(str(pdb), str(tmp_path / "shards"), 4) == [str(pdb)]
@@ -0,0 +1,109 @@
+import os
+import zipfile
+
+import pytest
+from unittest.mock import Mock
+
+from app.integrations.io.io import IOLocal
+from app.services.archive_cache import ArchiveCache
+
+
+@pytest.fixture
+def charges_dir(tmp_path):
+    charges_dir = tmp_path / "charges"
+    charges_dir.mkdir()
+    (charges_dir / "file1.txt").write_text("charges1")
+    (charges_dir / "file2.txt").write_text("charges2")
+    return str(charges_dir)
+
+
+@pytest.fixture
+def entries(charges_dir):
+    return [
+        ("txt", None),
+        ("txt/file1.txt", os.path.join(charges_dir, "file1.txt")),
+        ("txt/file2.txt", os.path.join(charges_dir, "file2.txt")),
+    ]
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "archives")
+
+
+@pytest.fixture
+def archive_cache(cache_dir):
+    return ArchiveCache(IOLocal(), Mock(), cache_dir, 1024 * 1024)
+
+
+class TestArchiveCache:
+    def test_store(self, archive_cache, charges_dir, entries):
+        """Test that generated archive is stored and found afterwards."""
+
+        assert archive_cache.find(charges_dir, "fingerprint") is None
+
+        data = b"".join(archive_cache.store(charges_dir, "fingerprint", entries))
+        path = archive_cache.find(charges_dir, "fingerprint")
+
+        assert path is not None
+        with open(path, "rb") as f:
+            assert f.read() == data
+        with zipfile.ZipFile(path) as archive:
+            assert archive.read("txt/file1.txt") == b"charges1"
+
+    def test_store_interrupted(self, archive_cache, charges_dir, entries, cache_dir):
+        """Test that partially generated archive is not stored."""
+
+        chunks = archive_cache.store(charges_dir, "fingerprint", entries)
+        next(chunks)
+        chunks.close()
+
+        assert archive_cache.find(charges_dir, "fingerprint") is None
+        assert os.listdir(cache_dir) == []
+
+    def test_store_replaces_stale(self, archive_cache, charges_dir, entries, cache_dir):
+        """Test that archive of a changed directory replaces the previous one."""
+
+        list(archive_cache.store(charges_dir, "old", entries))
+        list(archive_cache.store(charges_dir, "new", entries))
+
+        assert archive_cache.find(charges_dir, "old") is None
+        assert archive_cache.find(charges_dir, "new") is not None
+        assert len(os.listdir(cache_dir)) == 1
+
+    def test_invalidate(self, archive_cache, charges_dir, entries, tmp_path):
+        """Test that invalidation removes only archives of the provided directory."""
+
+        other_dir = str(tmp_path / "other")
+        list(archive_cache.store(charges_dir, "fingerprint", entries))
+        list(archive_cache.store(other_dir, "fingerprint", entries))
+
+        archive_cache.invalidate(charges_dir)
+
+        assert archive_cache.find(charges_dir, "fingerprint") is None
+        assert archive_cache.find(other_dir, "fingerprint") is not None
+
+    def test_evict(self, charges_dir, entries, cache_dir, tmp_path):
+        """Test that the oldest archives are evicted when the cache is full."""
+
+        archive_cache = ArchiveCache(IOLocal(), Mock(), cache_dir, 1)
+        dirs = [str(tmp_path / f"dir{i}") for i in range(3)]
+
+        for directory in dirs:
+            list(archive_cache.store(directory, "fingerprint", entries))
+
+        # the cache is over its size after every archive, so only the last one is kept
+        assert [archive_cache.find(directory, "fingerprint") is not None for directory in dirs] == [
+            False,
+            False,
+            True,
+        ]
+
+    def test_disabled(self, charges_dir, entries, cache_dir):
+        """Test that archives are only generated when the cache is disabled."""
+
+        archive_cache = ArchiveCache(IOLocal(), Mock(), cache_dir, 0)
+
+        assert b"".join(archive_cache.store(charges_dir, "fingerprint", entries))
+        assert archive_cache.find(charges_dir, "fingerprint") is None
+        assert not os.path.exists(cache_dir)
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import AsyncMock, Mock, MagicMock
 from datetime import datetime
 
 from models.calculation import (
@@ -10,6 +10,8 @@ from models.calculation import (
 )
 from models.paging import PagedList
 from models.molecule_info import MoleculeSetStats
+from models.method import Method
+from models.parameters import Parameters
 from models.setup import AdvancedSettingsDto
 from db.schemas.user import User  # noqa: F401
 from db.schemas.calculation import (
@@ -44,7 +46,10 @@ def calculation_repository_mock():
 
 @pytest.fixture
 def config_repository_mock():
-    return Mock()
+    mock = Mock()
+    mock.get_id.return_value = "0b4c6a6e-7d1e-4d0c-9a55-2f6f5e3b1c11"
+    mock.get_id_async = AsyncMock(return_value="0b4c6a6e-7d1e-4d0c-9a55-2f6f5e3b1c11")
+    return mock
 
 
 @pytest.fixture
@@ -54,6 +59,14 @@ def stats_repository_mock():
 
 @pytest.fixture
 def advanced_settings_repository_mock():
+    mock = Mock()
+    mock.get_id.return_value = "8e2a4c1f-6b3d-4f7a-9c5e-1d2b3a4c5e6f"
+    mock.get_id_async = AsyncMock(return_value="8e2a4c1f-6b3d-4f7a-9c5e-1d2b3a4c5e6f")
+    return mock
+
+
+@pytest.fixture
+def suitable_methods_repository_mock():
     return Mock()
 
 
@@ -69,6 +82,18 @@ def session_manager_mock():
     return session_manager
 
 
+@pytest.fixture
+def async_session_manager_mock():
+    session = AsyncMock()
+
+    context_manager = MagicMock()
+    context_manager.__aenter__.return_value = session
+
+    session_manager = Mock()
+    session_manager.session.return_value = context_manager
+    return session_manager
+
+
 @pytest.fixture
 def service(
     logger_mock,
@@ -77,7 +102,9 @@ def service(
     config_repository_mock,
     stats_repository_mock,
     advanced_settings_repository_mock,
+    suitable_methods_repository_mock,
     session_manager_mock,
+    async_session_manager_mock,
 ):
     return CalculationStorageService(
         logger=logger_mock,
@@ -86,7 +113,9 @@ def service(
         config_repository=config_repository_mock,
         stats_repository=stats_repository_mock,
         advanced_settings_repository=advanced_settings_repository_mock,
+        suitable_methods_repository=suitable_methods_repository_mock,
         session_manager=session_manager_mock,
+        async_session_manager=async_session_manager_mock,
     )
 
 
@@ -116,6 +145,7 @@ def sample_advanced_settings():
 @pytest.fixture
 def sample_advanced_settings_entity():
     return AdvancedSettings(
+        id="8e2a4c1f-6b3d-4f7a-9c5e-1d2b3a4c5e6f",
         read_hetatm=True,
         ignore_water=False,
         permissive_types=True,
@@ -129,7 +159,9 @@ def sample_calculation_config():
 
 @pytest.fixture
 def sample_calculation_config_entity():
-    return CalculationConfig(method="method1", parameters="params1")
+    return CalculationConfig(
+        id="0b4c6a6e-7d1e-4d0c-9a55-2f6f5e3b1c11", method="method1", parameters="params1"
+    )
 
 
 @pytest.fixture
@@ -203,39 +235,52 @@ class TestCalculationStorageService:
         session_manager_mock,
         set_repository_mock,
         sample_calculation_set,
+        sample_molecule_set_stats,
         stats_repository_mock,
     ):
         """Test get_calculations method returns a PagedList of CalculationSetPreviewDtos."""
 
+        sample_calculation_set.molecule_set_stats_associations[0].molecule_set = (
+            sample_molecule_set_stats
+        )
         set_repository_mock.get_all.return_value = PagedList(items=[sample_calculation_set])
 
-        molecule_set_stats = MoleculeSetStats(
-            {
-                "total_molecules": 10,
-                "total_atoms": 100,
-                "atom_type_counts": [
-                    {"symbol": "C", "count": 50},
-                    {"symbol": "H", "count": 30},
-                    {"symbol": "O", "count": 20},
-                ],
-            }
+        filters = CalculationSetFilters(page=1, page_size=10, order_by="created_at", order="desc")
+        result = service.get_calculations(filters)
+
+        set_repository_mock.get_all.assert_called_once_with(
+            session_manager_mock.session().__enter__(), filters, None
+        )
+        # stats are loaded together with the sets
+        stats_repository_mock.get.assert_not_called()
+        assert isinstance(result, PagedList)
+        assert len(result.items) == 1
+        assert isinstance(result.items[0], CalculationSetPreviewDto)
+        assert str(result.items[0].id) == "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
+        assert len(result.items[0].files) == 1
+        assert result.items[0].files["file1.mol"].total_atoms == 100
+        assert len(result.items[0].files["file1.mol"].atom_type_counts) == 3
+
+    def test_get_calculations_cursor_total_count(
+        self, service, session_manager_mock, set_repository_mock
+    ):
+        """Test that total count is cached for pages following a cursor."""
+
+        session = session_manager_mock.session().__enter__()
+        set_repository_mock.get_all.return_value = PagedList(items=[], total_count=42)
+
+        filters = CalculationSetFilters(
+            page=1, page_size=10, order_by="created_at", order="desc", user_id="user1"
         )
+        service.get_calculations(filters)
 
-        with patch.object(service, "get_info", return_value=molecule_set_stats):
-            filters = CalculationSetFilters(
-                page=1, page_size=10, order_by="created_at", order="desc"
-            )
-            result = service.get_calculations(filters)
+        filters.cursor = "cursor"
+        service.get_calculations(filters)
+        set_repository_mock.get_all.assert_called_with(session, filters, 42)
 
-            set_repository_mock.get_all.assert_called_once_with(
-                session_manager_mock.session().__enter__(), filters
-            )
-            assert isinstance(result, PagedList)
-            assert len(result.items) == 1
-            assert isinstance(result.items[0], CalculationSetPreviewDto)
-            assert str(result.items[0].id) == "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
-            assert len(result.items[0].files) == 1
-            assert "file1.mol" in result.items[0].files
+        service._invalidate_total_count("user1")
+        service.get_calculations(filters)
+        set_repository_mock.get_all.assert_called_with(session, filters, None)
 
     def test_get_calculation_set(
         self,
@@ -282,6 +327,124 @@ class TestCalculationStorageService:
         assert len(store_arg.atom_type_counts) == 3
         assert result == molecule_set_stats
 
+    def test_store_suitable_methods(
+        self, service, session_manager_mock, suitable_methods_repository_mock
+    ):
+        """Test store_suitable_methods method stores (method, parameters) pairs in order."""
+
+        session = session_manager_mock.session().__enter__()
+        suitable_methods_repository_mock.get_stored_file_hashes.return_value = set()
+
+        method1 = Method("Method 1", "method1", "Method 1", None, "3D", True)
+        method2 = Method("Method 2", "method2", "Method 2", None, "2D", False)
+        params1 = Parameters("Params 1", "params1", "", "method1")
+        params2 = Parameters("Params 2", "params2", "", "method1")
+
+        service.store_suitable_methods(
+            "hash123", True, [(method1, [params1, params2]), (method2, [])]
+        )
+
+        stored = suitable_methods_repository_mock.store.call_args[0][3]
+        suitable_methods_repository_mock.store.assert_called_once_with(
+            session, "hash123", True, stored
+        )
+        assert [(s.method, s.parameters, s.position) for s in stored] == [
+            ("method1", "params1", 0),
+            ("method1", "params2", 1),
+            ("method2", None, 2),
+        ]
+        assert all(s.molecule_set_id == "hash123" and s.permissive_types for s in stored)
+
+    def test_store_suitable_methods_already_stored(
+        self, service, suitable_methods_repository_mock
+    ):
+        """Test store_suitable_methods method does not store methods twice."""
+
+        suitable_methods_repository_mock.get_stored_file_hashes.return_value = {"hash123"}
+
+        service.store_suitable_methods("hash123", True, [])
+
+        suitable_methods_repository_mock.store.assert_not_called()
+
+    def test_store_suitable_methods_empty(
+        self, service, session_manager_mock, suitable_methods_repository_mock
+    ):
+        """Test store_suitable_methods method stores files without any suitable method."""
+
+        session = session_manager_mock.session().__enter__()
+        suitable_methods_repository_mock.get_stored_file_hashes.return_value = set()
+
+        service.store_suitable_methods("hash123", False, [])
+
+        suitable_methods_repository_mock.store.assert_called_once_with(
+            session, "hash123", False, []
+        )
+
+    def test_store_files_info(
+        self,
+        service,
+        session_manager_mock,
+        stats_repository_mock,
+        suitable_methods_repository_mock,
+    ):
+        """Test store_files_info stores stats and methods of all files in a single session."""
+
+        session = session_manager_mock.session().__enter__()
+        session_manager_mock.session.reset_mock()
+        stats_repository_mock.get_stored_file_hashes.return_value = {"hash2"}
+        suitable_methods_repository_mock.get_stored_file_hashes.return_value = {"hash2"}
+
+        stats = MoleculeSetStats(
+            {
+                "total_molecules": 1,
+                "total_atoms": 2,
+                "atom_type_counts": [{"symbol": "C", "count": 2}],
+            }
+        )
+        method = Method("Method 1", "method1", "Method 1", None, "3D", False)
+
+        service.store_files_info(
+            {"hash1": stats, "hash2": stats}, {"hash1": [(method, [])], "hash2": [(method, [])]}
+        )
+
+        session_manager_mock.session.assert_called_once()
+        stats_repository_mock.get_stored_file_hashes.assert_called_once_with(
+            session, ["hash1", "hash2"]
+        )
+        suitable_methods_repository_mock.get_stored_file_hashes.assert_called_once_with(
+            session, ["hash1", "hash2"], True
+        )
+
+        added = [call.args[0] for call in session.add.call_args_list]
+        assert [(info.file_hash, info.total_atoms) for info in added] == [("hash1", 2)]
+
+        suitable_methods_repository_mock.store.assert_called_once()
+        stored = suitable_methods_repository_mock.store.call_args[0][3]
+        assert [(s.molecule_set_id, s.method, s.parameters) for s in stored] == [
+            ("hash1", "method1", None)
+        ]
+
+    def test_store_files_info_error(self, service, logger_mock, stats_repository_mock):
+        """Test store_files_info logs and raises errors."""
+
+        stats_repository_mock.get_stored_file_hashes.side_effect = Exception("Database error")
+
+        with pytest.raises(Exception):
+            service.store_files_info({}, {})
+
+        logger_mock.error.assert_called_once()
+
+    def test_get_files_without_suitable_methods(
+        self, service, suitable_methods_repository_mock
+    ):
+        """Test get_files_without_suitable_methods returns hashes without stored methods."""
+
+        suitable_methods_repository_mock.get_stored_file_hashes.return_value = {"hash2"}
+
+        result = service.get_files_without_suitable_methods(["hash1", "hash2", "hash3"], False)
+
+        assert result == ["hash1", "hash3"]
+
     def test_store_calculation_results_new_set(
         self,
         service,
@@ -301,12 +464,11 @@ class TestCalculationStorageService:
         session = session_manager_mock.session().__enter__()
 
         set_repository_mock.get.return_value = None
-        advanced_settings_repository_mock.get.return_value = sample_advanced_settings_entity
-        config_repository_mock.get.return_value = sample_calculation_config_entity
-        stats_repository_mock.get.return_value = MoleculeSetStatsModel(
-            file_hash="hash123", total_molecules=10, total_atoms=100, atom_type_counts=[]
-        )
-        calculation_repository_mock.get.return_value = None
+        session.get.return_value = sample_calculation_config_entity
+        advanced_settings_repository_mock.get_id.return_value = sample_advanced_settings_entity.id
+        config_repository_mock.get_id.return_value = sample_calculation_config_entity.id
+        stats_repository_mock.get_stored_file_hashes.return_value = {"hash123"}
+        calculation_repository_mock.get_existing_charges_paths.return_value = {}
 
         service.store_calculation_results(
             "d55a7af3-d1ee-4884-bce0-805efd5e1e64",
@@ -318,15 +480,139 @@ class TestCalculationStorageService:
         set_repository_mock.get.assert_called_once_with(
             session, "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
         )
-        advanced_settings_repository_mock.get.assert_called_once()
-        config_repository_mock.get.assert_called_once_with(session, "method1", "params1")
+        advanced_settings_repository_mock.get_id.assert_called_once()
+        config_repository_mock.get_id.assert_called_once_with(session, "method1", "params1")
+        # config is linked to the new set
+        session.get.assert_called_once_with(CalculationConfig, sample_calculation_config_entity.id)
         assert set_repository_mock.store.call_count == 2
-        assert calculation_repository_mock.store.call_count == 1
+        calculation_repository_mock.store_all.assert_called_once()
 
-        calc_arg = calculation_repository_mock.store.call_args[0][1]
+        [calc_arg] = calculation_repository_mock.store_all.call_args[0][1]
         assert calc_arg.file_name == "file1.mol"
         assert calc_arg.file_hash == "hash123"
-        assert calc_arg.config == sample_calculation_config_entity
+        assert calc_arg.config_id == sample_calculation_config_entity.id
+        assert calc_arg.advanced_settings_id == sample_advanced_settings_entity.id
+
+    def test_store_calculation_results_skips_existing(
+        self,
+        service,
+        set_repository_mock,
+        calculation_repository_mock,
+        advanced_settings_repository_mock,
+        config_repository_mock,
+        stats_repository_mock,
+        sample_advanced_settings,
+        sample_advanced_settings_entity,
+        sample_calculation_config,
+        sample_calculation_config_entity,
+        sample_calculation_set,
+    ):
+        """Test store_calculation_results checks existing calculations with a single query."""
+
+        set_repository_mock.get.return_value = sample_calculation_set
+        advanced_settings_repository_mock.get_id.return_value = sample_advanced_settings_entity.id
+        config_repository_mock.get_id.return_value = sample_calculation_config_entity.id
+        stats_repository_mock.get_stored_file_hashes.return_value = set()
+        calculation_repository_mock.get_existing_charges_paths.return_value = {
+            ("hash1", sample_calculation_config_entity.id): None
+        }
+
+        calculations = [
+            CalculationDto(
+                file=f"file{i}.mol", file_hash=f"hash{i}", charges={}, config=sample_calculation_config
+            )
+            for i in range(1, 4)
+        ]
+        service.store_calculation_results(
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64",
+            sample_advanced_settings,
+            [CalculationResultDto(config=sample_calculation_config, calculations=calculations)],
+            "user123",
+        )
+
+        calculation_repository_mock.get_existing_charges_paths.assert_called_once()
+        calculation_repository_mock.get.assert_not_called()
+        stored = calculation_repository_mock.store_all.call_args[0][1]
+        assert [calculation.file_hash for calculation in stored] == ["hash2", "hash3"]
+
+    def test_store_calculation_results_charges_store(
+        self,
+        service,
+        set_repository_mock,
+        calculation_repository_mock,
+        advanced_settings_repository_mock,
+        config_repository_mock,
+        stats_repository_mock,
+        sample_advanced_settings,
+        sample_advanced_settings_entity,
+        sample_calculation_result,
+        sample_calculation_config_entity,
+        sample_calculation_set,
+    ):
+        """Test store_calculation_results writes charges to the charges store if enabled."""
+
+        service.charges_store = Mock(enabled=True)
+        service.charges_store.write.return_value = ("ab/abcd.charges", 123)
+        set_repository_mock.get.return_value = sample_calculation_set
+        advanced_settings_repository_mock.get_id.return_value = sample_advanced_settings_entity.id
+        config_repository_mock.get_id.return_value = sample_calculation_config_entity.id
+        stats_repository_mock.get_stored_file_hashes.return_value = set()
+        calculation_repository_mock.get_existing_charges_paths.return_value = {}
+
+        service.store_calculation_results(
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64",
+            sample_advanced_settings,
+            [sample_calculation_result],
+            "user123",
+        )
+
+        file_hash, _, settings, _ = service.charges_store.write.call_args[0]
+        assert file_hash == "hash123"
+        assert settings.model_dump() == sample_advanced_settings.model_dump()
+
+        [calc_arg] = calculation_repository_mock.store_all.call_args[0][1]
+        assert calc_arg.charges is None
+        assert calc_arg.charges_path == "ab/abcd.charges"
+        assert calc_arg.charges_size == 123
+
+    def test_store_calculation_results_restores_charges(
+        self,
+        service,
+        set_repository_mock,
+        calculation_repository_mock,
+        advanced_settings_repository_mock,
+        config_repository_mock,
+        stats_repository_mock,
+        sample_advanced_settings,
+        sample_advanced_settings_entity,
+        sample_calculation_result,
+        sample_calculation_config_entity,
+        sample_calculation_set,
+    ):
+        """Test store_calculation_results writes missing charges files of stored calculations."""
+
+        service.charges_store = Mock(enabled=True)
+        set_repository_mock.get.return_value = sample_calculation_set
+        advanced_settings_repository_mock.get_id.return_value = sample_advanced_settings_entity.id
+        config_repository_mock.get_id.return_value = sample_calculation_config_entity.id
+        stats_repository_mock.get_stored_file_hashes.return_value = set()
+        calculation_repository_mock.get_existing_charges_paths.return_value = {
+            ("hash123", sample_calculation_config_entity.id): "ab/abcd.charges"
+        }
+
+        service.store_calculation_results(
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64",
+            sample_advanced_settings,
+            [sample_calculation_result],
+            "user123",
+        )
+
+        [calculation] = sample_calculation_result.calculations
+        service.charges_store.restore.assert_called_once_with(
+            "ab/abcd.charges", calculation.charges
+        )
+        service.charges_store.write.assert_not_called()
+        assert calculation_repository_mock.store_all.call_args[0][1] == []
 
     def test_store_calculation_results_existing_set(
         self,
@@ -348,12 +634,10 @@ class TestCalculationStorageService:
         session = session_manager_mock.session().__enter__()
 
         set_repository_mock.get.return_value = sample_calculation_set
-        advanced_settings_repository_mock.get.return_value = sample_advanced_settings_entity
-        config_repository_mock.get.return_value = sample_calculation_config_entity
-        stats_repository_mock.get.return_value = MoleculeSetStatsModel(
-            file_hash="hash123", total_molecules=10, total_atoms=100, atom_type_counts=[]
-        )
-        calculation_repository_mock.get.return_value = None
+        advanced_settings_repository_mock.get_id.return_value = sample_advanced_settings_entity.id
+        config_repository_mock.get_id.return_value = sample_calculation_config_entity.id
+        stats_repository_mock.get_stored_file_hashes.return_value = {"hash123"}
+        calculation_repository_mock.get_existing_charges_paths.return_value = {}
 
         service.store_calculation_results(
             "d55a7af3-d1ee-4884-bce0-805efd5e1e64",
@@ -366,7 +650,8 @@ class TestCalculationStorageService:
             session, "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
         )
         set_repository_mock.store.assert_called_once_with(session, sample_calculation_set)
-        assert calculation_repository_mock.store.call_count == 1
+        assert len(calculation_repository_mock.store_all.call_args[0][1]) == 1
+        assert len(sample_calculation_set.molecule_set_stats_associations) == 1
 
     def test_setup_calculation(
         self,
@@ -381,7 +666,7 @@ class TestCalculationStorageService:
         """Test setup_calculation method creates a new calculation set."""
 
         session = session_manager_mock.session().__enter__()
-        advanced_settings_repository_mock.get.return_value = sample_advanced_settings_entity
+        advanced_settings_repository_mock.get_id.return_value = sample_advanced_settings_entity.id
         stats_repository_mock.get.return_value = MoleculeSetStatsModel(
             file_hash="hash123", total_molecules=10, total_atoms=100, atom_type_counts=[]
         )
@@ -390,14 +675,14 @@ class TestCalculationStorageService:
             "d55a7af3-d1ee-4884-bce0-805efd5e1e64", sample_advanced_settings, ["hash123"], "user123"
         )
 
-        advanced_settings_repository_mock.get.assert_called_once()
+        advanced_settings_repository_mock.get_id.assert_called_once()
         stats_repository_mock.get.assert_called_once_with(session, "hash123")
         set_repository_mock.store.assert_called_once()
 
         calc_set_arg = set_repository_mock.store.call_args[0][1]
         assert calc_set_arg.id == "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
         assert calc_set_arg.user_id == "user123"
-        assert calc_set_arg.advanced_settings == sample_advanced_settings_entity
+        assert calc_set_arg.advanced_settings_id == sample_advanced_settings_entity.id
         assert len(calc_set_arg.molecule_set_stats) == 1
 
     def test_filter_existing_calculations(
@@ -410,24 +695,15 @@ class TestCalculationStorageService:
     ):
         """Test filter_existing_calculations method correctly filters calculations."""
 
-        # for the first file+config combination, return None (not in DB)
-        # for the second file+config combination, return an existing calculation
-        def mock_get_side_effect(session, filters):
-            if filters.hash == "hash123":
-                return None
-            else:
-                calculation = Calculation(
-                    file_name="file2.mol",
-                    file_hash="hash456",
-                    charges={},
-                    config=CalculationConfig(method="method1", parameters="params1"),
-                    advanced_settings=AdvancedSettings(
-                        read_hetatm=True, ignore_water=False, permissive_types=True
-                    ),
-                )
-                return calculation
-
-        calculation_repository_mock.get.side_effect = mock_get_side_effect
+        # only the second file has an existing calculation in the database
+        calculation_repository_mock.get_all_for_files.return_value = [
+            Calculation(
+                file_name="file2.mol",
+                file_hash="hash456",
+                charges={},
+                config_id="0b4c6a6e-7d1e-4d0c-9a55-2f6f5e3b1c11",
+            )
+        ]
 
         to_calculate, cached = service.filter_existing_calculations(
             sample_advanced_settings, ["hash123", "hash456"], [sample_calculation_config]
@@ -442,6 +718,30 @@ class TestCalculationStorageService:
         assert len(cached[sample_calculation_config]) == 1
         assert cached[sample_calculation_config][0].file_hash == "hash456"
 
+        # all calculations are looked up using a single query
+        calculation_repository_mock.get_all_for_files.assert_called_once()
+        calculation_repository_mock.get.assert_not_called()
+
+    def test_filter_existing_calculations_settings_not_stored(
+        self,
+        service,
+        calculation_repository_mock,
+        advanced_settings_repository_mock,
+        sample_advanced_settings,
+        sample_calculation_config,
+    ):
+        """Test that calculations are not looked up when their settings are not stored."""
+
+        advanced_settings_repository_mock.get_id.return_value = None
+
+        to_calculate, cached = service.filter_existing_calculations(
+            sample_advanced_settings, ["hash123"], [sample_calculation_config]
+        )
+
+        assert to_calculate == {sample_calculation_config: ["hash123"]}
+        assert cached == {}
+        calculation_repository_mock.get_all_for_files.assert_not_called()
+
     def test_get_calculation_results_not_found(
         self, service, session_manager_mock, set_repository_mock
     ):
@@ -455,6 +755,74 @@ class TestCalculationStorageService:
         set_repository_mock.get.assert_called_once_with(session, "nonexistent")
         assert results == []
 
+    def test_get_calculation_results(
+        self,
+        service,
+        set_repository_mock,
+        calculation_repository_mock,
+        sample_calculation_set,
+        sample_calculation_config_entity,
+    ):
+        """Test get_calculation_results groups calculations by config."""
+
+        other_config = CalculationConfig(
+            id="5d0f3e55-2c8e-4a1b-8f4b-0d3c9e7a6b21", method="method2", parameters=None
+        )
+        sample_calculation_set.configs.append(other_config)
+        set_repository_mock.get.return_value = sample_calculation_set
+        calculation_repository_mock.get_for_set.return_value = [
+            (
+                Calculation(
+                    file_name="original.mol",
+                    file_hash="hash123",
+                    charges={"molecule1": [0.1], "molecule2": [0.2]},
+                    config_id=sample_calculation_config_entity.id,
+                    config=sample_calculation_config_entity,
+                ),
+                "file1.mol",
+            )
+        ]
+
+        results = service.get_calculation_results(
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64", molecule="molecule2"
+        )
+
+        assert [result.config.method for result in results] == ["method1", "method2"]
+        assert len(results[0].calculations) == 1
+        assert results[0].calculations[0].file == "file1.mol"
+        assert results[0].calculations[0].charges == {"molecule2": [0.2]}
+        assert results[1].calculations == []
+
+    def test_get_calculation_results_without_charges(
+        self,
+        service,
+        set_repository_mock,
+        calculation_repository_mock,
+        sample_calculation_set,
+        sample_calculation_config_entity,
+    ):
+        """Test get_calculation_results does not load charges unless requested."""
+
+        session = MagicMock()
+        service.session_manager.session.return_value.__enter__.return_value = session
+        set_repository_mock.get.return_value = sample_calculation_set
+        calculation = Mock(
+            file_name="file1.mol",
+            file_hash="hash123",
+            config_id=sample_calculation_config_entity.id,
+            config=sample_calculation_config_entity,
+        )
+        calculation_repository_mock.get_for_set.return_value = [(calculation, "file1.mol")]
+
+        results = service.get_calculation_results(
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64", file_hash="hash123", include_charges=False
+        )
+
+        calculation_repository_mock.get_for_set.assert_called_once_with(
+            session, "d55a7af3-d1ee-4884-bce0-805efd5e1e64", "hash123", False
+        )
+        assert results[0].calculations[0].charges == {}
+
     def test_delete_calculation_set(self, service, session_manager_mock, set_repository_mock):
         """Test delete_calculation_set method deletes a calculation_set."""
 
@@ -465,3 +833,170 @@ class TestCalculationStorageService:
         set_repository_mock.delete.assert_called_once_with(
             session, "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
         )
+
+    def test_filter_existing_calculations_charges_store(
+        self,
+        service,
+        calculation_repository_mock,
+        sample_advanced_settings,
+        sample_calculation_config,
+    ):
+        """Test that cached charges are read from the charges store and missing ones recalculated."""
+
+        def read(path):
+            if path != "stored.charges":
+                raise FileNotFoundError(path)
+
+            return {"molecule1": [0.5]}
+
+        service.charges_store = Mock(enabled=True)
+        service.charges_store.read.side_effect = read
+        calculation_repository_mock.get_all_for_files.return_value = [
+            Calculation(
+                file_name=f"{file_hash}.mol",
+                file_hash=file_hash,
+                charges_path=path,
+                config_id="0b4c6a6e-7d1e-4d0c-9a55-2f6f5e3b1c11",
+            )
+            for file_hash, path in [("hash1", "stored.charges"), ("hash2", "missing.charges")]
+        ]
+
+        to_calculate, cached = service.filter_existing_calculations(
+            sample_advanced_settings, ["hash1", "hash2"], [sample_calculation_config]
+        )
+
+        assert to_calculate[sample_calculation_config] == ["hash2"]
+        assert cached[sample_calculation_config][0].charges == {"molecule1": [0.5]}
+
+    @pytest.mark.asyncio
+    async def test_get_infos_async(
+        self,
+        service,
+        async_session_manager_mock,
+        stats_repository_mock,
+        sample_molecule_set_stats,
+    ):
+        """Test get_infos_async method returns info about multiple files."""
+
+        session = async_session_manager_mock.session().__aenter__.return_value
+        stats_repository_mock.get_all_async = AsyncMock(
+            return_value={"hash123": sample_molecule_set_stats}
+        )
+
+        result = await service.get_infos_async(["hash123", "nonexistent"])
+
+        stats_repository_mock.get_all_async.assert_awaited_once_with(
+            session, ["hash123", "nonexistent"]
+        )
+        assert list(result) == ["hash123"]
+        assert result["hash123"].total_atoms == 100
+
+    @pytest.mark.asyncio
+    async def test_get_calculations_async(
+        self,
+        service,
+        async_session_manager_mock,
+        set_repository_mock,
+        sample_calculation_set,
+        sample_molecule_set_stats,
+    ):
+        """Test get_calculations_async method uses the async session."""
+
+        sample_calculation_set.molecule_set_stats_associations[0].molecule_set = (
+            sample_molecule_set_stats
+        )
+        set_repository_mock.get_all_async = AsyncMock(
+            return_value=PagedList(items=[sample_calculation_set])
+        )
+
+        filters = CalculationSetFilters(page=1, page_size=10, order_by="created_at", order="desc")
+        result = await service.get_calculations_async(filters)
+
+        set_repository_mock.get_all_async.assert_awaited_once_with(
+            async_session_manager_mock.session().__aenter__.return_value, filters, None
+        )
+        set_repository_mock.get_all.assert_not_called()
+        assert len(result.items) == 1
+        assert result.items[0].files["file1.mol"].total_atoms == 100
+
+    @pytest.mark.asyncio
+    async def test_get_calculation_set_async(
+        self, service, async_session_manager_mock, set_repository_mock, sample_calculation_set
+    ):
+        """Test get_calculation_set_async method returns a calculation set."""
+
+        set_repository_mock.get_async = AsyncMock(return_value=sample_calculation_set)
+
+        result = await service.get_calculation_set_async("d55a7af3-d1ee-4884-bce0-805efd5e1e64")
+
+        set_repository_mock.get_async.assert_awaited_once_with(
+            async_session_manager_mock.session().__aenter__.return_value,
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64",
+        )
+        assert result == sample_calculation_set
+
+    @pytest.mark.asyncio
+    async def test_filter_existing_calculations_async(
+        self,
+        service,
+        session_manager_mock,
+        calculation_repository_mock,
+        sample_advanced_settings,
+        sample_calculation_config,
+    ):
+        """Test filter_existing_calculations_async method does not use the sync session."""
+
+        calculation_repository_mock.get_all_for_files_async = AsyncMock(
+            return_value=[
+                Calculation(
+                    file_name="file2.mol",
+                    file_hash="hash456",
+                    charges={},
+                    config_id="0b4c6a6e-7d1e-4d0c-9a55-2f6f5e3b1c11",
+                )
+            ]
+        )
+        session_manager_mock.session.reset_mock()
+
+        to_calculate, cached = await service.filter_existing_calculations_async(
+            sample_advanced_settings, ["hash123", "hash456"], [sample_calculation_config]
+        )
+
+        assert to_calculate[sample_calculation_config] == ["hash123"]
+        assert cached[sample_calculation_config][0].file_hash == "hash456"
+        session_manager_mock.session.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_calculation_results_async(
+        self,
+        service,
+        set_repository_mock,
+        calculation_repository_mock,
+        sample_calculation_set,
+        sample_calculation_config_entity,
+    ):
+        """Test get_calculation_results_async groups calculations by config."""
+
+        set_repository_mock.get_async = AsyncMock(return_value=sample_calculation_set)
+        calculation_repository_mock.get_for_set_async = AsyncMock(
+            return_value=[
+                (
+                    Calculation(
+                        file_name="original.mol",
+                        file_hash="hash123",
+                        charges={"molecule1": [0.1]},
+                        config_id=sample_calculation_config_entity.id,
+                        config=sample_calculation_config_entity,
+                    ),
+                    "file1.mol",
+                )
+            ]
+        )
+
+        results = await service.get_calculation_results_async(
+            "d55a7af3-d1ee-4884-bce0-805efd5e1e64"
+        )
+
+        assert len(results) == 1
+        assert results[0].calculations[0].file == "file1.mol"
+        assert results[0].calculations[0].charges == {"molecule1": [0.1]}
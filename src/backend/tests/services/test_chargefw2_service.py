@@ -1,17 +1,22 @@
+import asyncio
+import threading
+from pathlib import Path
 from typing import Literal
-from unittest.mock import AsyncMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 import pytest
 
 from app.models.method import Method
 from app.models.parameters import Parameters
-from app.models.calculation import (
+from models.calculation import (
     CalculationConfigDto,
     CalculationDto,
     CalculationResultDto,
 )
-from app.models.setup import AdvancedSettingsDto
+from models.setup import AdvancedSettingsDto
 from app.models.suitable_methods import SuitableMethods
 from app.services.chargefw2 import ChargeFW2Service
+from services.molecules_cache import MoleculesCache
+from integrations.chargefw2 import process_pool
 
 
 @pytest.fixture
@@ -29,12 +34,20 @@ def io_mock():
     mock = Mock()
     mock.parse_filename = Mock(side_effect=lambda f: (f.split("_")[0], f.split("_")[1]))
     mock.listdir = Mock(return_value=["hash1_file1.pdb", "hash2_file2.pdb"])
+    mock.get_filepaths = Mock(
+        side_effect=lambda file_hashes, user_id=None: {
+            file.split("_")[0]: f"/storage/{file}"
+            for file in ["hash1_file1.pdb", "hash2_file2.pdb"]
+            if file.split("_")[0] in file_hashes
+        }
+    )
     mock.get_file_storage_path = Mock(return_value="/storage")
     mock.get_inputs_path = Mock(return_value="/inputs")
     mock.get_charges_path = Mock(return_value="/charges")
     mock.create_dir = Mock()
     mock.store_configs = AsyncMock()
     mock.path_exists = Mock(return_value=True)
+    mock.track_computation_usage = MagicMock()
     return mock
 
 
@@ -47,6 +60,7 @@ def mmcif_service_mock():
 def calculation_storage_mock():
     mock = Mock()
     mock.get_calculation_set = Mock(return_value=None)
+    mock.get_calculation_set_async = AsyncMock(return_value=None)
     return mock
 
 
@@ -63,6 +77,22 @@ def service(chargefw2_mock, logger_mock, io_mock, mmcif_service_mock, calculatio
     )
 
 
+@pytest.fixture
+def process_service(
+    chargefw2_mock, logger_mock, io_mock, mmcif_service_mock, calculation_storage_mock
+):
+    return ChargeFW2Service(
+        chargefw2=chargefw2_mock,
+        logger=logger_mock,
+        io=io_mock,
+        mmcif_service=mmcif_service_mock,
+        calculation_storage=calculation_storage_mock,
+        max_workers=2,
+        max_concurrent_calculations=2,
+        executor_type="process",
+    )
+
+
 def get_method(
     internal_name: str,
     name: str = "",
@@ -160,6 +190,61 @@ class TestChargeFW2Service:
         chargefw2_mock.molecules.assert_called_once_with(file_path, True, False, True)
         service.logger.info.assert_called_once_with(f"Loading molecules from file {file_path}.")
 
+    @pytest.mark.asyncio
+    async def test_read_molecules_computation_scope(self, service, chargefw2_mock):
+        """Test that a file is parsed only once during a computation."""
+
+        file_path = "/path/to/file.pdb"
+        molecules_mock = Mock()
+        chargefw2_mock.molecules.return_value = molecules_mock
+
+        first, second = await asyncio.gather(
+            service.read_molecules(file_path, True, False, True, "comp123"),
+            service.read_molecules(file_path, True, False, True, "comp123"),
+        )
+        third = await service.read_molecules(file_path, True, False, True, "comp123")
+
+        assert first is second is third is molecules_mock
+        chargefw2_mock.molecules.assert_called_once_with(file_path, True, False, True)
+
+        service.release_molecules("comp123")
+        await service.read_molecules(file_path, True, False, True, "comp123")
+
+        assert chargefw2_mock.molecules.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_read_molecules_computation_scope_error(self, service, chargefw2_mock):
+        """Test that failed parsing is not shared during a computation."""
+
+        file_path = "/path/to/file.pdb"
+        chargefw2_mock.molecules.side_effect = [RuntimeError("Test error"), Mock()]
+
+        with pytest.raises(RuntimeError, match="Test error"):
+            await service.read_molecules(file_path, True, False, True, "comp123")
+
+        await service.read_molecules(file_path, True, False, True, "comp123")
+
+        assert chargefw2_mock.molecules.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_read_molecules_cached(self, service, chargefw2_mock, io_mock):
+        """Test that parsed molecules are reused between requests."""
+
+        file_path = "/storage/hash1_file1.pdb"
+        molecules_mock = Mock()
+        molecules_mock.info.return_value.to_dict.return_value = {"total_atoms": 10}
+        chargefw2_mock.molecules.return_value = molecules_mock
+        service.molecules_cache = MoleculesCache(Mock(), max_size_bytes=1024 * 1024)
+
+        first = await service.read_molecules(file_path, True, False, True)
+        second = await service.read_molecules(file_path, True, False, True)
+        await service.read_molecules(file_path, True, False, False)
+
+        assert first is second is molecules_mock
+        assert chargefw2_mock.molecules.call_count == 2
+        assert service.molecules_cache.hits == 1
+        assert service.molecules_cache.get(("hash1", True, False, True)) is molecules_mock
+
     @pytest.mark.asyncio
     async def test_get_suitable_methods(self, service):
         """Test getting suitable methods."""
@@ -190,7 +275,7 @@ class TestChargeFW2Service:
         advanced_settings = AdvancedSettingsDto(permissive_types=True)
         mock_calculation_set = Mock()
         mock_calculation_set.advanced_settings = advanced_settings
-        calculation_storage_mock.get_calculation_set.return_value = mock_calculation_set
+        calculation_storage_mock.get_calculation_set_async.return_value = mock_calculation_set
 
         # _find_suitable_methods mocks
         mock_suitable_methods = SuitableMethods(
@@ -201,44 +286,83 @@ class TestChargeFW2Service:
         result = await service.get_computation_suitable_methods(computation_id, user_id)
 
         assert result == mock_suitable_methods
-        calculation_storage_mock.get_calculation_set.assert_called_once_with(computation_id)
+        calculation_storage_mock.get_calculation_set_async.assert_called_once_with(computation_id)
         service._find_suitable_methods.assert_called_once()
         service.logger.info.assert_called_once_with(
             f"Getting suitable methods for computation '{computation_id}'"
         )
 
     @pytest.mark.asyncio
-    async def test_find_suitable_methods(self, service):
+    async def test_find_suitable_methods(self, service, chargefw2_mock, calculation_storage_mock):
         """Test finding suitable methods."""
 
         file_hashes = ["hash1", "hash2"]
         permissive_types = True
         user_id = "user123"
 
-        molecules_mock = Mock()
-        service.read_molecules = AsyncMock(return_value=molecules_mock)
-
         method1 = get_method("method1")
         method2 = get_method("method2")
         param1 = get_parameters("param1")
         param2 = get_parameters("param2")
 
-        service._run_in_executor = AsyncMock(
-            side_effect=[
-                [(method1, [param1]), (method2, [param2])],  # For first file
-                [(method1, [param1])],  # For second file
-            ]
-        )
+        chargefw2_mock.get_available_methods.return_value = [method1, method2]
+        chargefw2_mock.get_available_parameters.side_effect = lambda method: {
+            "method1": [param1],
+            "method2": [param2],
+        }[method]
+
+        calculation_storage_mock.get_files_without_suitable_methods.return_value = ["hash2"]
+        calculation_storage_mock.get_common_suitable_methods.return_value = [("method1", "param1")]
+
+        service.read_molecules = AsyncMock(return_value=Mock())
+        service._run_in_executor = AsyncMock(return_value=[(method1, [param1])])
 
         result = await service._find_suitable_methods(file_hashes, permissive_types, user_id)
 
-        assert len(result.methods) == 1
-        assert method1 in result.methods
-        assert len(result.parameters["method1"]) == 1
-        assert result.parameters["method1"][0] == param1
+        assert result.methods == [method1]
+        assert result.parameters == {"method1": [param1]}
+
+        # only the file without stored suitable methods is parsed
+        service.read_molecules.assert_called_once_with(
+            "/storage/hash2_file2.pdb", True, False, permissive_types
+        )
+        calculation_storage_mock.store_suitable_methods.assert_called_once_with(
+            "hash2", permissive_types, [(method1, [param1])]
+        )
+        calculation_storage_mock.get_common_suitable_methods.assert_called_once_with(
+            file_hashes, permissive_types
+        )
+
+    @pytest.mark.asyncio
+    async def test_find_suitable_methods_stored(
+        self, service, chargefw2_mock, calculation_storage_mock
+    ):
+        """Test that no file is parsed when suitable methods are stored for all files."""
+
+        method1 = get_method("method1")
+        chargefw2_mock.get_available_methods.return_value = [method1]
+        calculation_storage_mock.get_files_without_suitable_methods.return_value = []
+        calculation_storage_mock.get_common_suitable_methods.return_value = [("method1", None)]
+        service.read_molecules = AsyncMock()
+
+        result = await service._find_suitable_methods(["hash1", "hash2"], True, "user123")
+
+        assert result.methods == [method1]
+        assert result.parameters == {}
+        service.read_molecules.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_find_suitable_methods_file_not_found(self, service, calculation_storage_mock):
+        """Test that no methods are suitable when one of the files does not exist."""
+
+        result = await service._find_suitable_methods(["hash1", "hash3"], True, "user123")
+
+        assert result.methods == []
+        assert result.parameters == {}
+        calculation_storage_mock.get_common_suitable_methods.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_calculate_charges(self, service):
+    async def test_calculate_charges(self, service, io_mock):
         """Test calculating charges."""
 
         computation_id = "comp123"
@@ -249,25 +373,397 @@ class TestChargeFW2Service:
         file_hashes = ["hash1", "hash2"]
         data = {config: file_hashes}
 
-        result_dto = CalculationResultDto(
+        async def calculate_file_charges(
+            user_id, computation_id, settings, config, file_hash, stored_name, on_file_done
+        ):
+            return CalculationDto(
+                file=stored_name.split("_")[1], file_hash=file_hash, charges={}, config=config
+            )
+
+        service._calculate_file_charges = AsyncMock(side_effect=calculate_file_charges)
+
+        result = await service.calculate_charges(computation_id, settings, data, user_id)
+
+        assert result == [
+            CalculationResultDto(
+                config=config,
+                calculations=[
+                    CalculationDto(file="file1.pdb", file_hash="hash1", charges={}, config=config),
+                    CalculationDto(file="file2.pdb", file_hash="hash2", charges={}, config=config),
+                ],
+            )
+        ]
+        service._calculate_file_charges.assert_any_call(
+            user_id, computation_id, settings, config, "hash1", "hash1_file1.pdb", None
+        )
+        io_mock.get_filepaths.assert_called_once_with(["hash1", "hash2"], user_id)
+        service.io.store_configs.assert_called_once_with(computation_id, [config], user_id)
+
+    @pytest.mark.asyncio
+    async def test_calculate_charges_grouped_by_file(self, service, io_mock):
+        """Test that duplicate calculations are calculated once and missing files are skipped."""
+
+        settings = AdvancedSettingsDto()
+        config1 = CalculationConfigDto(method="method1", parameters="param1")
+        config2 = CalculationConfigDto(method="method2", parameters=None)
+        data = {
+            config1: ["hash1", "hash3", "hash1"],
+            config2: ["hash2", "hash1"],
+        }
+        # equal configs are the same key
+        data[CalculationConfigDto(method="method1", parameters="param1")].append("hash2")
+
+        async def calculate_file_charges(
+            user_id, computation_id, settings, config, file_hash, stored_name, on_file_done
+        ):
+            return CalculationDto(file="file", file_hash=file_hash, charges={}, config=config)
+
+        service._calculate_file_charges = AsyncMock(side_effect=calculate_file_charges)
+
+        result = await service.calculate_charges("comp123", settings, data, None)
+
+        tasks = sorted(
+            (call[0][4], call[0][3].method)
+            for call in service._calculate_file_charges.call_args_list
+        )
+        assert tasks == [
+            ("hash1", "method1"),
+            ("hash1", "method2"),
+            ("hash2", "method1"),
+            ("hash2", "method2"),
+        ]
+        assert [result.config for result in result] == [config1, config2]
+        assert [len(result.calculations) for result in result] == [2, 2]
+        io_mock.get_filepaths.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_calculate_file_charges_sharded(self, service, chargefw2_mock, io_mock, tmp_path):
+        """Test that large SDF files are split into shards and their charges merged."""
+
+        sdf = "".join(f"mol{i}\nM  END\n$$$$\n" for i in range(4))
+        (tmp_path / "hash1_file1.sdf").write_text(sdf)
+        io_mock.get_file_storage_path = Mock(return_value=str(tmp_path))
+        io_mock.listdir = Mock(return_value=["hash1_file1.sdf"])
+        service.shard_min_size_bytes = 1
+
+        chargefw2_mock.molecules = Mock(side_effect=lambda path, *_: path)
+        chargefw2_mock.calculate_charges = Mock(
+            side_effect=lambda path, *_: {
+                line: [0.0] for line in Path(path).read_text().splitlines() if line.startswith("mol")
+            }
+        )
+
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        result = await service._calculate_file_charges(
+            None, "comp123", AdvancedSettingsDto(), config, "hash1", "hash1_file1.sdf"
+        )
+
+        assert chargefw2_mock.calculate_charges.call_count == 2
+        assert list(result.charges.keys()) == ["mol0", "mol1", "mol2", "mol3"]
+        assert result.file == "file1.sdf"
+
+    @pytest.mark.asyncio
+    async def test_calculate_file_charges_sharded_cached(
+        self, service, chargefw2_mock, io_mock, tmp_path
+    ):
+        """Test that molecules of shards are not cached as molecules of the whole file."""
+
+        sdf = "".join(f"mol{i}\nM  END\n$$$$\n" for i in range(4))
+        (tmp_path / "hash1_file1.sdf").write_text(sdf)
+        io_mock.get_file_storage_path = Mock(return_value=str(tmp_path))
+        io_mock.listdir = Mock(return_value=["hash1_file1.sdf"])
+        service.shard_min_size_bytes = 1
+        service.molecules_cache = MoleculesCache(Mock(), max_size_bytes=1024 * 1024)
+
+        molecules_mock = Mock()
+        molecules_mock.info.return_value.to_dict.return_value = {"total_atoms": 4}
+        chargefw2_mock.molecules = Mock(
+            side_effect=lambda path, *_: path if "shard_" in path else molecules_mock
+        )
+        chargefw2_mock.calculate_charges = Mock(
+            side_effect=lambda path, *_: {
+                line: [0.0] for line in Path(path).read_text().splitlines() if line.startswith("mol")
+            }
+        )
+
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        await service._calculate_file_charges(
+            None, "comp123", AdvancedSettingsDto(), config, "hash1", "hash1_file1.sdf"
+        )
+        molecules = await service.read_molecules(str(tmp_path / "hash1_file1.sdf"))
+
+        # molecules of the whole file are loaded, not cached molecules of a shard
+        assert molecules is molecules_mock
+        assert all(c.args == ("hash1_file1.sdf",) for c in io_mock.parse_filename.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_calculate_file_charges_sharded_name_collision(
+        self, service, chargefw2_mock, io_mock, tmp_path
+    ):
+        """Test that the whole file is calculated if molecules of shards have the same name."""
+
+        sdf = "".join(f"mol{i % 2}\nM  END\n$$$$\n" for i in range(4))
+        (tmp_path / "hash1_file1.sdf").write_text(sdf)
+        io_mock.get_file_storage_path = Mock(return_value=str(tmp_path))
+        io_mock.listdir = Mock(return_value=["hash1_file1.sdf"])
+        service.shard_min_size_bytes = 1
+
+        chargefw2_mock.molecules = Mock(side_effect=lambda path, *_: path)
+        chargefw2_mock.calculate_charges = Mock(
+            side_effect=lambda path, *_: {
+                line: [0.0] for line in Path(path).read_text().splitlines() if line.startswith("mol")
+            }
+        )
+
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        result = await service._calculate_file_charges(
+            None, "comp123", AdvancedSettingsDto(), config, "hash1", "hash1_file1.sdf"
+        )
+
+        assert chargefw2_mock.calculate_charges.call_count == 3
+        whole_file = str(tmp_path / "hash1_file1.sdf")
+        assert chargefw2_mock.calculate_charges.call_args.args[0] == whole_file
+        assert list(result.charges.keys()) == ["mol0", "mol1"]
+        service.logger.warn.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_run_computation(self, service, calculation_storage_mock, mmcif_service_mock):
+        """Test running the whole computation pipeline."""
+
+        computation_id = "comp123"
+        user_id = "user123"
+        settings = AdvancedSettingsDto()
+
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        cached_config = CalculationConfigDto(method="method2", parameters="param2")
+        cached_calculation = CalculationDto(
+            file="file2.pdb", file_hash="hash2", charges={}, config=cached_config
+        )
+        calculated = CalculationResultDto(
             config=config,
             calculations=[
-                CalculationDto(file="file1.pdb", file_hash="hash1", charges={}, config=config),
-                CalculationDto(file="file2.pdb", file_hash="hash2", charges={}, config=config),
+                CalculationDto(file="file1.pdb", file_hash="hash1", charges={}, config=config)
             ],
         )
 
-        service._calculate_charges = AsyncMock(return_value=result_dto)
+        service.calculate_charges = AsyncMock(return_value=[calculated])
+        service.save_charges = AsyncMock()
+        service.release_molecules = Mock()
+        on_file_done = AsyncMock()
+
+        result = await service.run_computation(
+            computation_id,
+            settings,
+            {config: ["hash1"]},
+            {cached_config: [cached_calculation]},
+            user_id,
+            on_file_done,
+        )
 
-        result = await service.calculate_charges(computation_id, settings, data, user_id)
+        assert len(result) == 2
+        assert result[0] == calculated
+        assert result[1].config.model_dump() == cached_config.model_dump()
+        assert result[1].calculations[0].model_dump() == cached_calculation.model_dump()
+        service.calculate_charges.assert_called_once_with(
+            computation_id, settings, {config: ["hash1"]}, user_id, on_file_done
+        )
+        calculation_storage_mock.store_calculation_results.assert_called_once_with(
+            computation_id, settings, result, user_id
+        )
+        service.save_charges.assert_called_once_with(settings, computation_id, result, user_id)
+        mmcif_service_mock.write_to_mmcif.assert_called_once_with(user_id, computation_id, result)
+        service.io.free_guest_compute_space.assert_not_called()
+        service.release_molecules.assert_called_once_with(computation_id)
+
+    @pytest.mark.asyncio
+    async def test_run_computation_merges_cached(self, service):
+        """Test that cached calculations are merged into results of an equal config."""
+
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        cached_calculation = CalculationDto(
+            file="file2.pdb",
+            file_hash="hash2",
+            charges={},
+            config=CalculationConfigDto(method="method1", parameters="param1"),
+        )
+        calculated = CalculationResultDto(
+            config=CalculationConfigDto(method="method1", parameters="param1"),
+            calculations=[
+                CalculationDto(file="file1.pdb", file_hash="hash1", charges={}, config=config)
+            ],
+        )
+
+        service.calculate_charges = AsyncMock(return_value=[calculated])
+        service.save_charges = AsyncMock()
+        service.release_molecules = Mock()
+
+        result = await service.run_computation(
+            "comp123",
+            AdvancedSettingsDto(),
+            {config: ["hash1"]},
+            {CalculationConfigDto(method="method1", parameters="param1"): [cached_calculation]},
+            "user123",
+        )
+
+        assert len(result) == 1
+        assert [c.file_hash for c in result[0].calculations] == ["hash1", "hash2"]
+
+    @pytest.mark.asyncio
+    async def test_run_computation_error(self, service, calculation_storage_mock):
+        """Test that molecules are released when computation fails."""
+
+        service.calculate_charges = AsyncMock(side_effect=Exception("Error"))
+        service.release_molecules = Mock()
+
+        with pytest.raises(Exception):
+            await service.run_computation("comp123", AdvancedSettingsDto(), {}, {}, None)
 
-        assert result == [result_dto]
-        service._calculate_charges.assert_called_once_with(
-            user_id, computation_id, settings, config, file_hashes
+        calculation_storage_mock.store_calculation_results.assert_not_called()
+        service.release_molecules.assert_called_once_with("comp123")
+
+    @pytest.mark.asyncio
+    async def test_stream_computation(self, service, calculation_storage_mock, mmcif_service_mock):
+        """Test that calculations are streamed and each file is finalized once it is done."""
+
+        settings = AdvancedSettingsDto()
+        config1 = CalculationConfigDto(method="method1", parameters="param1")
+        config2 = CalculationConfigDto(method="method2", parameters="param2")
+        cached_calculation = CalculationDto(
+            file="file2.pdb", file_hash="hash2", charges={"mol2": [0.1]}, config=config2
         )
-        service.io.store_configs.assert_called_once_with(
-            computation_id, [result_dto.config], user_id
+
+        async def calculate_file_charges(
+            user_id, computation_id, settings, config, file_hash, stored_name
+        ):
+            return CalculationDto(
+                file=f"file{file_hash[-1]}.pdb", file_hash=file_hash, charges={}, config=config
+            )
+
+        service._calculate_file_charges = AsyncMock(side_effect=calculate_file_charges)
+        service.save_charges = AsyncMock()
+        service.release_molecules = Mock()
+
+        streamed = [
+            calculation
+            async for calculation in service.stream_computation(
+                "comp123",
+                settings,
+                {config1: ["hash1", "hash2"], config2: ["hash1"]},
+                {config2: [cached_calculation]},
+                None,
+            )
+        ]
+
+        assert streamed[0] == cached_calculation
+        assert sorted((c.file_hash, c.config.method) for c in streamed) == [
+            ("hash1", "method1"),
+            ("hash1", "method2"),
+            ("hash2", "method1"),
+            ("hash2", "method2"),
+        ]
+
+        # one output write per file, each with all configs
+        assert mmcif_service_mock.write_to_mmcif.call_count == 2
+        for call in mmcif_service_mock.write_to_mmcif.call_args_list:
+            results = call[0][2]
+            assert [result.config.method for result in results] == ["method1", "method2"]
+            assert len({c.file_hash for r in results for c in r.calculations}) == 1
+
+        assert calculation_storage_mock.store_calculation_results.call_count == 2
+        assert service.save_charges.call_count == 2
+        service.io.store_configs.assert_called_once_with("comp123", [config1, config2], None)
+        service.io.free_guest_compute_space.assert_called_once()
+        service.release_molecules.assert_called_once_with("comp123")
+
+    @pytest.mark.asyncio
+    async def test_stream_computation_error(self, service, calculation_storage_mock):
+        """Test that failed calculation stops the stream."""
+
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        service._calculate_file_charges = AsyncMock(side_effect=Exception("Error"))
+        service.release_molecules = Mock()
+
+        with pytest.raises(Exception):
+            async for _ in service.stream_computation(
+                "comp123", AdvancedSettingsDto(), {config: ["hash1"]}, {}, None
+            ):
+                pass
+
+        calculation_storage_mock.store_calculation_results.assert_not_called()
+        service.release_molecules.assert_called_once_with("comp123")
+
+    @pytest.mark.asyncio
+    async def test_cancel_run_computation(self, service, calculation_storage_mock):
+        """Test cancelling a running computation."""
+
+        started = asyncio.Event()
+
+        async def calculate_charges(*_):
+            started.set()
+            await asyncio.sleep(10)
+
+        service.calculate_charges = AsyncMock(side_effect=calculate_charges)
+        service.release_molecules = Mock()
+
+        computation = asyncio.ensure_future(
+            service.run_computation("comp123", AdvancedSettingsDto(), {}, {}, "user1")
         )
+        await started.wait()
+
+        assert not service.cancel("comp123", "user2")
+        assert service.cancel("comp123", "user1")
+
+        with pytest.raises(asyncio.CancelledError):
+            await computation
+
+        calculation_storage_mock.store_calculation_results.assert_not_called()
+        service.release_molecules.assert_called_once_with("comp123")
+        assert "comp123" not in service.computation_tasks
+        assert not service.cancel("comp123", "user1")
+
+    @pytest.mark.asyncio
+    async def test_cancel_run_in_executor(self, service):
+        """Test that cancelled executor call keeps its slot until the native call returns."""
+
+        release = threading.Event()
+        task = asyncio.ensure_future(service._run_in_executor(release.wait))
+        await asyncio.sleep(0.01)
+
+        task.cancel()
+        await asyncio.sleep(0.01)
+        assert not task.done()
+
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    @pytest.mark.asyncio
+    async def test_run_with_molecules(self, service):
+        """Test that calls on the same molecules are serialized and calls on others are not."""
+
+        molecules, other_molecules = Mock(), Mock()
+        release = threading.Event()
+        running = []
+
+        def call(name):
+            running.append(name)
+            release.wait()
+
+        first = asyncio.ensure_future(service._run_with_molecules(molecules, call, "first"))
+        same = asyncio.ensure_future(service._run_with_molecules(molecules, call, "same"))
+        other = asyncio.ensure_future(service._run_with_molecules(other_molecules, call, "other"))
+        await asyncio.sleep(0.05)
+
+        try:
+            # the waiting call does not block the second executor slot
+            assert sorted(running) == ["first", "other"]
+        finally:
+            release.set()
+
+        await asyncio.gather(first, same, other)
+
+        assert sorted(running) == ["first", "other", "same"]
+        assert service.molecules_locks == {}
 
     @pytest.mark.asyncio
     async def test_save_charges(self, service):
@@ -298,6 +794,140 @@ class TestChargeFW2Service:
         assert service._run_in_executor.call_count == 2
         service.io.create_dir.assert_called_once()
 
+    def test_shutdown(self, process_service):
+        """Test that shutdown stops the worker processes and cancels pending calls."""
+
+        process_executor = Mock()
+        process_service.process_executor = process_executor
+        process_service.executor = Mock()
+
+        process_service.shutdown()
+
+        process_executor.shutdown.assert_called_once_with(cancel_futures=True)
+        process_service.executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        assert process_service.process_executor is None
+
+    def test_shutdown_without_process_executor(self, service):
+        """Test that shutdown works when no worker process was started."""
+
+        service.shutdown()
+
+        assert service.executor._shutdown
+
+    @pytest.mark.asyncio
+    async def test_calculate_charges_process_executor(self, process_service):
+        """Test that charges are calculated in worker processes when configured."""
+
+        settings = AdvancedSettingsDto()
+        config = CalculationConfigDto(method="method1", parameters="param1")
+
+        process_service.read_molecules = AsyncMock()
+        process_service._run_in_process = AsyncMock(
+            return_value=process_pool.pack_charges({"mol1": [0.1, -0.1]})
+        )
+
+        result = await process_service.calculate_charges(
+            "comp123", settings, {config: ["hash1"]}, "user123"
+        )
+
+        assert len(result[0].calculations) == 1
+        assert result[0].calculations[0].charges == {"mol1": [0.1, -0.1]}
+        process_service.read_molecules.assert_not_called()
+        process_service._run_in_process.assert_called_once_with(
+            process_pool.calculate_charges,
+            "/storage/hash1_file1.pdb",
+            settings.read_hetatm,
+            settings.ignore_water,
+            settings.permissive_types,
+            "method1",
+            "param1",
+            "/charges",
+        )
+
+    @pytest.mark.asyncio
+    async def test_save_charges_process_executor(self, process_service):
+        """Test that charges are saved in worker processes when configured."""
+
+        settings = AdvancedSettingsDto()
+        config = CalculationConfigDto(method="method1", parameters="param1")
+        results = [
+            CalculationResultDto(
+                config=config,
+                calculations=[
+                    CalculationDto(
+                        file="file1.pdb", file_hash="hash1", charges={"mol1": [0.5]}, config=config
+                    ),
+                ],
+            )
+        ]
+
+        process_service.read_molecules = AsyncMock()
+        process_service._run_in_process = AsyncMock()
+
+        await process_service.save_charges(settings, "comp123", results, "user123")
+
+        process_service.read_molecules.assert_not_called()
+        process_service._run_in_process.assert_called_once()
+        args = process_service._run_in_process.call_args[0]
+        assert args[0] == process_pool.save_charges
+        [(charges, method, parameters)] = args[5]
+        assert process_pool.unpack_charges(charges) == {"mol1": [0.5]}
+        assert (method, parameters) == ("method1", "param1")
+
+    @pytest.mark.asyncio
+    async def test_save_charges_process_executor_file_parsed_once(self, process_service):
+        """Test that charges of all configs of a file are saved by a single worker call."""
+
+        settings = AdvancedSettingsDto()
+        configs = [
+            CalculationConfigDto(method="method1", parameters="param1"),
+            CalculationConfigDto(method="method2", parameters=None),
+        ]
+        results = [
+            CalculationResultDto(
+                config=config,
+                calculations=[
+                    CalculationDto(
+                        file="file1.pdb", file_hash="hash1", charges={"mol1": [0.5]}, config=config
+                    ),
+                    CalculationDto(
+                        file="file2.pdb", file_hash="hash2", charges={"mol2": [0.1]}, config=config
+                    ),
+                ],
+            )
+            for config in configs
+        ]
+
+        process_service._run_in_process = AsyncMock()
+
+        await process_service.save_charges(settings, "comp123", results, "user123")
+
+        assert process_service._run_in_process.call_count == 2
+        [file1_args, file2_args] = [
+            call.args for call in process_service._run_in_process.call_args_list
+        ]
+        assert file1_args[1] == "/storage/hash1_file1.pdb"
+        assert [(method, parameters) for _, method, parameters in file1_args[5]] == [
+            ("method1", "param1"),
+            ("method2", None),
+        ]
+        assert file2_args[1] == "/storage/hash2_file2.pdb"
+
+    def test_invalid_executor_type(
+        self, chargefw2_mock, logger_mock, io_mock, mmcif_service_mock, calculation_storage_mock
+    ):
+        """Test that an unknown executor type is rejected when the service is created."""
+
+        with pytest.raises(ValueError):
+            ChargeFW2Service(
+                chargefw2=chargefw2_mock,
+                logger=logger_mock,
+                io=io_mock,
+                mmcif_service=mmcif_service_mock,
+                calculation_storage=calculation_storage_mock,
+                executor_type="processes",
+            )
+
     @pytest.mark.asyncio
     async def test_info(self, service):
         """Test getting info."""
@@ -325,6 +955,46 @@ class TestChargeFW2Service:
         molecules_mock.info.assert_called_once()
         service.logger.info.assert_called_once_with(f"Getting info for file {file_path}.")
 
+    @pytest.mark.asyncio
+    async def test_analyze_files(self, service, chargefw2_mock):
+        """Test that files are analyzed in parallel with bounded concurrency."""
+
+        running = 0
+        max_running = 0
+
+        async def read_molecules(path, *_):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+            if path == "/storage/invalid.sdf":
+                raise RuntimeError("Unable to load molecules")
+
+            molecules = Mock(path=path)
+            molecules.info.return_value.to_dict.return_value = {"total_molecules": len(path)}
+            return molecules
+
+        service.read_molecules = AsyncMock(side_effect=read_molecules)
+        chargefw2_mock.get_suitable_methods = Mock(
+            side_effect=lambda molecules: [f"methods of {molecules.path}"]
+        )
+        paths = ["/storage/a.pdb", "/storage/invalid.sdf", "/storage/b.pdb", "/storage/c.pdb"]
+
+        results = await service.analyze_files(paths)
+
+        assert [
+            result.info.total_molecules for result in results if not isinstance(result, Exception)
+        ] == [14, 14, 14]
+        assert isinstance(results[1], RuntimeError)
+        assert results[2].suitable_methods == ["methods of /storage/b.pdb"]
+        # each file is parsed once, with the settings used for suitable methods
+        assert service.read_molecules.call_count == 4
+        service.read_molecules.assert_called_with("/storage/c.pdb", True, False, True)
+        # service fixture has 2 workers
+        assert max_running == 2
+
     def test_get_calculation_molecules(self, service, io_mock):
         """Test getting calculation molecules."""
 
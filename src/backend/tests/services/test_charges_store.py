@@ -0,0 +1,70 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.charges_store import ChargesStore
+from models.calculation import CalculationConfigDto
+from models.setup import AdvancedSettingsDto
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChargesStore(logger=Mock(), root_dir=str(tmp_path))
+
+
+@pytest.fixture
+def config():
+    return CalculationConfigDto(method="method1", parameters="params1")
+
+
+@pytest.fixture
+def charges():
+    return {"molecule1": [0.1, -0.2], "molecule2": [0.3]}
+
+
+class TestChargesStore:
+    def test_enabled(self, store):
+        assert store.enabled
+        assert not ChargesStore(logger=Mock()).enabled
+        assert not ChargesStore(logger=Mock(), root_dir="").enabled
+
+    def test_write_read(self, store, config, charges, tmp_path):
+        path, size = store.write("hash1", config, AdvancedSettingsDto(), charges)
+
+        assert not os.path.isabs(path)
+        assert os.path.getsize(tmp_path / path) == size
+        assert dict(store.read(path)) == charges
+
+    def test_write_once(self, store, config, charges, tmp_path):
+        path, _ = store.write("hash1", config, AdvancedSettingsDto(), charges)
+        modified = os.path.getmtime(tmp_path / path)
+
+        assert store.write("hash1", config, AdvancedSettingsDto(), charges)[0] == path
+        assert os.path.getmtime(tmp_path / path) == modified
+        assert [name for name in os.listdir(tmp_path / os.path.dirname(path))] == [
+            os.path.basename(path)
+        ]
+
+    def test_restore(self, store, config, charges, tmp_path):
+        path, _ = store.write("hash1", config, AdvancedSettingsDto(), charges)
+
+        assert not store.restore(path, {"other": [1.0]})
+        assert dict(store.read(path)) == charges
+
+        os.remove(tmp_path / path)
+
+        assert store.restore(path, charges)
+        assert dict(store.read(path)) == charges
+
+    def test_path_depends_on_key(self, store, config):
+        settings = AdvancedSettingsDto()
+        path = store.get_path("hash1", config, settings)
+
+        assert store.get_path("hash2", config, settings) != path
+        assert store.get_path("hash1", CalculationConfigDto(method="method1"), settings) != path
+        assert store.get_path("hash1", config, AdvancedSettingsDto(read_hetatm=False)) != path
+
+    def test_read_missing(self, store):
+        with pytest.raises(FileNotFoundError):
+            store.read("aa/missing.charges")
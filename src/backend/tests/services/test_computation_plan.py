@@ -0,0 +1,44 @@
+from models.calculation import CalculationConfigDto
+from models.setup import AdvancedSettingsDto
+from services.computation_plan import plan_calculations, plan_computation
+
+
+class TestComputationPlan:
+    def test_plan_computation(self):
+        """Test that repeated files and equal configs are planned once."""
+
+        config1 = CalculationConfigDto(method="eem", parameters="p1")
+        config2 = CalculationConfigDto(method="veem", parameters=None)
+
+        plan = plan_computation(
+            AdvancedSettingsDto(),
+            ["hash2", "hash1", "hash2"],
+            [config1, config2, CalculationConfigDto(method="eem", parameters="p1")],
+        )
+
+        assert plan.file_hashes == ["hash2", "hash1"]
+        assert plan.configs == [config1, config2]
+        assert plan.files == {"hash2": [config1, config2], "hash1": [config1, config2]}
+        assert plan.task_count == 4
+
+    def test_plan_calculations(self):
+        """Test that calculations of configs are grouped by file."""
+
+        config1 = CalculationConfigDto(method="eem", parameters="p1")
+        config2 = CalculationConfigDto(method="veem", parameters=None)
+
+        plan = plan_calculations(
+            AdvancedSettingsDto(),
+            {config1: ["hash1", "hash1"], config2: ["hash2", "hash1"]},
+        )
+
+        assert plan.files == {"hash1": [config1, config2], "hash2": [config2]}
+        assert plan.task_count == 3
+
+    def test_empty_plan(self):
+        """Test planning a computation without files."""
+
+        plan = plan_computation(AdvancedSettingsDto(), [], [CalculationConfigDto(method="eem")])
+
+        assert plan.task_count == 0
+        assert plan.configs == []
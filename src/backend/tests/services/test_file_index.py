@@ -0,0 +1,74 @@
+import os
+
+import pytest
+from unittest.mock import Mock
+
+from app.integrations.io.io import IOLocal
+from app.services.file_index import FileIndex
+
+HASH1 = "a" * 64
+HASH2 = "b" * 64
+
+
+@pytest.fixture
+def files_dir(tmp_path):
+    files_dir = tmp_path / "user" / "files"
+    files_dir.mkdir(parents=True)
+    (files_dir / f"{HASH1}_file1.pdb").write_text("file1")
+    (files_dir / f"{HASH2}_file2.sdf").write_text("file2")
+    return str(files_dir)
+
+
+@pytest.fixture
+def file_index():
+    return FileIndex(IOLocal(), Mock())
+
+
+class TestFileIndex:
+    def test_find_builds_index(self, file_index, files_dir):
+        """Test that index of existing files is built on first lookup."""
+
+        assert file_index.find(files_dir, HASH1) == f"{HASH1}_file1.pdb"
+        assert file_index.find(files_dir, HASH2) == f"{HASH2}_file2.sdf"
+        assert file_index.find(files_dir, "c" * 64) is None
+        assert sorted(os.listdir(file_index.get_index_dir(files_dir))) == [HASH1, HASH2]
+
+    def test_add_remove(self, file_index, files_dir):
+        """Test adding and removing files."""
+
+        file_index.find(files_dir, HASH1)
+        new_hash = "c" * 64
+        open(os.path.join(files_dir, f"{new_hash}_file3.pdb"), "w").close()
+
+        file_index.add(files_dir, f"{new_hash}_file3.pdb")
+        assert file_index.find(files_dir, new_hash) == f"{new_hash}_file3.pdb"
+
+        file_index.remove(files_dir, new_hash)
+        assert file_index.find(files_dir, new_hash) is None
+
+    def test_remove_other_file(self, file_index, files_dir):
+        """Test that removing a file does not remove indexed file with the same hash."""
+
+        file_index.find(files_dir, HASH1)
+        file_index.remove(files_dir, HASH1, f"{HASH1}_other.pdb")
+
+        assert file_index.find(files_dir, HASH1) == f"{HASH1}_file1.pdb"
+
+    def test_find_removed_file(self, file_index, files_dir):
+        """Test that files removed outside of the index are not found."""
+
+        file_index.find(files_dir, HASH1)
+        os.remove(os.path.join(files_dir, f"{HASH1}_file1.pdb"))
+
+        assert file_index.find(files_dir, HASH1) is None
+
+    def test_rebuild(self, file_index, files_dir):
+        """Test that rebuild replaces the existing index."""
+
+        file_index.find(files_dir, HASH1)
+        os.remove(os.path.join(files_dir, f"{HASH2}_file2.sdf"))
+        open(os.path.join(files_dir, "not-a-hash_file.pdb"), "w").close()
+
+        assert file_index.rebuild(files_dir) == 1
+        assert os.listdir(file_index.get_index_dir(files_dir)) == [HASH1]
+        assert sorted(os.listdir(os.path.dirname(files_dir))) == ["files", "index"]
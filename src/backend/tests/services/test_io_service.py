@@ -101,6 +101,31 @@ class TestIOService:
             io_mock.rm.assert_called_once_with(filepath)
             logger_mock.info.assert_called_once()
 
+    def test_remove_file_invalidates_molecules_cache(self, io_mock, logger_mock, test_data):
+        """Test that removing a file invalidates its cached molecules."""
+        molecules_cache = Mock()
+        io_service = IOService(io_mock, logger_mock, molecules_cache)
+        io_mock.listdir.return_value = []
+        filepath = f"/test/path/{test_data['filename']}"
+        with patch.object(io_service, "get_filepath", return_value=filepath):
+            io_service.remove_file(test_data["file_hash"], test_data["user_id"])
+
+            molecules_cache.invalidate.assert_called_once_with(test_data["file_hash"])
+
+    def test_remove_file_same_hash_remains(self, io_mock, logger_mock, test_data):
+        """Test that removing a file keeps another stored file with the same hash."""
+        molecules_cache = Mock()
+        file_index = Mock()
+        io_service = IOService(io_mock, logger_mock, molecules_cache, file_index)
+        file_hash = test_data["file_hash"]
+        io_mock.listdir.return_value = [f"{file_hash}_other.pdb"]
+        with patch.object(io_service, "get_filepath", return_value=f"/files/{file_hash}_a.pdb"):
+            io_service.remove_file(file_hash, test_data["user_id"])
+
+        file_index.add.assert_called_once_with("/files", f"{file_hash}_other.pdb")
+        file_index.remove.assert_not_called()
+        molecules_cache.invalidate.assert_not_called()
+
     def test_remove_file_not_found(self, io_service, io_mock, test_data):
         """Test handling when file to remove is not found."""
         with patch.object(io_service, "get_filepath", return_value=None):
@@ -119,42 +144,120 @@ class TestIOService:
 
             logger_mock.error.assert_called_once()
 
-    def test_zip_charges(self, io_service, io_mock):
-        """Test creating an archive from directory."""
+    def test_get_charges_archive(self, io_service, io_mock):
+        """Test generating an archive of charges sorted by extension."""
         directory = "/test/directory"
-        archive_path = "/test/directory/archive"
-        expected_result = f"{archive_path}.zip"
+        file_hash = "a" * 64
 
         io_mock.listdir.return_value = [
-            "hash1_file1.pqr",
-            "hash1_file2.txt",
-            "hash1_file3.mol2",
-            "hash1_file4.cif",
+            f"{file_hash}_file1.pqr",
+            f"{file_hash}_file2.txt",
+            f"{file_hash}_file3.mol2",
+            f"{file_hash}_file4.cif",
+            "archive.zip",
+        ]
+        io_mock.file_size.return_value = 100
+        io_mock.last_modified.side_effect = [
+            datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2023, 1, 3, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2023, 1, 2, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc),
         ]
-        io_mock.zip.return_value = expected_result
+        io_mock.zip_stream.return_value = iter([b"archive"])
+
+        result = io_service.get_charges_archive(directory)
+
+        assert list(result.chunks) == [b"archive"]
+        assert result.path is None
+        assert result.last_modified == datetime.datetime(2023, 1, 3, tzinfo=datetime.timezone.utc)
+        assert len(result.fingerprint) == 32
+        io_mock.zip_stream.assert_called_once_with(
+            [
+                ("cif", None),
+                ("pqr", None),
+                ("txt", None),
+                ("mol2", None),
+                ("pqr/file1.pqr", f"{directory}/{file_hash}_file1.pqr"),
+                ("txt/file2.txt", f"{directory}/{file_hash}_file2.txt"),
+                ("mol2/file3.mol2", f"{directory}/{file_hash}_file3.mol2"),
+                (f"cif/{file_hash}_file4.cif", f"{directory}/{file_hash}_file4.cif"),
+            ]
+        )
+        io_mock.cp.assert_not_called()
+        io_mock.mkdir.assert_not_called()
 
-        with patch.object(io_service, "parse_filename", return_value=("hash", "filename")):
-            result = io_service.zip_charges(directory)
+    def test_get_charges_archive_fingerprint(self, io_service, io_mock):
+        """Test that fingerprint of an archive changes with the archived files."""
+        directory = "/test/directory"
+        io_mock.listdir.return_value = [f"{'a' * 64}_file1.pqr"]
+        io_mock.last_modified.return_value = datetime.datetime(
+            2023, 1, 1, tzinfo=datetime.timezone.utc
+        )
+        io_mock.file_size.return_value = 100
+
+        fingerprint = io_service.get_charges_archive(directory).fingerprint
+        assert io_service.get_charges_archive(directory).fingerprint == fingerprint
+
+        io_mock.file_size.return_value = 200
+        assert io_service.get_charges_archive(directory).fingerprint != fingerprint
+
+    def test_get_charges_archive_cached(self, io_mock, logger_mock):
+        """Test that cached archives are returned instead of generating them."""
+        archive_cache = Mock()
+        archive_cache.find.return_value = "/archives/archive.zip"
+        io_service = IOService(io_mock, logger_mock, archive_cache=archive_cache)
+        io_mock.listdir.return_value = []
+        io_mock.last_modified.return_value = datetime.datetime(
+            2023, 1, 1, tzinfo=datetime.timezone.utc
+        )
 
-            assert io_mock.mkdir.call_count == 5  # archive dir + 4 extension dirs
+        result = io_service.get_charges_archive("/test/directory")
+
+        assert result.path == "/archives/archive.zip"
+        assert result.chunks is None
+        archive_cache.find.assert_called_once_with("/test/directory", result.fingerprint)
+        archive_cache.store.assert_not_called()
+        io_mock.zip_stream.assert_not_called()
+
+    def test_get_charges_archive_not_cached(self, io_mock, logger_mock):
+        """Test that archives which are not cached are generated and stored."""
+        archive_cache = Mock()
+        archive_cache.find.return_value = None
+        archive_cache.store.return_value = iter([b"archive"])
+        io_service = IOService(io_mock, logger_mock, archive_cache=archive_cache)
+        io_mock.listdir.return_value = []
+        io_mock.last_modified.return_value = datetime.datetime(
+            2023, 1, 1, tzinfo=datetime.timezone.utc
+        )
 
-            assert io_mock.cp.call_count == len(io_mock.listdir.return_value)
+        result = io_service.get_charges_archive("/test/directory")
 
-            io_mock.zip.assert_called_once_with(archive_path, archive_path)
-            assert result == expected_result
+        assert result.path is None
+        assert list(result.chunks) == [b"archive"]
+        archive_cache.store.assert_called_once()
 
-    def test_zip_charges_exception(self, io_service, io_mock, logger_mock):
+    def test_get_charges_archive_exception(self, io_service, io_mock, logger_mock):
         """Test handling exceptions when creating an archive."""
         directory = "/test/directory"
-        io_mock.path_exists.return_value = False
 
-        io_mock.mkdir.side_effect = Exception("Failed to create directory")
+        io_mock.listdir.side_effect = Exception("Failed to list directory")
 
         with pytest.raises(Exception):
-            io_service.zip_charges(directory)
+            io_service.get_charges_archive(directory)
 
         logger_mock.error.assert_called_once()
 
+    def test_delete_computation_invalidates_archive(self, io_mock, logger_mock, test_data):
+        """Test that archives of deleted computations are removed from the cache."""
+        archive_cache = Mock()
+        io_service = IOService(io_mock, logger_mock, archive_cache=archive_cache)
+
+        io_service.delete_computation(test_data["computation_id"], test_data["user_id"])
+
+        archive_cache.invalidate.assert_called_once_with(
+            io_service.get_charges_path(test_data["computation_id"], test_data["user_id"])
+        )
+
     def test_listdir(self, io_service, io_mock):
         """Test listing directory contents."""
         directory = "/test/directory"
@@ -409,6 +512,66 @@ class TestIOService:
 
             logger_mock.error.assert_called_once()
 
+    def test_get_filepath_index(self, io_mock, logger_mock, test_data):
+        """Test that files are found using the file index without listing the storage."""
+        file_index = Mock()
+        file_index.find.return_value = test_data["filename"]
+        io_service = IOService(io_mock, logger_mock, file_index=file_index)
+
+        storage_path = "/test/files/path"
+        with patch.object(io_service, "get_file_storage_path", return_value=storage_path):
+            result = io_service.get_filepath(test_data["file_hash"], test_data["user_id"])
+
+        assert result == str(Path(storage_path) / test_data["filename"])
+        file_index.find.assert_called_once_with(storage_path, test_data["file_hash"])
+        io_mock.listdir.assert_not_called()
+
+    def test_get_filepaths(self, io_service, io_mock):
+        """Test getting paths of multiple files with a single directory listing."""
+        hash1, hash2, hash3 = "a" * 64, "b" * 64, "c" * 64
+
+        storage_path = "/test/files/path"
+        with patch.object(io_service, "get_file_storage_path", return_value=storage_path):
+            io_mock.listdir.return_value = [f"{hash1}_file1.pdb", f"{hash2}_file2.pdb"]
+
+            result = io_service.get_filepaths([hash1, hash3], "user")
+
+        assert result == {hash1: str(Path(storage_path) / f"{hash1}_file1.pdb")}
+        io_mock.listdir.assert_called_once_with(storage_path)
+
+    @pytest.mark.asyncio
+    async def test_store_upload_file_index(self, async_io_mock, logger_mock):
+        """Test that uploaded files are added to the file index."""
+        file_index = Mock()
+        io_service = IOService(async_io_mock, logger_mock, file_index=file_index)
+        file_hash = "a" * 64
+        async_io_mock.store_upload_file.return_value = (
+            f"/files/{file_hash}_file.pdb",
+            file_hash,
+            True,
+        )
+
+        result = await io_service.store_upload_file(Mock(), "/files")
+
+        assert result == (f"/files/{file_hash}_file.pdb", file_hash, True)
+        file_index.add.assert_called_once_with("/files", f"{file_hash}_file.pdb")
+
+    def test_remove_file_index(self, io_mock, logger_mock, test_data):
+        """Test that removed files are removed from the file index."""
+        file_index = Mock()
+        file_index.find.return_value = test_data["filename"]
+        io_mock.listdir.return_value = []
+        io_service = IOService(io_mock, logger_mock, file_index=file_index)
+
+        storage_path = "/test/files/path"
+        with patch.object(io_service, "get_file_storage_path", return_value=storage_path):
+            io_service.remove_file(test_data["file_hash"], test_data["user_id"])
+
+        io_mock.rm.assert_called_once_with(str(Path(storage_path) / test_data["filename"]))
+        file_index.remove.assert_called_once_with(
+            storage_path, test_data["file_hash"], test_data["filename"]
+        )
+
     def test_get_last_modification(self, io_service, io_mock, test_data):
         """Test getting last modification time."""
         file_hash = test_data["file_hash"]
@@ -649,6 +812,227 @@ class TestIOService:
             assert result_available == (file_quota + compute_quota) - used_space
             assert result_quota == file_quota + compute_quota
 
+    def test_get_quota_storage_usage(self, io_mock, logger_mock):
+        """Test that used space is read from usage counters instead of walking the storage."""
+        storage_usage = Mock()
+        storage_usage.get.return_value = (1000, 500)
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_service.user_quota = 5000
+
+        result = io_service.get_quota("test_user")
+
+        assert result == (1500, 3500, 5000)
+        storage_usage.get.assert_called_once_with("test_user")
+        io_mock.dir_size.assert_not_called()
+
+    def test_get_quota_storage_usage_untracked(self, io_mock, logger_mock):
+        """Test that storage without usage counters is measured once and tracked."""
+        storage_usage = Mock()
+        storage_usage.get.return_value = None
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_service.user_quota = 5000
+        io_mock.dir_size.side_effect = [1000, 500]
+
+        result = io_service.get_quota("test_user")
+
+        assert result == (1500, 3500, 5000)
+        storage_usage.set.assert_called_once_with("test_user", 1000, 500)
+
+    @pytest.mark.asyncio
+    async def test_store_upload_file_storage_usage(self, async_io_mock, logger_mock):
+        """Test that uploaded files are added to usage of the user."""
+        storage_usage = Mock()
+        io_service = IOService(async_io_mock, logger_mock, storage_usage=storage_usage)
+        file_hash = "a" * 64
+        async_io_mock.store_upload_file.return_value = (
+            f"/files/{file_hash}_file.pdb",
+            file_hash,
+            True,
+        )
+        async_io_mock.file_size = Mock(return_value=1000)
+
+        await io_service.store_upload_file(Mock(), "/files", "test_user")
+
+        storage_usage.add.assert_called_once_with("test_user", 1000, 0)
+
+    @pytest.mark.asyncio
+    async def test_store_upload_file_storage_usage_uploaded_again(
+        self, async_io_mock, logger_mock
+    ):
+        """Test that the same file uploaded again is not counted twice."""
+        storage_usage = Mock()
+        file_hash = "a" * 64
+        io_service = IOService(async_io_mock, logger_mock, storage_usage=storage_usage)
+        async_io_mock.store_upload_file.return_value = (
+            f"/files/{file_hash}_file.pdb",
+            file_hash,
+            False,
+        )
+
+        await io_service.store_upload_file(Mock(), "/files", "test_user")
+
+        storage_usage.add.assert_not_called()
+
+    def test_remove_file_storage_usage(self, io_mock, logger_mock, test_data):
+        """Test that removed files are subtracted from usage of the user."""
+        storage_usage = Mock()
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.file_size.return_value = 1000
+
+        with patch.object(io_service, "get_filepath", return_value="/files/file"):
+            io_service.remove_file(test_data["file_hash"], test_data["user_id"])
+
+        storage_usage.add.assert_called_once_with(test_data["user_id"], -1000, 0)
+
+    def test_remove_uploaded_file(self, io_mock, logger_mock, test_data):
+        """Test that only the uploaded path is removed and subtracted from usage of the user."""
+        storage_usage = Mock()
+        file_index = Mock()
+        io_service = IOService(
+            io_mock, logger_mock, file_index=file_index, storage_usage=storage_usage
+        )
+        file_hash = test_data["file_hash"]
+        io_mock.file_size.return_value = 1000
+        io_mock.listdir.return_value = []
+
+        io_service.remove_uploaded_file(f"/files/{file_hash}_a.pdb", test_data["user_id"])
+
+        io_mock.rm.assert_called_once_with(f"/files/{file_hash}_a.pdb")
+        storage_usage.add.assert_called_once_with(test_data["user_id"], -1000, 0)
+        file_index.remove.assert_called_once_with("/files", file_hash, f"{file_hash}_a.pdb")
+
+    def test_delete_computation_storage_usage(self, io_mock, logger_mock, test_data):
+        """Test that deleted computations are subtracted from usage of the user."""
+        storage_usage = Mock()
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.dir_size.return_value = 1000
+
+        io_service.delete_computation(test_data["computation_id"], test_data["user_id"])
+
+        storage_usage.add.assert_called_once_with(test_data["user_id"], 0, -1000)
+
+    def test_storage_usage_update_failure(self, io_mock, logger_mock, test_data):
+        """Test that failed usage update does not fail the operation."""
+        storage_usage = Mock()
+        storage_usage.add.side_effect = Exception("Database error")
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.dir_size.return_value = 1000
+
+        io_service.delete_computation(test_data["computation_id"], test_data["user_id"])
+
+        io_mock.rmdir.assert_called_once()
+        logger_mock.warn.assert_called_once()
+
+    def test_free_guest_file_space_storage_usage(self, io_mock, logger_mock):
+        """Test freeing guest file space based on usage counters."""
+        storage_usage = Mock()
+        storage_usage.get.return_value = (2000, 0)
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_service.guest_file_quota = 2500
+        path = "/test/guest/files"
+
+        with patch.object(io_service, "get_file_storage_path", return_value=path):
+            io_mock.listdir.return_value = ["file1.txt", "file2.txt"]
+            io_mock.last_modified.side_effect = [
+                datetime.datetime(2023, 1, 1),
+                datetime.datetime(2023, 1, 2),
+            ]
+            io_mock.file_size.return_value = 1000
+
+            io_service.free_guest_file_space(1000)
+
+        io_mock.dir_size.assert_not_called()
+        io_mock.rm.assert_called_once_with(str(Path(path) / "file1.txt"))
+        storage_usage.add.assert_called_once_with(None, -1000, 0)
+
+    def test_free_guest_compute_space_storage_usage(self, io_mock, logger_mock):
+        """Test freeing guest compute space based on usage counters."""
+        storage_usage = Mock()
+        storage_usage.get.return_value = (0, 3000)
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_service.guest_compute_quota = 2000
+        path = "/test/guest/computations"
+
+        with patch.object(io_service, "get_computations_path", return_value=path):
+            io_mock.listdir.return_value = ["comp1", "comp2"]
+            io_mock.last_modified.side_effect = [
+                datetime.datetime(2023, 1, 1),
+                datetime.datetime(2023, 1, 2),
+            ]
+            io_mock.dir_size.return_value = 1500
+
+            io_service.free_guest_compute_space()
+
+        io_mock.rmdir.assert_called_once_with(str(Path(path) / "comp1"))
+        io_mock.dir_size.assert_called_once_with(str(Path(path) / "comp1"))
+        storage_usage.add.assert_called_once_with(None, 0, -1500)
+
+    def test_track_computation_usage(self, io_mock, logger_mock, test_data):
+        """Test that files written to a computation are added to usage of the user."""
+        storage_usage = Mock()
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.dir_size.side_effect = [1000, 3000]
+
+        with io_service.track_computation_usage(test_data["computation_id"], test_data["user_id"]):
+            storage_usage.add.assert_not_called()
+
+        storage_usage.add.assert_called_once_with(test_data["user_id"], 0, 2000)
+
+    def test_track_computation_usage_exception(self, io_mock, logger_mock, test_data):
+        """Test that files written by a failed computation are counted too."""
+        storage_usage = Mock()
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.dir_size.side_effect = [1000, 1500]
+
+        with pytest.raises(ValueError):
+            with io_service.track_computation_usage(test_data["computation_id"], None):
+                raise ValueError("Computation failed")
+
+        storage_usage.add.assert_called_once_with(None, 0, 500)
+
+    def test_track_computation_usage_disabled(self, io_service, io_mock, test_data):
+        """Test that computations are not measured without usage counters."""
+        with io_service.track_computation_usage(test_data["computation_id"], None):
+            pass
+
+        io_mock.dir_size.assert_not_called()
+
+    def test_reconcile_usage(self, io_mock, logger_mock):
+        """Test that usage counters of all storages are replaced with measured usage."""
+        storage_usage = Mock()
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.listdir.return_value = ["user1", "user2"]
+        sizes = {
+            io_service.get_file_storage_path(None): 10,
+            io_service.get_computations_path(None): 20,
+            io_service.get_file_storage_path("user1"): 30,
+            io_service.get_computations_path("user1"): 40,
+            io_service.get_file_storage_path("user2"): 50,
+            io_service.get_computations_path("user2"): 60,
+        }
+        io_mock.dir_size.side_effect = lambda path: sizes[path]
+
+        io_service.reconcile_usage()
+
+        assert storage_usage.set.call_args_list == [
+            ((None, 10, 20),),
+            (("user1", 30, 40),),
+            (("user2", 50, 60),),
+        ]
+
+    def test_reconcile_usage_failure(self, io_mock, logger_mock):
+        """Test that failure of a single storage does not stop the reconciliation."""
+        storage_usage = Mock()
+        storage_usage.set.side_effect = [Exception("Database error"), None]
+        io_service = IOService(io_mock, logger_mock, storage_usage=storage_usage)
+        io_mock.listdir.return_value = ["user1"]
+        io_mock.dir_size.return_value = 10
+
+        io_service.reconcile_usage()
+
+        assert storage_usage.set.call_count == 2
+        logger_mock.error.assert_called_once()
+
     def test_environment_variables(self, io_service):
         """Test that environment variables are properly loaded."""
         assert isinstance(io_service.workdir, Path)
@@ -0,0 +1,329 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, Mock
+import pytest
+
+from app.services.jobs import JobService
+from models.calculation import CalculationConfigDto
+from models.setup import AdvancedSettingsDto
+from db.schemas.user import User  # noqa: F401
+from db.schemas.calculation import CalculationSet  # noqa: F401
+from db.schemas.job import Job, JobPriority
+
+
+@pytest.fixture
+def logger_mock():
+    return Mock()
+
+
+@pytest.fixture
+def chargefw2_mock():
+    mock = Mock()
+    mock.run_computation = AsyncMock(return_value=[])
+    return mock
+
+
+@pytest.fixture
+def calculation_storage_mock():
+    mock = Mock()
+    mock.filter_existing_calculations = Mock(return_value=({}, {}))
+    return mock
+
+
+@pytest.fixture
+def job_repository_mock():
+    mock = Mock()
+    mock.get = Mock(return_value=None)
+    mock.store = Mock(side_effect=lambda _, job: job)
+    return mock
+
+
+@pytest.fixture
+def session_manager_mock():
+    session = MagicMock()
+
+    context_manager = MagicMock()
+    context_manager.__enter__.return_value = session
+
+    session_manager = Mock()
+    session_manager.session.return_value = context_manager
+    return session_manager
+
+
+@pytest.fixture
+def service(
+    logger_mock, chargefw2_mock, calculation_storage_mock, job_repository_mock, session_manager_mock
+):
+    return JobService(
+        logger=logger_mock,
+        chargefw2=chargefw2_mock,
+        calculation_storage=calculation_storage_mock,
+        job_repository=job_repository_mock,
+        session_manager=session_manager_mock,
+        max_concurrent_jobs=1,
+        poll_interval=0.01,
+        heartbeat_interval=0.01,
+    )
+
+
+@pytest.fixture
+def config():
+    return CalculationConfigDto(method="method1", parameters="param1")
+
+
+def create_job(config: CalculationConfigDto, user_id: str | None = None, attempts: int = 1) -> Job:
+    return Job(
+        id="comp123",
+        user_id=user_id,
+        priority=JobPriority.GUEST if user_id is None else JobPriority.USER,
+        status="running",
+        payload={
+            "settings": AdvancedSettingsDto().model_dump(),
+            "file_hashes": ["hash1", "hash2"],
+            "configs": [config.model_dump()],
+        },
+        files=[
+            {"file_hash": "hash1", "total": 1, "completed": 0},
+            {"file_hash": "hash2", "total": 1, "completed": 0},
+        ],
+        attempts=attempts,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def get_updates(job_repository_mock) -> list[dict]:
+    return [call.kwargs for call in job_repository_mock.update.call_args_list]
+
+
+class TestJobService:
+    @pytest.mark.asyncio
+    async def test_enqueue(self, service, job_repository_mock, config):
+        """Test enqueuing a computation."""
+
+        settings = AdvancedSettingsDto(read_hetatm=False)
+
+        status = await service.enqueue("comp123", settings, ["hash1", "hash2"], [config], "user1")
+
+        job = job_repository_mock.store.call_args[0][1]
+        assert job.priority == JobPriority.USER
+        assert job.payload["settings"] == settings.model_dump()
+        assert job.payload["file_hashes"] == ["hash1", "hash2"]
+        assert status.status == "queued"
+        assert [(file.file_hash, file.total) for file in status.files] == [
+            ("hash1", 1),
+            ("hash2", 1),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_enqueue_guest(self, service, job_repository_mock, config):
+        """Test that guest jobs have lower priority."""
+
+        await service.enqueue("comp123", AdvancedSettingsDto(), ["hash1"], [config], None)
+
+        job = job_repository_mock.store.call_args[0][1]
+        assert job.priority == JobPriority.GUEST
+
+    @pytest.mark.asyncio
+    async def test_enqueue_again(self, service, job_repository_mock, config):
+        """Test that finished job of the same computation is queued again."""
+
+        job = create_job(config, user_id="user1")
+        job.status = "done"
+        job_repository_mock.get.return_value = job
+
+        status = await service.enqueue(
+            "comp123", AdvancedSettingsDto(), ["hash1"], [config], "user1"
+        )
+
+        job_repository_mock.store.assert_not_called()
+        update = job_repository_mock.update.call_args.kwargs
+        assert update["status"] == "queued"
+        assert update["attempts"] == 0
+        assert update["finished_at"] is None
+        assert update["payload"]["file_hashes"] == ["hash1"]
+        assert status.status == "queued"
+        assert [file.file_hash for file in status.files] == ["hash1"]
+
+    @pytest.mark.asyncio
+    async def test_enqueue_unfinished(self, service, job_repository_mock, config):
+        """Test that unfinished job of the same computation is not queued twice."""
+
+        job_repository_mock.get.return_value = create_job(config, user_id="user1")
+
+        status = await service.enqueue(
+            "comp123", AdvancedSettingsDto(), ["hash1"], [config], "user1"
+        )
+
+        job_repository_mock.store.assert_not_called()
+        job_repository_mock.update.assert_not_called()
+        assert status.status == "running"
+
+    @pytest.mark.asyncio
+    async def test_enqueue_other_user(self, service, job_repository_mock, config):
+        """Test that computation of another user can not be queued."""
+
+        job_repository_mock.get.return_value = create_job(config, user_id="user1")
+
+        with pytest.raises(ValueError):
+            await service.enqueue("comp123", AdvancedSettingsDto(), ["hash1"], [config], None)
+
+        job_repository_mock.update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_status(self, service, job_repository_mock, config):
+        """Test getting status of a job."""
+
+        job_repository_mock.get.return_value = create_job(config, user_id="user1")
+
+        status = await service.get_status("comp123", "user1")
+
+        assert status.status == "running"
+        assert len(status.files) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_status_other_user(self, service, job_repository_mock, config):
+        """Test that status of other users' jobs is not returned."""
+
+        job_repository_mock.get.return_value = create_job(config, user_id="user1")
+
+        assert await service.get_status("comp123", "user2") is None
+        assert await service.get_status("comp123", None) is None
+
+    @pytest.mark.asyncio
+    async def test_run(
+        self, service, chargefw2_mock, calculation_storage_mock, job_repository_mock, config
+    ):
+        """Test running a claimed job."""
+
+        calculation_storage_mock.filter_existing_calculations.return_value = (
+            {config: ["hash1"]},
+            {config: []},
+        )
+
+        async def run_computation(*args):
+            on_file_done = args[5]
+            await on_file_done("hash1")
+            return []
+
+        chargefw2_mock.run_computation = AsyncMock(side_effect=run_computation)
+
+        await service._run(create_job(config))
+
+        args = chargefw2_mock.run_computation.call_args[0]
+        assert args[:5] == ("comp123", AdvancedSettingsDto(), {config: ["hash1"]}, {config: []}, None)
+
+        updates = get_updates(job_repository_mock)
+        # hash2 is cached, so it is completed before the calculation starts
+        assert updates[0]["files"][1]["completed"] == 1
+        assert updates[1]["files"][0]["completed"] == 1
+        assert updates[-1]["status"] == "done"
+        assert updates[-1]["finished_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_run_failed(self, service, chargefw2_mock, job_repository_mock, config):
+        """Test that failed job is marked as failed."""
+
+        chargefw2_mock.run_computation = AsyncMock(side_effect=Exception("Error"))
+
+        await service._run(create_job(config))
+
+        updates = get_updates(job_repository_mock)
+        assert updates[-1]["status"] == "failed"
+        assert updates[-1]["error"] == "Error"
+
+    @pytest.mark.asyncio
+    async def test_run_too_many_attempts(
+        self, service, chargefw2_mock, job_repository_mock, config
+    ):
+        """Test that repeatedly interrupted job is not run again."""
+
+        await service._run(create_job(config, attempts=4))
+
+        chargefw2_mock.run_computation.assert_not_called()
+        assert get_updates(job_repository_mock)[-1]["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_run_heartbeat(self, service, chargefw2_mock, job_repository_mock, config):
+        """Test that heartbeat of a running job is updated."""
+
+        async def run_computation(*_):
+            await asyncio.sleep(0.05)
+
+        chargefw2_mock.run_computation = AsyncMock(side_effect=run_computation)
+
+        await service._run(create_job(config))
+
+        assert any("heartbeat_at" in update for update in get_updates(job_repository_mock))
+
+    @pytest.mark.asyncio
+    async def test_worker(self, service, chargefw2_mock, job_repository_mock, config):
+        """Test that workers claim and run jobs."""
+
+        jobs = [create_job(config)]
+        job_repository_mock.claim = Mock(side_effect=lambda *_: jobs.pop() if jobs else None)
+
+        service.start()
+        while chargefw2_mock.run_computation.call_count == 0:
+            await asyncio.sleep(0.01)
+        await service.shutdown()
+
+        chargefw2_mock.run_computation.assert_called_once()
+        assert service.workers == []
+
+    @pytest.mark.asyncio
+    async def test_cancel(self, service, job_repository_mock, chargefw2_mock, config):
+        """Test cancelling a queued job."""
+
+        job = create_job(config, user_id="user1")
+        job.status = "queued"
+        job_repository_mock.get.return_value = job
+
+        assert await service.cancel("comp123", "user1")
+
+        assert job_repository_mock.update.call_args.kwargs["status"] == "cancelled"
+        chargefw2_mock.cancel.assert_called_once_with("comp123", "user1")
+
+    @pytest.mark.asyncio
+    async def test_cancel_not_cancellable(self, service, job_repository_mock, config):
+        """Test that finished jobs and jobs of other users can not be cancelled."""
+
+        job = create_job(config, user_id="user1")
+        job_repository_mock.get.return_value = job
+
+        assert not await service.cancel("comp123", "user2")
+
+        job.status = "done"
+        assert not await service.cancel("comp123", "user1")
+        job_repository_mock.update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_run_cancelled(self, service, chargefw2_mock, job_repository_mock, config):
+        """Test that job cancelled from another process is stopped by its monitor."""
+
+        service.cancel_check_interval = 0.01
+        running = create_job(config)
+        cancelled = create_job(config)
+        cancelled.status = "cancelled"
+        job_repository_mock.get.return_value = cancelled
+
+        async def run_computation(*_):
+            await asyncio.sleep(10)
+
+        computations = []
+
+        def cancel(*_):
+            computations[0].cancel()
+            return True
+
+        chargefw2_mock.run_computation = Mock(
+            side_effect=lambda *args: computations.append(
+                asyncio.ensure_future(run_computation(*args))
+            )
+            or computations[0]
+        )
+        chargefw2_mock.cancel = Mock(side_effect=cancel)
+
+        await service._run(running)
+
+        chargefw2_mock.cancel.assert_called_once()
+        assert all(update.get("status") != "done" for update in get_updates(job_repository_mock))
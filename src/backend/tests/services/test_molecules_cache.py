@@ -0,0 +1,83 @@
+from unittest.mock import Mock
+import pytest
+
+from services.molecules_cache import MoleculesCache
+
+
+@pytest.fixture
+def logger_mock():
+    return Mock()
+
+
+@pytest.fixture
+def cache(logger_mock):
+    # room for exactly two molecule sets with 10 atoms
+    return MoleculesCache(logger_mock, max_size_bytes=20 * MoleculesCache.ESTIMATED_BYTES_PER_ATOM)
+
+
+class TestMoleculesCache:
+    def test_get_miss(self, cache):
+        """Test getting molecules which are not cached."""
+
+        assert cache.get(("hash1", True, False, True)) is None
+        assert cache.misses == 1
+        assert cache.hits == 0
+
+    def test_put_get(self, cache):
+        """Test getting cached molecules."""
+
+        molecules = Mock()
+        cache.put(("hash1", True, False, True), molecules, 10)
+
+        assert cache.get(("hash1", True, False, True)) is molecules
+        assert cache.get(("hash1", False, False, True)) is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+        assert cache.size_bytes == 10 * MoleculesCache.ESTIMATED_BYTES_PER_ATOM
+
+    def test_evicts_least_recently_used(self, cache):
+        """Test that least recently used molecules are evicted when the cache is full."""
+
+        cache.put(("hash1", True, False, True), Mock(), 10)
+        cache.put(("hash2", True, False, True), Mock(), 10)
+
+        # hash1 becomes the most recently used
+        cache.get(("hash1", True, False, True))
+        cache.put(("hash3", True, False, True), Mock(), 10)
+
+        assert cache.get(("hash1", True, False, True)) is not None
+        assert cache.get(("hash2", True, False, True)) is None
+        assert cache.get(("hash3", True, False, True)) is not None
+        assert cache.evictions == 1
+
+    def test_put_too_large(self, cache):
+        """Test that molecules larger than the cache are not stored."""
+
+        cache.put(("hash1", True, False, True), Mock(), 100)
+
+        assert cache.get(("hash1", True, False, True)) is None
+        assert cache.evictions == 0
+
+    def test_invalidate(self, cache):
+        """Test removing all molecules of a file."""
+
+        cache.put(("hash1", True, False, True), Mock(), 5)
+        cache.put(("hash1", False, False, True), Mock(), 5)
+        cache.put(("hash2", True, False, True), Mock(), 5)
+
+        cache.invalidate("hash1")
+
+        assert cache.get(("hash1", True, False, True)) is None
+        assert cache.get(("hash1", False, False, True)) is None
+        assert cache.get(("hash2", True, False, True)) is not None
+        assert cache.stats()["entries"] == 1
+        assert cache.evictions == 0
+
+    def test_disabled(self, logger_mock):
+        """Test that nothing is cached when the cache size is not set."""
+
+        cache = MoleculesCache(logger_mock, max_size_bytes=0)
+        cache.put(("hash1", True, False, True), Mock(), 1)
+
+        assert not cache.enabled
+        assert cache.get(("hash1", True, False, True)) is None
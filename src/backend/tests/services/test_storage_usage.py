@@ -0,0 +1,111 @@
+import pytest
+from unittest.mock import Mock, MagicMock
+
+from db.schemas.storage_usage import GUEST_OWNER, StorageUsage
+from services.storage_usage import StorageUsageService
+
+
+@pytest.fixture
+def logger_mock():
+    return Mock()
+
+
+@pytest.fixture
+def repository_mock():
+    return Mock()
+
+
+@pytest.fixture
+def session_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def session_manager_mock(session_mock):
+    context_manager = MagicMock()
+    context_manager.__enter__.return_value = session_mock
+
+    session_manager = Mock()
+    session_manager.session.return_value = context_manager
+    return session_manager
+
+
+@pytest.fixture
+def service(logger_mock, repository_mock, session_manager_mock):
+    return StorageUsageService(logger_mock, repository_mock, session_manager_mock)
+
+
+class TestStorageUsageService:
+    def test_get(self, service, repository_mock, session_mock):
+        """Test getting usage of a tracked storage."""
+        repository_mock.get.return_value = StorageUsage(
+            owner="user-id", files_bytes=100, computations_bytes=200
+        )
+
+        result = service.get("user-id")
+
+        assert result == (100, 200)
+        repository_mock.get.assert_called_once_with(session_mock, "user-id")
+
+    def test_get_untracked(self, service, repository_mock):
+        """Test getting usage of a storage which is not tracked yet."""
+        repository_mock.get.return_value = None
+
+        assert service.get("user-id") is None
+
+    def test_get_guest(self, service, repository_mock, session_mock):
+        """Test that guests share a single counter."""
+        repository_mock.get.return_value = None
+
+        service.get(None)
+
+        repository_mock.get.assert_called_once_with(session_mock, GUEST_OWNER)
+
+    def test_get_exception(self, service, repository_mock, logger_mock):
+        """Test handling exceptions when getting usage."""
+        repository_mock.get.side_effect = Exception("Database error")
+
+        with pytest.raises(Exception):
+            service.get("user-id")
+
+        logger_mock.error.assert_called_once()
+
+    def test_add(self, service, repository_mock, session_mock):
+        """Test adding to usage of a storage."""
+        service.add("user-id", files_bytes=100, computations_bytes=-50)
+
+        repository_mock.add.assert_called_once_with(session_mock, "user-id", 100, -50)
+
+    def test_add_no_change(self, service, repository_mock, session_manager_mock):
+        """Test that zero changes do not touch the database."""
+        service.add("user-id")
+
+        repository_mock.add.assert_not_called()
+        session_manager_mock.session.assert_not_called()
+
+    def test_add_exception(self, service, repository_mock, logger_mock):
+        """Test handling exceptions when adding to usage."""
+        repository_mock.add.side_effect = Exception("Database error")
+
+        with pytest.raises(Exception):
+            service.add(None, files_bytes=100)
+
+        logger_mock.error.assert_called_once()
+
+    def test_set(self, service, repository_mock, session_mock):
+        """Test replacing usage of a storage with measured values."""
+        service.set(None, 100, 200)
+
+        repository_mock.set.assert_called_once()
+        args = repository_mock.set.call_args.args
+        assert args[:4] == (session_mock, GUEST_OWNER, 100, 200)
+        assert args[4].tzinfo is not None
+
+    def test_set_exception(self, service, repository_mock, logger_mock):
+        """Test handling exceptions when setting usage."""
+        repository_mock.set.side_effect = Exception("Database error")
+
+        with pytest.raises(Exception):
+            service.set("user-id", 100, 200)
+
+        logger_mock.error.assert_called_once()